@@ -0,0 +1,105 @@
+"""So sánh RSS mỗi worker giữa 1 Chrome / worker (BROWSER_MODE='process') và nhiều tab / Chrome ('shared').
+
+Mỗi chế độ mở N worker bằng funcs.setup_driver, mỗi worker lần lượt mở các fixture Shopee / Google Maps
+qua file:// (--pages trang), lấy mẫu RSS cây process Chrome sau mỗi vòng (funcs.memory.RssMonitor) rồi in
+RSS trung bình / đỉnh mỗi worker và thời gian mỗi trang.
+
+    python benchmarks/bench_browser_memory.py --workers 10 --pages 30
+    python benchmarks/bench_browser_memory.py --workers 20 --tabs-per-browser 10 --modes shared
+"""
+import argparse
+import logging
+import shutil
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+from common import fixture_pages
+
+from funcs import setup_driver as sd
+from funcs.memory import RssMonitor
+
+logging.basicConfig(level=logging.WARNING)
+logger = logging.getLogger(__name__)
+
+
+def run_mode(mode: str, workers: int, pages: list, rounds: int, headless: bool) -> dict:
+    sd.BROWSER_MODE = mode
+    base = tempfile.mkdtemp(prefix=f'mem_{mode}_')
+    monitor = RssMonitor()
+    drivers: dict[int, object] = {}
+    page_times: list[float] = []
+    lock = threading.Lock()
+    barrier = threading.Barrier(workers)
+
+    def worker(idx: int):
+        driver = sd.setup_driver(profile_idx=idx, headless=headless, user_data_base=base)
+        if driver is not None:
+            with lock:
+                drivers[idx] = driver
+            monitor.register(f'w{idx}', driver)
+        for r in range(rounds):
+            if driver is not None:
+                page = pages[(idx + r) % len(pages)]
+                t0 = time.perf_counter()
+                try:
+                    driver.get(page.as_uri())
+                    with lock:
+                        page_times.append(time.perf_counter() - t0)
+                except Exception as e:
+                    logger.error(f'[{mode}] worker {idx}: {e}')
+            # mọi worker cùng xong 1 vòng rồi mới lấy mẫu
+            if barrier.wait() == 0:
+                monitor.sample()
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(workers)]
+    try:
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+    finally:
+        for driver in drivers.values():
+            try:
+                driver.quit()
+            except Exception:
+                pass
+        shutil.rmtree(base, ignore_errors=True)
+    s = monitor.summary()
+    s['started'] = len(drivers)
+    s['page_ms'] = 1000 * statistics.median(page_times) if page_times else 0.0
+    return s
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--workers', type=int, default=10)
+    parser.add_argument('--pages', type=int, default=20, help='số trang mỗi worker mở')
+    parser.add_argument('--modes', default='process,shared')
+    parser.add_argument('--tabs-per-browser', type=int, default=sd.TABS_PER_BROWSER)
+    parser.add_argument('--headed', action='store_true')
+    args = parser.parse_args()
+
+    pages = fixture_pages('shopee_product') + fixture_pages('shopee_listing') + fixture_pages('ggmap_search')
+    if not pages:
+        logger.error('Không có fixture nào trong benchmarks/fixtures')
+        return 1
+    sd.TABS_PER_BROWSER = args.tabs_per_browser
+
+    mib = 1024 * 1024
+    for mode in [m.strip() for m in args.modes.split(',') if m.strip()]:
+        s = run_mode(mode, args.workers, pages, args.pages, headless=not args.headed)
+        if not s.get('samples'):
+            print(f'{mode:<8} không đo được RSS ({s["started"]}/{args.workers} worker khởi động)')
+            continue
+        print(f"{mode:<8} {s['started']}/{args.workers} worker, {s['max_browsers']} browser: "
+              f"RSS mỗi worker trung bình {s['mean_rss_per_worker'] / mib:6.0f} MiB, đỉnh "
+              f"{s['peak_rss_per_worker'] / mib:6.0f} MiB, tổng đỉnh {s['peak_rss'] / mib:7.0f} MiB, "
+              f"median {s['page_ms']:.0f} ms/trang")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
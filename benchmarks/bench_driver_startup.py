@@ -0,0 +1,135 @@
+"""Đo time-to-first-page khi mở N Chrome cùng lúc bằng funcs.setup_driver, theo 2 cách khởi động.
+
+- serial: như cũ - mỗi thread cách nhau 1s, uc.Chrome tự tải + patch chromedriver trong driver_lock,
+  profile mới là profile lạnh
+- parallel: chromedriver patch 1 lần, tối đa STARTUP_CONCURRENCY Chrome mở cùng lúc, profile mới clone
+  từ PROFILE_TEMPLATE
+
+Mỗi lần chạy dùng thư mục profile tạm riêng (profile mới hoàn toàn, giống máy mới / worker mới).
+--clone-only chỉ đo clone profile mẫu (không cần Chrome) trên 1 profile giả có kích thước cho trước.
+
+    python benchmarks/bench_driver_startup.py --workers 20
+    python benchmarks/bench_driver_startup.py --clone-only --workers 20 --profile-mb 60
+"""
+import argparse
+import logging
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+import common  # noqa: F401  (thêm ROOT vào sys.path)
+
+from funcs import setup_driver as sd
+
+logging.basicConfig(level=logging.WARNING)
+logger = logging.getLogger(__name__)
+
+
+def run_startup(mode: str, workers: int, first_url: str, headless: bool) -> dict:
+    base = tempfile.mkdtemp(prefix=f'startup_{mode}_')
+    sd.STARTUP_MODE = mode
+    sd._patched_driver.clear()
+    firsts: dict[int, float] = {}
+    drivers = []
+    lock = threading.Lock()
+    t0 = time.perf_counter()
+
+    def worker(idx: int):
+        driver = sd.setup_driver(profile_idx=idx, headless=headless, user_data_base=base)
+        if driver is None:
+            return
+        try:
+            driver.get(first_url)
+            with lock:
+                firsts[idx] = time.perf_counter() - t0
+        except Exception as e:
+            logger.error(f'[{mode}] worker {idx}: {e}')
+        with lock:
+            drivers.append(driver)
+
+    threads = []
+    try:
+        for idx in range(workers):
+            thread = threading.Thread(target=worker, args=(idx,))
+            thread.start()
+            if mode == 'serial':
+                time.sleep(1)
+            threads.append(thread)
+        for thread in threads:
+            thread.join()
+    finally:
+        for driver in drivers:
+            try:
+                driver.quit()
+            except Exception:
+                pass
+        shutil.rmtree(base, ignore_errors=True)
+    return {'mode': mode, 'started': len(firsts), 'times': sorted(firsts.values())}
+
+
+def _fake_profile(path: str, size_mb: int):
+    """Profile giả: vài file lớn (History, Cookies...), nhiều file nhỏ, và cache (bị bỏ qua khi clone)."""
+    os.makedirs(os.path.join(path, 'Default', 'Cache', 'Cache_Data'))
+    os.makedirs(os.path.join(path, 'Default', 'Local Storage', 'leveldb'))
+    chunk = os.urandom(1 << 20)
+    for i in range(size_mb):
+        sub = 'Default' if i % 2 else os.path.join('Default', 'Local Storage', 'leveldb')
+        with open(os.path.join(path, sub, f'data_{i}.db'), 'wb') as f:
+            f.write(chunk)
+    for i in range(500):
+        with open(os.path.join(path, 'Default', f'small_{i}.json'), 'w') as f:
+            f.write('{}' * 50)
+    for i in range(size_mb // 2):
+        with open(os.path.join(path, 'Default', 'Cache', 'Cache_Data', f'f_{i}'), 'wb') as f:
+            f.write(chunk)
+    open(os.path.join(path, 'SingletonLock'), 'w').close()
+
+
+def run_clone(workers: int, size_mb: int) -> dict:
+    base = tempfile.mkdtemp(prefix='clone_')
+    try:
+        template = os.path.join(base, sd.PROFILE_TEMPLATE)
+        _fake_profile(template, size_mb)
+        timings = []
+        for idx in range(workers):
+            t0 = time.perf_counter()
+            sd.clone_profile(template, os.path.join(base, f'Profile_{idx}'))
+            timings.append(time.perf_counter() - t0)
+        skipped = not os.path.exists(os.path.join(base, 'Profile_0', 'Default', 'Cache'))
+        return {'timings': timings, 'reflink': sd._reflink_ok[0], 'cache_skipped': skipped}
+    finally:
+        shutil.rmtree(base, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--workers', type=int, default=20)
+    parser.add_argument('--modes', default='serial,parallel')
+    parser.add_argument('--first-url', default='about:blank')
+    parser.add_argument('--headed', action='store_true')
+    parser.add_argument('--clone-only', action='store_true', help='chỉ đo clone profile mẫu, không mở Chrome')
+    parser.add_argument('--profile-mb', type=int, default=40, help='kích thước profile giả cho --clone-only')
+    args = parser.parse_args()
+
+    if args.clone_only:
+        r = run_clone(args.workers, args.profile_mb)
+        t = r['timings']
+        print(f"clone {args.workers} profile ({args.profile_mb} MiB, {'reflink' if r['reflink'] else 'copy'}, "
+              f"bỏ cache: {r['cache_skipped']}): median {1000 * statistics.median(t):.1f} ms, "
+              f"tổng {sum(t):.2f}s")
+        return 0
+
+    for mode in [m.strip() for m in args.modes.split(',') if m.strip()]:
+        r = run_startup(mode, args.workers, args.first_url, headless=not args.headed)
+        t = r['times'] or [0.0]
+        print(f"{mode:<9} {r['started']}/{args.workers} Chrome  trang đầu tiên: worker nhanh nhất {t[0]:6.1f}s, "
+              f"median {statistics.median(t):6.1f}s, chậm nhất {t[-1]:6.1f}s")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,77 @@
+"""So sánh độ trễ trích xuất 1 trang listing giữa 2 chế độ của get_infor_product.
+
+Chạy offline trên fixture trong benchmarks/fixtures/shopee_listing (file://),
+dùng chung setup_driver (kể cả implicit wait 10s) để số đo sát với khi crawl thật.
+
+    python benchmarks/bench_get_infor_product.py --repeat 5
+"""
+from pathlib import Path
+import argparse
+import logging
+import statistics
+import sys
+import time
+
+from common import FIXTURES as FIXTURES_ROOT, fixture_pages
+
+from get_product_in_category import get_infor_product
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+FIXTURES = FIXTURES_ROOT / 'shopee_listing'
+
+
+def bench_page(driver, page: Path, repeat: int) -> dict:
+    driver.get(page.as_uri())
+
+    timings: dict[str, list[float]] = {'dom': [], 'js': []}
+    outputs: dict[str, list] = {}
+    for mode in ('dom', 'js'):
+        for _ in range(repeat):
+            t0 = time.perf_counter()
+            outputs[mode] = get_infor_product(driver, mode=mode)
+            timings[mode].append(time.perf_counter() - t0)
+
+    return {
+        'page': page.name,
+        'products': len(outputs['js']),
+        'same': outputs['dom'] == outputs['js'],
+        'dom_ms': statistics.median(timings['dom']) * 1000,
+        'js_ms': statistics.median(timings['js']) * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--headed', action='store_true', help='mở cửa sổ Chrome thay vì headless')
+    args = parser.parse_args()
+
+    from funcs.setup_driver import setup_driver
+
+    pages = fixture_pages('shopee_listing')
+    if not pages:
+        logger.error(f'Không có fixture nào trong {FIXTURES}')
+        return 1
+
+    driver = setup_driver(profile_idx=99, headless=not args.headed)
+    if driver is None:
+        return 1
+
+    try:
+        print(f"{'page':<28}{'products':>9}{'dom (ms)':>12}{'js (ms)':>12}{'speedup':>9}  same")
+        for page in pages:
+            r = bench_page(driver, page, max(1, args.repeat))
+            speedup = r['dom_ms'] / r['js_ms'] if r['js_ms'] else 0.0
+            print(f"{r['page']:<28}{r['products']:>9}{r['dom_ms']:>12.1f}{r['js_ms']:>12.1f}{speedup:>8.1f}x  {r['same']}")
+    finally:
+        try:
+            driver.quit()
+        except Exception:
+            pass
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
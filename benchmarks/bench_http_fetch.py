@@ -0,0 +1,143 @@
+"""Benchmark chế độ fetch HTTP (funcs.http_fetch.HttpShopResolver) với 1 mock server local.
+
+Mock server trả JSON giống /api/v4/product/get_shop_info với độ trễ cố định mỗi request và 1 tỉ lệ
+response 403 (bị chặn). So sánh:
+- sequential: từng request một bằng urllib, mỗi request 1 kết nối mới (giống mở từng trang)
+- http[cN]: HttpShopResolver với N request đồng thời, keep-alive, dùng lại kết quả theo shopid
+
+    python benchmarks/bench_http_fetch.py --products 400 --shops 120 --latency-ms 80
+"""
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import argparse
+import json
+import logging
+import random
+import sys
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+
+import common  # noqa: F401  (thêm ROOT vào sys.path)
+
+from funcs.http_fetch import SHOP_INFO_PATH, HttpShopResolver
+
+logging.basicConfig(level=logging.WARNING)
+logger = logging.getLogger(__name__)
+
+
+class MockShopee(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, latency_s: float, block_rate: float, seed: int = 0):
+        super().__init__(('127.0.0.1', 0), _Handler)
+        self.latency_s = latency_s
+        self.block_rate = block_rate
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.connections = 0
+        self.requests = 0
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server_address[:2]
+        return f'http://{host}:{port}'
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def setup(self):
+        super().setup()
+        with self.server.lock:
+            self.server.connections += 1
+
+    def do_GET(self):
+        srv = self.server
+        with srv.lock:
+            srv.requests += 1
+            blocked = srv.rng.random() < srv.block_rate
+        time.sleep(srv.latency_s)
+
+        url = urllib.parse.urlparse(self.path)
+        shopid = (urllib.parse.parse_qs(url.query).get('shopid') or [''])[0]
+        if url.path != SHOP_INFO_PATH or not shopid:
+            status, body = 404, {'error': 4, 'data': None}
+        elif blocked:
+            status, body = 403, {'error': 90309999, 'data': None}
+        else:
+            status, body = 200, {'error': 0, 'data': {'shopid': int(shopid), 'name': f'Shop {shopid}',
+                                                      'account': {'username': f'shop{shopid}'}}}
+        raw = json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(raw)))
+        self.end_headers()
+        self.wfile.write(raw)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def make_hrefs(products: int, shops: int, seed: int = 0) -> list[str]:
+    rng = random.Random(seed)
+    return [f'https://shopee.vn/Sim-Item-{i}-i.{1000 + rng.randrange(shops)}.{30000000 + i}' for i in range(products)]
+
+
+def run_sequential(server: MockShopee, hrefs: list[str]) -> int:
+    ok = 0
+    for href in hrefs:
+        shopid = href.rsplit('-i.', 1)[1].split('.')[0]
+        try:
+            with urllib.request.urlopen(f'{server.base_url}{SHOP_INFO_PATH}?shopid={shopid}', timeout=15) as r:
+                json.loads(r.read())
+                ok += 1
+        except urllib.error.HTTPError:
+            pass
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--products', type=int, default=400)
+    parser.add_argument('--shops', type=int, default=120, help='số shop khác nhau trong các sản phẩm')
+    parser.add_argument('--latency-ms', type=float, default=80.0, help='độ trễ mỗi request của mock server')
+    parser.add_argument('--block-rate', type=float, default=0.02, help='tỉ lệ response 403')
+    parser.add_argument('--concurrency', default='1,8,32', help='danh sách số request đồng thời')
+    parser.add_argument('--skip-sequential', action='store_true')
+    args = parser.parse_args()
+
+    hrefs = make_hrefs(args.products, args.shops)
+    rows = []
+
+    def run(name, fn):
+        server = MockShopee(args.latency_ms / 1000, args.block_rate)
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        try:
+            t0 = time.perf_counter()
+            ok = fn(server)
+            elapsed = time.perf_counter() - t0
+        finally:
+            server.shutdown()
+            server.server_close()
+        rows.append((name, ok, elapsed, server.requests, server.connections))
+
+    if not args.skip_sequential:
+        run('sequential', lambda srv: run_sequential(srv, hrefs))
+    for c in [int(x) for x in args.concurrency.split(',') if x.strip()]:
+        def resolve(srv, c=c):
+            # max_blocked lớn để benchmark không dừng sớm vì 403 ngẫu nhiên
+            resolver = HttpShopResolver(base_url=srv.base_url, concurrency=c, per_host=c, max_blocked=10 ** 9)
+            return sum(1 for r in resolver.resolve(hrefs) if r is not None)
+        run(f'http[c{c}]', resolve)
+
+    print(f"{'mode':<14}{'resolved':>10}{'seconds':>10}{'products/s':>12}{'requests':>10}{'conns':>8}")
+    for name, ok, elapsed, requests, conns in rows:
+        print(f'{name:<14}{ok:>10}{elapsed:>10.2f}{len(hrefs) / elapsed:>12.1f}{requests:>10}{conns:>8}')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
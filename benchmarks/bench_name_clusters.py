@@ -0,0 +1,93 @@
+"""Benchmark gom cụm tên shop gần trùng (funcs.name_clusters) trên danh sách tên sinh ngẫu nhiên.
+
+Mỗi shop gốc sinh ra vài biến thể chỉ khác phần trang trí (emoji, 'Official Store', 'VN', số cửa hàng,
+hoa/thường, dấu). Script đo thời gian gom cụm, số truy vấn Google Maps bớt được và độ chính xác so với
+shop gốc (purity: tỉ lệ tên nằm trong cụm mà đa số là cùng shop gốc; split: số shop gốc bị tách ra nhiều cụm).
+
+    python benchmarks/bench_name_clusters.py --shops 50000 --variants 4
+"""
+import argparse
+import collections
+import logging
+import random
+import sys
+import time
+
+import common  # noqa: F401  (thêm ROOT vào sys.path)
+
+from funcs.name_clusters import cluster_names
+
+logging.basicConfig(level=logging.WARNING)
+
+_WORDS = ('nha', 'sach', 'phuong', 'nam', 'thoi', 'trang', 'gia', 'dung', 'my', 'pham', 'dien', 'tu', 'hoa',
+          'qua', 'do', 'choi', 'tre', 'em', 'sieu', 'thi', 'mini', 'xanh', 'do', 'vang', 'anh', 'minh',
+          'linh', 'long', 'phat', 'dat', 'thanh', 'cong', 'an', 'khang', 'hung', 'thinh', 'viet', 'sai', 'gon')
+_ACCENTED = {'a': 'á', 'o': 'ô', 'e': 'ê', 'u': 'ư', 'd': 'đ', 'i': 'í'}
+_DECOR = (' Official Store', ' Official', ' VN', ' Mall', ' Store', ' 🔥', ' ⭐', ' Chính Hãng', '')
+
+
+def _base_names(n: int, rng: random.Random) -> list[str]:
+    names, seen = [], set()
+    while len(names) < n:
+        name = ' '.join(rng.choice(_WORDS) for _ in range(rng.randint(2, 4))).title()
+        name += f' {rng.choice("ABCDEFGHKLMNPQRSTVXY")}{rng.randint(1, 999)}'
+        if name not in seen:
+            seen.add(name)
+            names.append(name)
+    return names
+
+
+def _variant(name: str, rng: random.Random) -> str:
+    v = name
+    if rng.random() < 0.3:
+        v = ''.join(_ACCENTED.get(ch, ch) if rng.random() < 0.3 else ch for ch in v)
+    if rng.random() < 0.3:
+        v = v.upper() if rng.random() < 0.5 else v.lower()
+    if rng.random() < 0.3:
+        v += f" {rng.choice(('Store', 'CS', 'Chi Nhánh'))} {rng.randint(1, 9)}"
+    return v + rng.choice(_DECOR)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--shops', type=int, default=50_000, help='số shop gốc')
+    parser.add_argument('--variants', type=int, default=4, help='số biến thể tối đa mỗi shop')
+    parser.add_argument('--threshold', type=float, default=0.8)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    names, truth = [], []
+    for sid, base in enumerate(_base_names(args.shops, rng)):
+        for _ in range(rng.randint(1, args.variants)):
+            names.append(_variant(base, rng))
+            truth.append(sid)
+    order = list(range(len(names)))
+    rng.shuffle(order)
+    names = [names[i] for i in order]
+    truth = [truth[i] for i in order]
+
+    t0 = time.perf_counter()
+    clusters = cluster_names(names, threshold=args.threshold)
+    elapsed = time.perf_counter() - t0
+
+    by_cluster = collections.defaultdict(collections.Counter)
+    clusters_of_shop = collections.defaultdict(set)
+    for name, sid in zip(names, truth):
+        rep = clusters[name]
+        by_cluster[rep][sid] += 1
+        clusters_of_shop[sid].add(rep)
+    pure = sum(c.most_common(1)[0][1] for c in by_cluster.values())
+    split = sum(1 for reps in clusters_of_shop.values() if len(reps) > 1)
+
+    queries = len(by_cluster)
+    print(f'{len(names)} tên ({len(set(names))} khác nhau) của {args.shops} shop gốc')
+    print(f'gom cụm: {elapsed:.2f}s ({1e6 * elapsed / len(names):.1f} µs/tên) -> {queries} truy vấn, '
+          f'bớt {len(names) - queries} ({1 - queries / len(names):.0%})')
+    print(f'purity {pure / len(names):.2%}, {split} shop gốc bị tách ({split / args.shops:.2%}), '
+          f'tối thiểu có thể: {args.shops} truy vấn')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,68 @@
+"""Đo thời gian parse và bộ nhớ đỉnh của từng backend parse_ggmap_results.
+
+Chạy trên các page_source đã lưu trong benchmarks/fixtures/ggmap_search và kiểm tra
+mọi backend trả về cùng {name, href}; thoát với mã 1 nếu có backend lệch.
+
+    python benchmarks/bench_parse_ggmap_results.py --repeat 20
+"""
+import argparse
+import statistics
+import sys
+import time
+import tracemalloc
+
+from common import FIXTURES as FIXTURES_ROOT, fixture_pages
+
+from find_shop_on_ggmap import parse_ggmap_results
+from funcs.ggmap_parsers import available_backends
+
+FIXTURES = FIXTURES_ROOT / 'ggmap_search'
+
+
+def measure(page_source: str, backend: str, repeat: int) -> tuple[list, float, int]:
+    timings = []
+    results = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        results = parse_ggmap_results(page_source, max_items=5, backend=backend)
+        timings.append(time.perf_counter() - t0)
+
+    tracemalloc.start()
+    parse_ggmap_results(page_source, max_items=5, backend=backend)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return results, statistics.median(timings) * 1000, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=10)
+    args = parser.parse_args()
+
+    backends = available_backends()
+    pages = fixture_pages('ggmap_search')
+    if not pages:
+        print(f'Không có fixture nào trong {FIXTURES}')
+        return 1
+
+    print(f"backend đang có: {', '.join(backends)} (mặc định: {backends[0] if backends else '-'})")
+    mismatches = 0
+    for page in pages:
+        page_source = page.read_text(encoding='utf-8')
+        print(f"\n{page.name} ({len(page_source) / 1024:.0f} KiB)")
+        reference = None
+        for backend in backends:
+            results, ms, peak = measure(page_source, backend, max(1, args.repeat))
+            if reference is None:
+                reference = results
+            same = results == reference
+            mismatches += 0 if same else 1
+            print(f"  {backend:<12}{ms:>10.2f} ms{peak / 1024:>12.0f} KiB peak  {len(results)} kết quả  {'OK' if same else 'DIFF'}")
+            if not same:
+                print(f'    {results}')
+
+    return 1 if mismatches else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,152 @@
+"""Đo thời gian từ lúc có driver tới khi trang đầu tiên đã đăng nhập, theo 2 cách nạp cookie.
+
+- selenium: mở trang chủ, add_cookie từng cookie, chờ 3s, refresh rồi mới mở trang cần lấy (cách cũ)
+- cdp: 1 lệnh Network.setCookies trên about:blank rồi mở thẳng trang cần lấy (COOKIE_MODE='cdp')
+
+Mặc định chạy trên FakeDriver với đồng hồ ảo (time.sleep chỉ cộng dồn, không ngủ thật) theo mô hình độ
+trễ của benchmarks/fake_driver.py; --chrome chạy với Chrome thật và file cookie thật.
+
+    python benchmarks/bench_session_startup.py --workers 5 --page-median 1.5
+    python benchmarks/bench_session_startup.py --chrome --cookies cookies/shopee_cookies.json
+"""
+import argparse
+import logging
+import statistics
+import sys
+import time
+import types
+
+import common  # noqa: F401  (thêm ROOT vào sys.path)
+
+try:
+    import config  # noqa: F401
+except Exception:
+    # config.py là file cấu hình local, không có trong repo; các giá trị mặc định là đủ cho benchmark
+    sys.modules['config'] = types.ModuleType('config')
+
+from funcs.load_cookies_to_driver import load_cookies_to_driver, read_cookies_file
+
+logging.basicConfig(level=logging.WARNING)
+logger = logging.getLogger(__name__)
+
+HOME_URL = 'https://shopee.vn/mall'
+FIRST_URL = 'https://shopee.vn/Sim-Item-0-0-i.1000.30000000'
+SIM_COOKIES = [
+    {'name': 'SPC_F', 'value': 'sim', 'domain': 'shopee.vn', 'path': '/', 'expiry': 4102444800},
+    {'name': 'SPC_EC', 'value': 'sim', 'domain': 'shopee.vn', 'path': '/'},
+    {'name': 'SPC_U', 'value': 'acc0', 'domain': 'shopee.vn', 'path': '/'},
+]
+
+
+def start_selenium(driver, cookies: list, first_url: str):
+    driver.get(HOME_URL)
+    driver.execute_script("document.body.style.zoom='25%'")
+    load_cookies_to_driver(driver, cookies=cookies, source='bench')
+    time.sleep(3)
+    driver.refresh()
+    driver.get(first_url)
+
+
+def start_cdp(driver, cookies: list, first_url: str):
+    if not load_cookies_to_driver(driver, cookies=cookies, source='bench', mode='cdp'):
+        raise RuntimeError('Network.setCookies lỗi')
+    driver.get(first_url)
+
+
+MODES = {'selenium': start_selenium, 'cdp': start_cdp}
+
+
+def authenticated(driver, cookies: list) -> bool:
+    names = {c['name'] for c in cookies}
+    try:
+        return names <= {c.get('name') for c in driver.get_cookies()}
+    except Exception:
+        return False
+
+
+def run_fake(args, cookies: list) -> dict:
+    from fake_driver import FakeDriver, LatencyModel, SimSite
+
+    clock = [0.0]
+    real_sleep = time.sleep
+    time.sleep = lambda s: clock.__setitem__(0, clock[0] + max(0.0, s))
+    try:
+        site = SimSite(LatencyModel(page_median_s=args.page_median, page_sigma=args.page_sigma,
+                                    command_s=args.command_ms / 1000.0, error_rate=0.0, seed=args.seed))
+        out = {}
+        for mode, start in MODES.items():
+            timings, pages, ok = [], 0, 0
+            for _ in range(args.repeat):
+                driver = FakeDriver(site)
+                before_pages, t0 = site.stats.pages, clock[0]
+                start(driver, cookies, FIRST_URL)
+                timings.append(clock[0] - t0)
+                pages += site.stats.pages - before_pages
+                ok += authenticated(driver, cookies)
+            out[mode] = {'timings': timings, 'pages': pages / args.repeat, 'authenticated': ok}
+        return out
+    finally:
+        time.sleep = real_sleep
+
+
+def run_chrome(args, cookies: list) -> dict:
+    from funcs.setup_driver import setup_driver
+
+    out = {}
+    for mode, start in MODES.items():
+        timings, ok = [], 0
+        for i in range(args.repeat):
+            driver = setup_driver(profile_idx=90 + i, headless=not args.headed)
+            if driver is None:
+                continue
+            try:
+                t0 = time.perf_counter()
+                start(driver, cookies, args.first_url)
+                timings.append(time.perf_counter() - t0)
+                ok += authenticated(driver, cookies)
+            except Exception as e:
+                logger.error(f'{mode}: {e}')
+            finally:
+                try:
+                    driver.quit()
+                except Exception:
+                    pass
+        out[mode] = {'timings': timings, 'pages': 3 if mode == 'selenium' else 1, 'authenticated': ok}
+    return out
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--chrome', action='store_true', help='dùng Chrome thật thay vì FakeDriver')
+    parser.add_argument('--headed', action='store_true')
+    parser.add_argument('--cookies', default='cookies/shopee_cookies.json', help='file cookie cho --chrome')
+    parser.add_argument('--first-url', default='https://shopee.vn/mall', help='trang đầu tiên cho --chrome')
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--workers', type=int, default=5, help='số worker để quy ra thời gian tiết kiệm mỗi lần chạy')
+    parser.add_argument('--page-median', type=float, default=1.5)
+    parser.add_argument('--page-sigma', type=float, default=0.4)
+    parser.add_argument('--command-ms', type=float, default=4.0)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    if args.chrome:
+        cookies = read_cookies_file(args.cookies)
+        if not cookies:
+            return 1
+        results = run_chrome(args, cookies)
+    else:
+        results = run_fake(args, SIM_COOKIES)
+
+    for mode, r in results.items():
+        t = r['timings'] or [0.0]
+        print(f"{mode:<9} median {statistics.median(t):6.2f}s  max {max(t):6.2f}s  "
+              f"{r['pages']:.0f} lần tải trang  đã đăng nhập {r['authenticated']}/{len(r['timings'])}")
+    if all(results[m]['timings'] for m in MODES):
+        saved = statistics.median(results['selenium']['timings']) - statistics.median(results['cdp']['timings'])
+        print(f"tiết kiệm {saved:.2f}s mỗi driver "
+              f"({args.workers} worker: {saved * args.workers:.1f} giây-worker mỗi lần khởi động)")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,103 @@
+"""Kiểm tra chế độ 'api' (đọc JSON API từ performance log) của get_infor_product / get_infor_shop.
+
+benchmarks/fixtures/shopee_api chứa JSON đã ghi lại của API listing và API trang sản phẩm, cùng 2 trang
+stub gọi fetch() tới chúng rồi render card / khối shop giống trang thật. Script:
+
+1. parse thẳng các file JSON bằng funcs.shopee_api (không cần Chrome)
+2. serve thư mục fixtures qua localhost, mở 2 trang stub trong Chrome có bật performance log,
+   chạy chế độ 'api' và 'js' rồi so sánh (href so theo path vì stub chạy trên 127.0.0.1)
+
+    python benchmarks/check_api_capture.py
+    python benchmarks/check_api_capture.py --offline
+"""
+import argparse
+import json
+import logging
+import sys
+import time
+import urllib.parse
+
+from common import FIXTURES as FIXTURES_ROOT, FixtureServer
+
+from funcs.shopee_api import (ApiCapture, LISTING_API_PATTERNS, PRODUCT_API_PATTERNS,
+                              products_from_payloads, shops_from_payloads)
+from get_product_in_category import get_infor_product
+from get_shop_sell_product import get_infor_shop
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+FIXTURES = FIXTURES_ROOT / 'shopee_api'
+
+
+def _path(href: str) -> str:
+    return urllib.parse.unquote(urllib.parse.urlparse(href).path)
+
+
+def check_offline() -> int:
+    listing = json.loads((FIXTURES / 'api' / 'v4' / 'recommend' / 'recommend').read_text(encoding='utf-8'))
+    product = json.loads((FIXTURES / 'api' / 'v4' / 'pdp' / 'get_pc').read_text(encoding='utf-8'))
+
+    products = products_from_payloads([listing])
+    shops = shops_from_payloads([product])
+    print(f'recommend: {len(products)} sản phẩm, vd. {products[0] if products else None}')
+    print(f'get_pc   : {shops}')
+    return 0 if products and shops else 1
+
+
+def check_browser(headed: bool) -> int:
+    from funcs.setup_driver import setup_driver
+
+    driver = setup_driver(profile_idx=99, headless=not headed, performance_log=True)
+    if driver is None:
+        return 1
+
+    failures = 0
+    try:
+        with FixtureServer() as server:
+            suites = (
+                ('listing.html', LISTING_API_PATTERNS, get_infor_product,
+                 lambda rows: [(_path(r['href']), r['name']) for r in rows]),
+                ('product.html', PRODUCT_API_PATTERNS, get_infor_shop,
+                 lambda rows: [(_path(r['shop_href']), r['shop_name']) for r in rows]),
+            )
+            for page, patterns, extractor, key in suites:
+                capture = ApiCapture(driver, patterns)
+                capture.reset()
+                t0 = time.perf_counter()
+                driver.get(server.url_for(FIXTURES / page))
+                api = extractor(driver, mode='api', capture=capture)
+                t1 = time.perf_counter()
+                js = extractor(driver, mode='js')
+                t2 = time.perf_counter()
+
+                same = bool(api) and key(api) == key(js)
+                if not same:
+                    failures += 1
+                print(f"{'OK ' if same else 'DIFF'} {page:<14} api {len(api):3d} bản ghi {1000 * (t1 - t0):8.1f} ms"
+                      f"  js {len(js):3d} bản ghi {1000 * (t2 - t1):8.1f} ms (sau khi api xong)")
+                if not same:
+                    print(f'     api: {api[:3]}')
+                    print(f'     js : {js[:3]}')
+    finally:
+        try:
+            driver.quit()
+        except Exception:
+            pass
+    return 1 if failures else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--offline', action='store_true', help='chỉ parse file JSON, không mở Chrome')
+    parser.add_argument('--headed', action='store_true', help='mở cửa sổ Chrome thay vì headless')
+    args = parser.parse_args()
+
+    code = check_offline()
+    if not args.offline:
+        code = check_browser(args.headed) or code
+    return code
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,68 @@
+"""Đối chiếu 2 chế độ của get_infor_shop ('js' và 'dom') trên các trang sản phẩm đã lưu.
+
+Mỗi fixture trong benchmarks/fixtures/shopee_product được mở qua file://, chạy cả 2
+chế độ và so sánh kết quả; thoát với mã 1 nếu có trang lệch.
+
+    python benchmarks/check_get_infor_shop_parity.py
+"""
+import argparse
+import logging
+import sys
+import time
+
+from common import FIXTURES as FIXTURES_ROOT, fixture_pages
+
+from get_shop_sell_product import get_infor_shop
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+FIXTURES = FIXTURES_ROOT / 'shopee_product'
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--headed', action='store_true', help='mở cửa sổ Chrome thay vì headless')
+    args = parser.parse_args()
+
+    from funcs.setup_driver import setup_driver
+
+    pages = fixture_pages('shopee_product')
+    if not pages:
+        logger.error(f'Không có fixture nào trong {FIXTURES}')
+        return 1
+
+    driver = setup_driver(profile_idx=99, headless=not args.headed)
+    if driver is None:
+        return 1
+
+    mismatches = 0
+    try:
+        for page in pages:
+            driver.get(page.as_uri())
+
+            t0 = time.perf_counter()
+            dom = get_infor_shop(driver, mode='dom')
+            t1 = time.perf_counter()
+            js = get_infor_shop(driver, mode='js')
+            t2 = time.perf_counter()
+
+            same = dom == js
+            if not same:
+                mismatches += 1
+            print(f"{'OK ' if same else 'DIFF'} {page.name:<32} dom {1000 * (t1 - t0):8.1f} ms  js {1000 * (t2 - t1):8.1f} ms")
+            if not same:
+                print(f'     dom: {dom}')
+                print(f'     js : {js}')
+    finally:
+        try:
+            driver.quit()
+        except Exception:
+            pass
+
+    print(f'{len(pages) - mismatches}/{len(pages)} trang khớp')
+    return 1 if mismatches else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
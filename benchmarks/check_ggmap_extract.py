@@ -0,0 +1,74 @@
+"""Đối chiếu 2 cách lấy kết quả Google Maps của find_shop_on_ggmap ('js' trong trang và 'source').
+
+Mỗi fixture trong benchmarks/fixtures/ggmap_search được mở qua file://, lấy kết quả bằng cả 2 cách,
+so sánh và in số byte kéo qua WebDriver cùng thời gian mỗi cách; thoát với mã 1 nếu có trang lệch.
+
+    python benchmarks/check_ggmap_extract.py
+    python benchmarks/check_ggmap_extract.py --repeat 20
+"""
+import argparse
+import logging
+import sys
+import time
+
+from common import FIXTURES as FIXTURES_ROOT, fixture_pages
+
+from find_shop_on_ggmap import _GGMAP_RESULTS_JS, get_ggmap_results
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+FIXTURES = FIXTURES_ROOT / 'ggmap_search'
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--headed', action='store_true', help='mở cửa sổ Chrome thay vì headless')
+    parser.add_argument('--repeat', type=int, default=5, help='số lần đo mỗi cách trên mỗi trang')
+    args = parser.parse_args()
+
+    from funcs.setup_driver import setup_driver
+
+    pages = fixture_pages('ggmap_search')
+    if not pages:
+        logger.error(f'Không có fixture nào trong {FIXTURES}')
+        return 1
+
+    driver = setup_driver(profile_idx=99, headless=not args.headed)
+    if driver is None:
+        return 1
+
+    mismatches = 0
+    try:
+        for page in pages:
+            driver.get(page.as_uri())
+
+            timings = {}
+            for mode in ('source', 'js'):
+                t0 = time.perf_counter()
+                for _ in range(args.repeat):
+                    results = get_ggmap_results(driver, mode=mode, max_items=5)
+                timings[mode] = (results, 1000 * (time.perf_counter() - t0) / args.repeat)
+
+            source_bytes = len((driver.page_source or '').encode('utf-8'))
+            js_bytes = len((driver.execute_script(_GGMAP_RESULTS_JS, 5) or '').encode('utf-8'))
+
+            same = timings['source'][0] == timings['js'][0]
+            if not same:
+                mismatches += 1
+            print(f"{'OK ' if same else 'DIFF'} {page.name:<32} "
+                  f"source {source_bytes / 1024:8.1f} KiB {timings['source'][1]:8.1f} ms  "
+                  f"js {js_bytes / 1024:6.2f} KiB {timings['js'][1]:8.1f} ms")
+            if not same:
+                print(f"     source: {timings['source'][0]}")
+                print(f"     js    : {timings['js'][0]}")
+    finally:
+        try:
+            driver.quit()
+        except Exception:
+            pass
+    return 1 if mismatches else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,114 @@
+"""Tiện ích dùng chung cho các script benchmark: đường dẫn fixture, server localhost, thống kê."""
+from pathlib import Path
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+import functools
+import logging
+import math
+import statistics
+import sys
+import threading
+import time
+import tracemalloc
+from typing import Callable
+
+ROOT = Path(__file__).resolve().parent.parent
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+FIXTURES = Path(__file__).resolve().parent / 'fixtures'
+
+logger = logging.getLogger(__name__)
+
+
+def fixture_pages(kind: str) -> list[Path]:
+    """Các trang .html của 1 loại fixture: 'shopee_listing', 'shopee_product', 'ggmap_search'."""
+    return sorted((FIXTURES / kind).glob('*.html'))
+
+
+def percentile(values: list[float], q: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    k = (len(ordered) - 1) * q / 100.0
+    lo, hi = math.floor(k), math.ceil(k)
+    if lo == hi:
+        return ordered[int(k)]
+    return ordered[lo] + (ordered[hi] - ordered[lo]) * (k - lo)
+
+
+def measure(fn: Callable[[], object], repeat: int) -> tuple[list[float], int, int]:
+    """Chạy `fn` `repeat` lần, trả về (timings giây, peak bytes, số block bộ nhớ còn sống sau 1 lần chạy).
+
+    Bộ nhớ được đo ở 1 lần chạy riêng có bật tracemalloc để không làm lệch thời gian.
+    """
+    timings = []
+    for _ in range(max(1, repeat)):
+        t0 = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - t0)
+
+    tracemalloc.start()
+    try:
+        before = tracemalloc.take_snapshot()
+        result = fn()
+        after = tracemalloc.take_snapshot()
+        _, peak = tracemalloc.get_traced_memory()
+        blocks = sum(s.count_diff for s in after.compare_to(before, 'filename') if s.count_diff > 0)
+        del result
+    finally:
+        tracemalloc.stop()
+    return timings, peak, blocks
+
+
+def summarize(name: str, timings: list[float], peak: int = 0, blocks: int = 0) -> dict:
+    total = sum(timings)
+    return {
+        'name': name,
+        'pages': len(timings),
+        'pages_per_s': len(timings) / total if total > 0 else 0.0,
+        'p50_ms': percentile(timings, 50) * 1000,
+        'p99_ms': percentile(timings, 99) * 1000,
+        'mean_ms': statistics.fmean(timings) * 1000 if timings else 0.0,
+        'peak_kib': peak / 1024,
+        'live_blocks': blocks,
+    }
+
+
+def print_table(rows: list[dict]):
+    print(f"{'benchmark':<44}{'pages':>7}{'pages/s':>10}{'p50 ms':>10}{'p99 ms':>10}{'peak KiB':>10}{'live blk':>10}")
+    for r in rows:
+        print(f"{r['name']:<44}{r['pages']:>7}{r['pages_per_s']:>10.1f}{r['p50_ms']:>10.2f}"
+              f"{r['p99_ms']:>10.2f}{r['peak_kib']:>10.0f}{r['live_blocks']:>10}")
+
+
+class FixtureServer:
+    """Serve thư mục fixtures qua http://127.0.0.1:<port> trong 1 thread nền.
+
+    Dùng khi cần origin http thật (href tương đối, shop_href) thay vì file://.
+    """
+
+    def __init__(self, directory: Path = FIXTURES, port: int = 0):
+        handler = functools.partial(_QuietHandler, directory=str(directory))
+        self.httpd = ThreadingHTTPServer(('127.0.0.1', port), handler)
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def url_for(self, page: Path) -> str:
+        return f"{self.base_url}/{page.relative_to(FIXTURES).as_posix()}"
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+class _QuietHandler(SimpleHTTPRequestHandler):
+    def log_message(self, format, *args):
+        logger.debug(format % args)
@@ -0,0 +1,503 @@
+"""WebDriver giả lập cho harness mô phỏng crawl (benchmarks/simulate_crawl.py).
+
+Chỉ cài phần API mà các worker đang dùng: get, refresh, execute_script, execute (ActionChains),
+find_element(s), page_source, current_url, add_cookie, execute_cdp_cmd (cookie), set_window_*, quit. Trang được lấy từ
+corpus benchmarks/fixtures theo bảng route, kèm mô hình độ trễ / lỗi có thể cấu hình:
+
+- mỗi lệnh WebDriver tốn `command_s` (round-trip HTTP tới chromedriver)
+- mỗi lần tải trang tốn lognormal(page_median_s, page_sigma) + per_inflight_s * số request
+  đang bay tới cùng host (mô phỏng server chậm dần khi tăng luồng)
+- `error_rate`: driver.get raise TimeoutException; `block_rate`: trả về trang "Lỗi tải"
+- `safe_rate` (request/s mỗi host và tài khoản, 0 = tắt): vượt ngưỡng này thì xác suất bị chặn tăng theo
+  tỉ lệ vượt (đo trên cửa sổ `rate_window_s` giây), mô phỏng anti-bot của Shopee / Google; tài khoản là
+  giá trị cookie SPC_U / SID của driver
+- `crash_after` (0 = tắt): renderer của mỗi driver crash sau khoảng chừng đó trang (±25%), từ đó mọi lệnh
+  raise WebDriverException 'tab crashed' như Chrome thật bị phình RAM
+
+Mọi sleep đều đi qua `time.sleep` nên harness có thể nén thời gian bằng cách patch hàm này.
+"""
+from dataclasses import dataclass, field
+import hashlib
+import itertools
+import json
+import math
+import random
+import re
+import threading
+import time
+import urllib.parse
+from pathlib import Path
+from typing import Callable, Optional
+
+import lxml.html
+
+try:
+    from selenium.common.exceptions import (JavascriptException, NoSuchElementException,
+                                            TimeoutException, WebDriverException)
+except Exception:  # selenium chưa cài: harness vẫn chạy được với exception chung
+    class WebDriverException(Exception):
+        pass
+
+    class JavascriptException(Exception):
+        pass
+
+    class NoSuchElementException(Exception):
+        pass
+
+    class TimeoutException(Exception):
+        pass
+
+from common import FIXTURES
+
+_BLOCK_TAGS = frozenset(('address', 'article', 'aside', 'blockquote', 'dd', 'div', 'dl', 'dt', 'fieldset',
+                         'figure', 'footer', 'form', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'header', 'hr',
+                         'li', 'main', 'nav', 'ol', 'p', 'pre', 'section', 'table', 'tr', 'ul', 'br'))
+_SKIP_TAGS = frozenset(('script', 'style', 'template', 'head', 'title', 'noscript'))
+_ENTER = '\ue007'
+
+MAPS_HOME_HTML = ('<html><head><title>Google Maps</title></head><body>'
+                  '<div id="searchbox"><input id="searchboxinput" aria-label="Tìm kiếm trên Google Maps"></div>'
+                  '<div id="scene"></div></body></html>')
+SHOPEE_HOME_HTML = ('<html><head><title>Shopee Mall</title></head><body>'
+                    '<div class="shopee-top"><a href="/mall">Shopee Mall</a></div><div class="mall-home"></div>'
+                    '</body></html>')
+BLANK_HTML = '<html><head></head><body></body></html>'
+
+
+@dataclass
+class LatencyModel:
+    page_median_s: float = 1.5
+    page_sigma: float = 0.4
+    command_s: float = 0.004
+    per_inflight_s: float = 0.05
+    error_rate: float = 0.01
+    block_rate: float = 0.0
+    safe_rate: float = 0.0
+    rate_window_s: float = 10.0
+    crash_after: int = 0
+    seed: int = 0
+
+    def page_delay(self, rng: random.Random, inflight: int) -> float:
+        base = rng.lognormvariate(math.log(max(self.page_median_s, 1e-6)), self.page_sigma)
+        return base + self.per_inflight_s * max(0, inflight - 1)
+
+    def block_probability(self, rate: float) -> float:
+        p = self.block_rate
+        if self.safe_rate > 0 and rate > self.safe_rate:
+            p += min(0.9, rate / self.safe_rate - 1.0)
+        return min(1.0, p)
+
+
+@dataclass
+class SimStats:
+    pages: int = 0
+    errors: int = 0
+    blocks: int = 0
+    crashes: int = 0
+    commands: int = 0
+    bytes_served: int = 0
+    per_host: dict = field(default_factory=dict)
+
+
+class SimSite:
+    """Trạng thái dùng chung giữa mọi FakeDriver của 1 lần chạy: route, số request đang bay, thống kê."""
+
+    def __init__(self, model: LatencyModel, routes: Optional[list] = None):
+        self.model = model
+        self.routes = routes if routes is not None else default_routes()
+        self.stats = SimStats()
+        self._lock = threading.Lock()
+        self._inflight: dict[str, int] = {}
+        self._recent: dict[str, list] = {}
+        self._seed = itertools.count(model.seed)
+
+    def new_rng(self) -> random.Random:
+        with self._lock:
+            return random.Random(next(self._seed))
+
+    def resolve(self, url: str) -> tuple[str, bool]:
+        """Trả về (html, is_block_capable) cho URL theo bảng route."""
+        for pattern, source, blockable in self.routes:
+            if re.search(pattern, url):
+                html = source(url) if callable(source) else source
+                return html, blockable
+        return BLANK_HTML, False
+
+    def request_rate(self, host: str) -> float:
+        """Ghi nhận 1 request tới host, trả về số request/s trong cửa sổ rate_window_s gần nhất."""
+        now = time.monotonic()
+        window = self.model.rate_window_s
+        with self._lock:
+            recent = self._recent.setdefault(host, [])
+            recent.append(now)
+            cut = 0
+            while cut < len(recent) and recent[cut] < now - window:
+                cut += 1
+            del recent[:cut]
+            return len(recent) / window
+
+    def enter(self, host: str) -> int:
+        with self._lock:
+            self._inflight[host] = self._inflight.get(host, 0) + 1
+            return self._inflight[host]
+
+    def leave(self, host: str):
+        with self._lock:
+            self._inflight[host] = max(0, self._inflight.get(host, 1) - 1)
+
+    def count(self, attr: str, n: int = 1, host: Optional[str] = None):
+        with self._lock:
+            setattr(self.stats, attr, getattr(self.stats, attr) + n)
+            if host is not None:
+                h = self.stats.per_host.setdefault(host, {'pages': 0, 'errors': 0, 'blocks': 0})
+                if attr in h:
+                    h[attr] += n
+
+
+def _read(path: Path) -> str:
+    try:
+        return path.read_text(encoding='utf-8')
+    except Exception:
+        return BLANK_HTML
+
+
+def _pick(pages: list[Path], key: str) -> str:
+    if not pages:
+        return BLANK_HTML
+    h = int(hashlib.md5(key.encode('utf-8')).hexdigest(), 16)
+    return _read(pages[h % len(pages)])
+
+
+def default_routes() -> list:
+    """Route mặc định: (regex URL, html hoặc callable(url) -> html, có thể bị chặn)."""
+    listing = sorted((FIXTURES / 'shopee_listing').glob('popular_page*.html'))
+    products = [p for p in sorted((FIXTURES / 'shopee_product').glob('*.html')) if 'error' not in p.name]
+    ggmap = sorted((FIXTURES / 'ggmap_search').glob('*.html'))
+
+    def listing_page(url: str) -> str:
+        q = urllib.parse.parse_qs(urllib.parse.urlparse(url).query)
+        try:
+            n = int((q.get('pageNumber') or ['1'])[0])
+        except Exception:
+            n = 1
+        return _read(listing[(n - 1) % len(listing)]) if listing else BLANK_HTML
+
+    return [
+        (r'google\.[^/]+/maps/search/', lambda url: _pick(ggmap, url), True),
+        (r'google\.[^/]+/maps/?(\?|$)', MAPS_HOME_HTML, False),
+        (r'shopee\.vn/mall/?$', SHOPEE_HOME_HTML, False),
+        (r'-cat\.\d+/popular', listing_page, True),
+        (r'-i\.\d+\.\d+', lambda url: _pick(products, url), True),
+    ]
+
+
+def block_page() -> str:
+    return _read(FIXTURES / 'shopee_product' / 'product_load_error.html')
+
+
+def visible_text(el) -> str:
+    """Xấp xỉ WebElement.text: bỏ script/style/display:none, xuống dòng giữa các block."""
+    parts: list[str] = []
+
+    def walk(node):
+        tag = node.tag if isinstance(node.tag, str) else ''
+        if not tag or tag in _SKIP_TAGS or 'display:none' in (node.get('style') or '').replace(' ', ''):
+            return
+        if tag in _BLOCK_TAGS:
+            parts.append('\n')
+        if node.text:
+            parts.append(node.text)
+        for child in node:
+            walk(child)
+            if child.tail:
+                parts.append(child.tail)
+        if tag in _BLOCK_TAGS:
+            parts.append('\n')
+
+    if isinstance(el.tag, str) and el.tag not in _SKIP_TAGS:
+        if el.text:
+            parts.append(el.text)
+        for child in el:
+            walk(child)
+            if child.tail:
+                parts.append(child.tail)
+
+    text = ''.join(parts).replace('\u00a0', ' ')
+    lines = [re.sub(r'[ \t\r\f\v]+', ' ', ln).strip() for ln in text.split('\n')]
+    return '\n'.join(ln for ln in lines if ln).strip()
+
+
+def _css_to_xpath(selector: str) -> str:
+    """CSS đơn giản (tag, .class, #id, tag.class, tag[attr="v"]) -> XPath."""
+    try:
+        from lxml.cssselect import CSSSelector
+        return CSSSelector(selector).path
+    except Exception:
+        pass
+    m = re.fullmatch(r'\s*([a-zA-Z0-9*]*)((?:[.#][\w-]+)*)((?:\[[^\]]+\])*)\s*', selector)
+    if not m:
+        raise JavascriptException(f'CSS selector không hỗ trợ: {selector}')
+    tag, rest, attrs = m.group(1) or '*', m.group(2), m.group(3)
+    conds = []
+    for kind, name in re.findall(r'([.#])([\w-]+)', rest):
+        if kind == '#':
+            conds.append(f"@id='{name}'")
+        else:
+            conds.append(f"contains(concat(' ', normalize-space(@class), ' '), ' {name} ')")
+    for name, value in re.findall(r'\[\s*([\w-]+)\s*(?:=\s*["\']?([^"\'\]]*)["\']?)?\s*\]', attrs):
+        conds.append(f"@{name}='{value}'" if value else f'@{name}')
+    return f"descendant-or-self::{tag}" + ''.join(f'[{c}]' for c in conds)
+
+
+def _locator_to_xpath(by: str, value: str) -> str:
+    if by == 'xpath':
+        return value
+    if by == 'css selector':
+        return _css_to_xpath(value)
+    if by == 'tag name':
+        return f'.//{value}'
+    if by == 'id':
+        return f".//*[@id='{value}']"
+    if by == 'name':
+        return f".//*[@name='{value}']"
+    if by == 'class name':
+        return f".//*[contains(concat(' ', normalize-space(@class), ' '), ' {value} ')]"
+    raise JavascriptException(f'Locator không hỗ trợ: {by}')
+
+
+class FakeElement:
+    def __init__(self, driver: 'FakeDriver', node):
+        self._driver = driver
+        self._node = node
+        self.id = f'fake-{id(node)}'
+
+    @property
+    def tag_name(self) -> str:
+        return self._node.tag
+
+    @property
+    def text(self) -> str:
+        self._driver._roundtrip()
+        return visible_text(self._node)
+
+    def get_attribute(self, name: str):
+        self._driver._roundtrip()
+        value = self._node.get(name)
+        if name in ('href', 'src') and value is not None:
+            return urllib.parse.urljoin(self._driver.current_url, value)
+        return value
+
+    def get_dom_attribute(self, name: str):
+        self._driver._roundtrip()
+        return self._node.get(name)
+
+    def is_displayed(self) -> bool:
+        self._driver._roundtrip()
+        return 'display:none' not in (self._node.get('style') or '').replace(' ', '')
+
+    def is_enabled(self) -> bool:
+        self._driver._roundtrip()
+        return self._node.get('disabled') is None
+
+    def click(self):
+        self._driver._roundtrip()
+
+    def send_keys(self, *values):
+        self._driver._roundtrip()
+        self._driver._typed(''.join(str(v) for v in values))
+
+    def find_element(self, by='id', value=None):
+        return self._driver._find(self._node, by, value, many=False)
+
+    def find_elements(self, by='id', value=None):
+        return self._driver._find(self._node, by, value, many=True)
+
+
+class FakeDriver:
+    """Thay thế uc.Chrome trong mô phỏng. Thread-safe theo kiểu 1 driver / 1 thread như worker thật."""
+
+    def __init__(self, site: SimSite, implicit_wait: float = 10.0,
+                 script_handlers: Optional[dict[str, Callable]] = None):
+        self.site = site
+        self.model = site.model
+        self.rng = site.new_rng()
+        self.implicit_wait = implicit_wait
+        self.script_handlers = script_handlers or {}
+        self.current_url = 'about:blank'
+        self.page_source = BLANK_HTML
+        self.cookies: list[dict] = []
+        self._tree = lxml.html.document_fromstring(BLANK_HTML)
+        self._typed_buffer = ''
+        self._in_script = False
+        self.quit_called = False
+        self.pages_loaded = 0
+        self.crashed = False
+        self.crash_at = int(self.model.crash_after * self.rng.uniform(0.75, 1.25)) if self.model.crash_after > 0 else 0
+
+    # ---------------------------------------------------------------- internals
+    def _roundtrip(self):
+        if self._in_script:
+            return
+        if self.crashed:
+            raise WebDriverException('unknown error: session deleted because of page crash\nfrom tab crashed')
+        self.site.count('commands')
+        if self.model.command_s > 0:
+            time.sleep(self.model.command_s)
+
+    def _load(self, url: str):
+        host = urllib.parse.urlparse(url).netloc or 'local'
+        inflight = self.site.enter(host)
+        try:
+            time.sleep(self.model.page_delay(self.rng, inflight))
+        finally:
+            self.site.leave(host)
+
+        if self.rng.random() < self.model.error_rate:
+            self.site.count('errors', host=host)
+            raise TimeoutException(f'Timed out receiving message from renderer: {url}')
+
+        html, blockable = self.site.resolve(url)
+        rate = self.site.request_rate(f'{host}|{self._account()}') if blockable else 0.0
+        if blockable and self.rng.random() < self.model.block_probability(rate):
+            self.site.count('blocks', host=host)
+            html = block_page()
+
+        self.current_url = url
+        self.page_source = html
+        try:
+            self._tree = lxml.html.document_fromstring(html or BLANK_HTML)
+        except Exception:
+            self._tree = lxml.html.document_fromstring(BLANK_HTML)
+        self.site.count('pages', host=host)
+        self.site.count('bytes_served', len(html.encode('utf-8')))
+        self.pages_loaded += 1
+        if self.crash_at and self.pages_loaded >= self.crash_at:
+            self.crashed = True
+            self.site.count('crashes')
+
+    def _account(self) -> str:
+        return next((str(c.get('value')) for c in self.cookies if c.get('name') in ('SPC_U', 'SID')), '')
+
+    def _find(self, node, by, value, many: bool):
+        self._roundtrip()
+        xpath = _locator_to_xpath(by, value)
+        if by == 'css selector' and node is not self._tree:
+            xpath = xpath.replace('descendant-or-self::', './/', 1)
+        try:
+            found = [n for n in node.xpath(xpath) if hasattr(n, 'tag')]
+        except Exception as e:
+            raise JavascriptException(f'XPath lỗi {xpath}: {e}')
+        if many:
+            return [FakeElement(self, n) for n in found]
+        if not found:
+            if self.implicit_wait > 0 and not self._in_script:
+                time.sleep(self.implicit_wait)
+            raise NoSuchElementException(f'no such element: {by}={value}')
+        return FakeElement(self, found[0])
+
+    def _typed(self, keys: str):
+        for ch in keys:
+            if ch == _ENTER:
+                query = self._typed_buffer.strip()
+                self._typed_buffer = ''
+                if query and 'google.' in self.current_url:
+                    self._load(f"https://www.google.com/maps/search/{urllib.parse.quote_plus(query)}")
+            else:
+                self._typed_buffer += ch
+
+    # ------------------------------------------------------------ WebDriver API
+    def get(self, url: str):
+        self._roundtrip()
+        self._load(url)
+
+    def refresh(self):
+        self._roundtrip()
+        self._load(self.current_url)
+
+    def execute_script(self, script: str, *args):
+        self._roundtrip()
+        handler = self.script_handlers.get(script)
+        if handler is not None:
+            self._in_script = True
+            try:
+                return handler(self, *args)
+            finally:
+                self._in_script = False
+        if 'availWidth' in script:
+            return 1920
+        if 'availHeight' in script:
+            return 1080
+        if any(k in script for k in ('scrollBy', 'scrollTo', 'zoom', 'scrollIntoView', '.focus()', '.click()')):
+            return None
+        raise JavascriptException('FakeDriver không chạy được script này')
+
+    def execute(self, command, params=None):
+        """Nhận lệnh W3C actions từ ActionChains; gom phím đã gõ để mô phỏng ô tìm kiếm."""
+        self._roundtrip()
+        for source in (params or {}).get('actions', []) or []:
+            if source.get('type') != 'key':
+                continue
+            for action in source.get('actions', []):
+                if action.get('type') == 'keyDown':
+                    self._typed(action.get('value', ''))
+        return {'value': None}
+
+    def find_element(self, by='id', value=None):
+        return self._find(self._tree, by, value, many=False)
+
+    def find_elements(self, by='id', value=None):
+        return self._find(self._tree, by, value, many=True)
+
+    def add_cookie(self, cookie: dict):
+        self._roundtrip()
+        if not isinstance(cookie, dict) or 'name' not in cookie:
+            raise JavascriptException('invalid cookie')
+        self.cookies.append(cookie)
+
+    def get_cookies(self) -> list[dict]:
+        self._roundtrip()
+        return list(self.cookies)
+
+    def delete_all_cookies(self):
+        self._roundtrip()
+        self.cookies = []
+
+    def execute_cdp_cmd(self, cmd: str, params: dict):
+        """Chỉ hỗ trợ các lệnh cookie của DevTools; lệnh khác lỗi như driver không có CDP."""
+        self._roundtrip()
+        if cmd == 'Network.setCookies':
+            for cookie in (params or {}).get('cookies', []):
+                if 'name' not in cookie:
+                    raise JavascriptException('invalid cookie')
+                self.cookies.append(dict(cookie))
+            return {}
+        if cmd == 'Network.clearBrowserCookies':
+            self.cookies = []
+            return {}
+        raise JavascriptException(f'FakeDriver không hỗ trợ lệnh CDP {cmd}')
+
+    def set_window_size(self, width, height):
+        self._roundtrip()
+
+    def set_window_position(self, x, y):
+        self._roundtrip()
+
+    def set_page_load_timeout(self, seconds):
+        pass
+
+    def implicitly_wait(self, seconds):
+        self.implicit_wait = seconds
+
+    def quit(self):
+        self.quit_called = True
+
+
+def dom_script_handler(extract: Callable) -> Callable:
+    """Biến 1 hàm trích xuất nhánh DOM thành handler cho script JS tương ứng.
+
+    Hàm DOM chạy bên trong `_in_script` nên chỉ tính 1 round-trip, giống script thật.
+    Trả về JSON đúng dạng script trong trang trả về.
+    """
+    def handler(driver: FakeDriver, *args):
+        return json.dumps(extract(driver, *args), ensure_ascii=False)
+    return handler
@@ -0,0 +1,59 @@
+"""Ghi lại page_source thật vào corpus benchmarks/fixtures để replay offline.
+
+Mở URL bằng driver đã load cookie (giống worker thật), chờ trang render rồi lưu DOM đã
+serialize. Chỉ dùng khi cần làm mới corpus; benchmark không bao giờ chạm mạng.
+
+    python benchmarks/record_fixtures.py shopee_listing "https://shopee.vn/mall/...-cat.11035478/popular?pageNumber=1" popular_page1
+    python benchmarks/record_fixtures.py ggmap_search "https://www.google.com/maps/search/adidas" feed_adidas
+"""
+import argparse
+import logging
+import sys
+import time
+
+from common import FIXTURES
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+KINDS = ('shopee_listing', 'shopee_product', 'ggmap_search')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('kind', choices=KINDS)
+    parser.add_argument('url')
+    parser.add_argument('name', help='tên file (không cần .html)')
+    parser.add_argument('--wait', type=float, default=8.0, help='số giây chờ trang render')
+    args = parser.parse_args()
+
+    from funcs.setup_driver import setup_driver
+    from funcs.load_cookies_to_driver import load_cookies_to_driver
+    from funcs.fake_agent import random_scroll
+
+    driver = setup_driver(profile_idx=98)
+    if driver is None:
+        return 1
+
+    try:
+        cookie_type = 'ggmap' if args.kind == 'ggmap_search' else 'shopee'
+        driver.get('https://www.google.com/maps' if cookie_type == 'ggmap' else 'https://shopee.vn/mall')
+        load_cookies_to_driver(driver, type=cookie_type)
+        driver.get(args.url)
+        time.sleep(args.wait)
+        random_scroll(driver, min_scrolls=3, max_scrolls=6)
+
+        out = FIXTURES / args.kind / f"{args.name.removesuffix('.html')}.html"
+        out.parent.mkdir(parents=True, exist_ok=True)
+        out.write_text(driver.page_source, encoding='utf-8')
+        logger.info(f'Đã lưu {out}')
+    finally:
+        try:
+            driver.quit()
+        except Exception:
+            pass
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
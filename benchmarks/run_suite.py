@@ -0,0 +1,131 @@
+"""Bộ micro-benchmark offline cho 3 extractor: get_infor_product, get_infor_shop, parse_ggmap_results.
+
+Replay corpus trong benchmarks/fixtures qua:
+- parse_ggmap_results: đọc thẳng page_source từ file, mỗi backend đang cài 1 dòng
+- get_infor_product / get_infor_shop: Chrome headless local mở fixture qua localhost (hoặc file://)
+
+Báo cáo pages/s, p50/p99 latency, peak bộ nhớ Python (tracemalloc) và số block còn sống
+sau mỗi lần gọi. Có thể lưu kết quả ra JSON và so với baseline để bắt regression mà không cần mạng:
+
+    python benchmarks/run_suite.py --output bench.json
+    python benchmarks/run_suite.py --baseline bench.json --max-regression 0.25
+"""
+from pathlib import Path
+import argparse
+import json
+import logging
+import sys
+
+from common import FixtureServer, fixture_pages, measure, print_table, summarize
+
+from find_shop_on_ggmap import parse_ggmap_results
+from funcs.ggmap_parsers import available_backends
+from get_product_in_category import get_infor_product
+from get_shop_sell_product import get_infor_shop
+
+logging.basicConfig(level=logging.WARNING)
+logger = logging.getLogger(__name__)
+
+
+def bench_ggmap(repeat: int) -> list[dict]:
+    rows = []
+    pages = [p.read_text(encoding='utf-8') for p in fixture_pages('ggmap_search')]
+    if not pages:
+        return rows
+
+    for backend in available_backends():
+        timings: list[float] = []
+        peak = blocks = 0
+        for source in pages:
+            t, p, b = measure(lambda: parse_ggmap_results(source, max_items=5, backend=backend), repeat)
+            timings.extend(t)
+            peak = max(peak, p)
+            blocks = max(blocks, b)
+        rows.append(summarize(f'parse_ggmap_results[{backend}]', timings, peak, blocks))
+    return rows
+
+
+def bench_browser(driver, url_of, repeat: int) -> list[dict]:
+    rows = []
+    suites = (
+        ('get_infor_product', 'shopee_listing', get_infor_product),
+        ('get_infor_shop', 'shopee_product', get_infor_shop),
+    )
+    for name, kind, extractor in suites:
+        pages = fixture_pages(kind)
+        if not pages:
+            continue
+        for mode in ('js', 'dom'):
+            timings: list[float] = []
+            peak = blocks = 0
+            for page in pages:
+                driver.get(url_of(page))
+                t, p, b = measure(lambda: extractor(driver, mode=mode), repeat)
+                timings.extend(t)
+                peak = max(peak, p)
+                blocks = max(blocks, b)
+            rows.append(summarize(f'{name}[{mode}]', timings, peak, blocks))
+    return rows
+
+
+def compare(rows: list[dict], baseline_path: Path, max_regression: float) -> int:
+    try:
+        baseline = {r['name']: r for r in json.loads(baseline_path.read_text(encoding='utf-8'))}
+    except Exception as e:
+        logger.error(f'Không đọc được baseline {baseline_path}: {e}')
+        return 1
+
+    regressions = 0
+    for r in rows:
+        old = baseline.get(r['name'])
+        if not old or not old.get('p50_ms'):
+            continue
+        ratio = r['p50_ms'] / old['p50_ms'] - 1
+        if ratio > max_regression:
+            regressions += 1
+            print(f"REGRESSION {r['name']}: p50 {old['p50_ms']:.2f} -> {r['p50_ms']:.2f} ms (+{ratio:.0%})")
+    return 1 if regressions else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=10, help='số lần chạy extractor trên mỗi trang')
+    parser.add_argument('--no-browser', action='store_true', help='chỉ chạy parse_ggmap_results')
+    parser.add_argument('--serve', choices=('http', 'file'), default='http', help='cách mở fixture trong Chrome')
+    parser.add_argument('--output', type=Path, help='ghi kết quả ra file JSON')
+    parser.add_argument('--baseline', type=Path, help='so sánh với file JSON của lần chạy trước')
+    parser.add_argument('--max-regression', type=float, default=0.25, help='ngưỡng tăng p50 cho phép (0.25 = 25%%)')
+    args = parser.parse_args()
+
+    rows = bench_ggmap(args.repeat)
+
+    if not args.no_browser:
+        from funcs.setup_driver import setup_driver
+
+        driver = setup_driver(profile_idx=99, headless=True)
+        if driver is None:
+            logger.error('Không khởi tạo được Chrome, bỏ qua benchmark Selenium')
+        else:
+            try:
+                if args.serve == 'http':
+                    with FixtureServer() as server:
+                        rows += bench_browser(driver, server.url_for, args.repeat)
+                else:
+                    rows += bench_browser(driver, lambda p: p.as_uri(), args.repeat)
+            finally:
+                try:
+                    driver.quit()
+                except Exception:
+                    pass
+
+    print_table(rows)
+
+    if args.output:
+        args.output.write_text(json.dumps(rows, ensure_ascii=False, indent=2), encoding='utf-8')
+    if args.baseline:
+        return compare(rows, args.baseline, args.max_regression)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,323 @@
+"""Mô phỏng crawl end-to-end với FakeDriver để đo khả năng scale theo số luồng.
+
+Mỗi kịch bản (stage, số worker) chạy trong 1 process riêng trên 1 bản sao sandbox của các
+script (để output không ghi vào repo và os._exit của worker không giết harness). Trong process
+đó `funcs.setup_driver.setup_driver` được thay bằng FakeDriver, `time.sleep` được nén theo
+--time-scale, rồi gọi nguyên `main(num_threads=N)` của script thật.
+
+    python benchmarks/simulate_crawl.py --stage shops --workers 1,5,10,20,50 --items 300
+    python benchmarks/simulate_crawl.py --stage maps --error-rate 0.05 --output maps_curve.csv
+    python benchmarks/simulate_crawl.py --stage pipeline --workers 1,3 --items 10
+    python benchmarks/simulate_crawl.py --stage shops --workers 5,10 --safe-rate 0.5
+    python benchmarks/simulate_crawl.py --stage shops --workers 5 --safe-rate 0.3 --accounts 1,3,5
+    python benchmarks/simulate_crawl.py --stage shops --workers 5 --items 600 --crash-after 80
+
+Thời gian mô phỏng = thời gian thật / time-scale (CPU của parser cũng bị phóng đại theo, nên
+với time-scale rất nhỏ các số liệu CPU-bound sẽ bi quan hơn thực tế).
+"""
+from pathlib import Path
+import argparse
+import csv
+import json
+import logging
+import multiprocessing
+import random
+import shutil
+import sys
+import tempfile
+import time
+import types
+
+from common import ROOT
+
+logger = logging.getLogger(__name__)
+
+BENCH_DIR = Path(__file__).resolve().parent
+
+# stage -> (module script, tham số thêm cho main)
+STAGES = {
+    'products': ('get_product_in_category', {'page_num': 2}),
+    'shops': ('get_shop_sell_product', {}),
+    'maps': ('find_shop_on_ggmap', {}),
+    'pipeline': ('pipeline', {'page_num': 2}),
+}
+
+SAMPLE_COOKIES = [
+    {'name': 'SPC_F', 'value': 'sim', 'domain': '.shopee.vn', 'path': '/', 'expirationDate': 4102444800},
+    {'name': 'SPC_EC', 'value': 'sim', 'domain': '.shopee.vn', 'path': '/', 'hostOnly': False},
+]
+
+
+# ------------------------------------------------------------------- workload
+def _skewed_sizes(total: int, groups: int, rng: random.Random) -> list[int]:
+    """Chia `total` item vào `groups` nhóm lệch kiểu Zipf (vài category rất lớn, nhiều category nhỏ)."""
+    weights = [1.0 / (i + 1) ** 0.8 for i in range(groups)]
+    rng.shuffle(weights)
+    s = sum(weights)
+    sizes = [max(1, int(total * w / s)) for w in weights]
+    sizes[0] += total - sum(sizes)
+    return [max(0, x) for x in sizes]
+
+
+def build_sandbox(base: Path, stage: str, items: int, seed: int = 0, accounts: int = 0) -> Path:
+    """Copy các script vào `base` và sinh workload giả cho stage.
+
+    accounts > 0: sinh thêm cookies/{shopee,ggmap}/acc{i}.json cho cookie pool (mỗi bộ 1 SPC_U / SID riêng).
+    """
+    rng = random.Random(seed)
+    for name in ('get_product_in_category.py', 'get_shop_sell_product.py', 'find_shop_on_ggmap.py', 'pipeline.py'):
+        shutil.copy2(ROOT / name, base / name)
+    shutil.copytree(ROOT / 'funcs', base / 'funcs', ignore=shutil.ignore_patterns('__pycache__'))
+    (base / 'config.py').write_text('# config cho sandbox mô phỏng\n', encoding='utf-8')
+
+    for d in ('categories', 'cookies', 'products', 'shops', 'ggmap_search', 'logs'):
+        (base / d).mkdir(exist_ok=True)
+    for kind in ('shopee', 'ggmap'):
+        (base / 'cookies' / f'{kind}_cookies.json').write_text(json.dumps(SAMPLE_COOKIES), encoding='utf-8')
+        if accounts > 0:
+            (base / 'cookies' / kind).mkdir(exist_ok=True)
+        for a in range(accounts):
+            account_cookie = {'name': 'SPC_U' if kind == 'shopee' else 'SID', 'value': f'acc{a}',
+                              'domain': '.shopee.vn' if kind == 'shopee' else '.google.com', 'path': '/'}
+            (base / 'cookies' / kind / f'acc{a}.json').write_text(json.dumps(SAMPLE_COOKIES + [account_cookie]),
+                                                                  encoding='utf-8')
+
+    if stage in ('products', 'pipeline'):
+        with (base / 'categories' / 'category_hrefs.csv').open('w', encoding='utf-8', newline='') as f:
+            w = csv.writer(f)
+            w.writerow(['category_hrefs'])
+            for i in range(items):
+                w.writerow([f'https://shopee.vn/mall/Sim-Category-{i}-cat.{11000000 + i}'])
+    elif stage == 'shops':
+        for c, size in enumerate(_skewed_sizes(items, max(1, items // 25), rng)):
+            with (base / 'products' / f'Sim Category {c}.csv').open('w', encoding='utf-8-sig', newline='') as f:
+                w = csv.DictWriter(f, fieldnames=['href', 'name', 'status'])
+                w.writeheader()
+                for j in range(size):
+                    shop = rng.choice(range(1000, 1000 + max(5, items // 4)))
+                    w.writerow({'href': f'https://shopee.vn/Sim-Item-{c}-{j}-i.{shop}.{30000000 + c * 10000 + j}',
+                                'name': f'Sim Item {c}-{j}', 'status': 0})
+    elif stage == 'maps':
+        for c, size in enumerate(_skewed_sizes(items, max(1, items // 20), rng)):
+            with (base / 'shops' / f'Sim Category {c}.csv').open('w', encoding='utf-8', newline='') as f:
+                w = csv.DictWriter(f, fieldnames=['shop_id', 'shop_name', 'shop_href'])
+                w.writeheader()
+                for j in range(size):
+                    w.writerow({'shop_id': f'{c}{j}', 'shop_name': f'Sim Shop {c}-{j} Official Store',
+                                'shop_href': f'https://shopee.vn/simshop{c}{j}'})
+    return base
+
+
+def count_completed(base: Path, stage: str) -> int:
+    """Số item đã xong, đếm từ output trên đĩa (vẫn đúng khi process bị os._exit)."""
+    total = 0
+    if stage == 'products':
+        for fp in (base / 'products').glob('*.csv'):
+            with fp.open('r', encoding='utf-8-sig', newline='') as f:
+                total += sum(1 for _ in csv.DictReader(f))
+    elif stage == 'shops':
+        for fp in (base / 'products').glob('*.csv'):
+            with fp.open('r', encoding='utf-8-sig', newline='') as f:
+                total += sum(1 for r in csv.DictReader(f) if str(r.get('status') or '').strip() == '1')
+    elif stage in ('maps', 'pipeline'):
+        for fp in (base / 'ggmap_search').glob('*.csv'):
+            with fp.open('r', encoding='utf-8', newline='') as f:
+                total += sum(1 for _ in csv.DictReader(f))
+    return total
+
+
+# --------------------------------------------------------------------- child
+def _script_handlers(module) -> dict:
+    """Map script JS của extractor -> chính nhánh DOM của nó chạy trên FakeDriver."""
+    from fake_driver import dom_script_handler
+
+    handlers = {}
+    js = getattr(module, '_PRODUCT_CARDS_JS', None)
+    dom = getattr(module, '_get_infor_product_dom', None)
+    if js and dom:
+        def products(driver):
+            found = bool(driver._tree.xpath("//div[contains(@class,'ofs-recommend-page')]"))
+            items = dom(driver) if found else []
+            return {'found': found, 'items': [{'href': p['href'], 'name': p['name']} for p in items]}
+        handlers[js] = dom_script_handler(products)
+
+    js = getattr(module, '_SHOP_INFO_JS', None)
+    dom = getattr(module, '_get_infor_shop_dom', None)
+    if js and dom:
+        def shop(driver, *args):
+            shops = dom(driver)
+            return shops[0] if shops else {'shop_name': '', 'shop_href': '', 'shop_id': ''}
+        handlers[js] = dom_script_handler(shop)
+
+    js = getattr(module, '_GGMAP_RESULTS_JS', None)
+    parse = getattr(module, 'parse_ggmap_results', None)
+    if js and parse:
+        def ggmap_results(driver, max_items=5):
+            return {'found': True, 'items': parse(driver.page_source, max_items=max_items)}
+        handlers[js] = dom_script_handler(ggmap_results)
+    return handlers
+
+
+def _child(sandbox: str, stage: str, workers: int, model_kwargs: dict, time_scale: float, result_path: str):
+    import os
+
+    logging.basicConfig(level=logging.WARNING)
+    os.chdir(sandbox)
+    sys.path.insert(0, sandbox)
+    sys.path.insert(1, str(BENCH_DIR))
+
+    real_sleep = time.sleep
+    time.sleep = lambda s: real_sleep(max(0.0, s) * time_scale)
+    # đồng hồ ảo chạy nhanh theo cùng tỉ lệ để các token bucket / timeout tính bằng monotonic khớp với sleep
+    real_monotonic = time.monotonic
+    origin = real_monotonic()
+    time.monotonic = lambda: origin + (real_monotonic() - origin) / time_scale
+
+    from fake_driver import FakeDriver, LatencyModel, SimSite
+
+    site = SimSite(LatencyModel(**model_kwargs))
+    module_name, main_kwargs = STAGES[stage]
+
+    import funcs
+    fake_setup = types.ModuleType('funcs.setup_driver')
+    handlers: dict = {}
+    drivers: list = []
+
+    def setup_driver(profile_idx: int = 0, headless: bool = False, user_data_base: str = None, **kwargs):
+        d = FakeDriver(site, implicit_wait=10.0, script_handlers=handlers)
+        drivers.append(d)
+        return d
+
+    fake_setup.setup_driver = setup_driver
+    sys.modules['funcs.setup_driver'] = fake_setup
+    funcs.setup_driver = fake_setup
+
+    module = __import__(module_name)
+    for name in (module_name, 'get_product_in_category', 'get_shop_sell_product', 'find_shop_on_ggmap'):
+        handlers.update(_script_handlers(__import__(name)))
+
+    t0 = time.perf_counter()
+    module.main(num_threads=workers, **main_kwargs)
+    wall = time.perf_counter() - t0
+
+    stats = site.stats
+    Path(result_path).write_text(json.dumps({
+        'wall_s': wall,
+        'drivers': len(drivers),
+        'pages': stats.pages,
+        'errors': stats.errors,
+        'blocks': stats.blocks,
+        'crashes': stats.crashes,
+        'commands': stats.commands,
+        'bytes_served': stats.bytes_served,
+    }), encoding='utf-8')
+
+
+# -------------------------------------------------------------------- parent
+def run_scenario(stage: str, workers: int, items: int, model_kwargs: dict,
+                 time_scale: float, timeout_s: float, keep: bool = False, accounts: int = 0) -> dict:
+    tmp = Path(tempfile.mkdtemp(prefix=f'sim_{stage}_{workers}_'))
+    try:
+        build_sandbox(tmp, stage, items, seed=model_kwargs.get('seed', 0), accounts=accounts)
+        result_path = tmp / '_sim_result.json'
+
+        ctx = multiprocessing.get_context('spawn')
+        proc = ctx.Process(target=_child, args=(str(tmp), stage, workers, model_kwargs, time_scale, str(result_path)))
+        t0 = time.perf_counter()
+        proc.start()
+        proc.join(timeout_s)
+        if proc.is_alive():
+            proc.kill()
+            proc.join()
+            status = 'timeout'
+        else:
+            status = 'ok' if result_path.exists() else f'aborted (exit {proc.exitcode})'
+        wall = time.perf_counter() - t0
+
+        row = {'stage': stage, 'workers': workers, 'accounts': accounts, 'status': status, 'items': items}
+        if result_path.exists():
+            row.update(json.loads(result_path.read_text(encoding='utf-8')))
+        else:
+            row['wall_s'] = wall
+        row['completed'] = count_completed(tmp, stage)
+        row['sim_s'] = row['wall_s'] / time_scale if time_scale > 0 else row['wall_s']
+        row['items_per_sim_min'] = 60 * row['completed'] / row['sim_s'] if row['sim_s'] > 0 else 0.0
+        return row
+    finally:
+        if keep:
+            logger.warning(f'Giữ sandbox tại {tmp}')
+        else:
+            shutil.rmtree(tmp, ignore_errors=True)
+
+
+def print_curve(rows: list[dict]):
+    print(f"{'workers':>8}{'acc':>5}{'status':>18}{'done':>7}{'sim s':>10}{'items/min':>11}{'speedup':>9}{'eff':>7}"
+          f"{'pages':>7}{'err':>5}{'block':>6}{'crash':>6}")
+    base = next((r['items_per_sim_min'] for r in rows if r['items_per_sim_min'] > 0), 0.0)
+    base_workers = next((r['workers'] for r in rows if r['items_per_sim_min'] > 0), 1)
+    best = max((r['items_per_sim_min'] for r in rows), default=0.0) or 1.0
+    for r in rows:
+        speedup = r['items_per_sim_min'] / base if base else 0.0
+        eff = speedup * base_workers / r['workers'] if r['workers'] else 0.0
+        bar = '#' * int(30 * r['items_per_sim_min'] / best)
+        print(f"{r['workers']:>8}{r.get('accounts', 0):>5}{r['status']:>18}{r['completed']:>7}{r['sim_s']:>10.1f}{r['items_per_sim_min']:>11.1f}"
+              f"{speedup:>8.2f}x{eff:>7.0%}{r.get('pages', 0):>7}{r.get('errors', 0):>5}{r.get('blocks', 0):>6}{r.get('crashes', 0):>6}  {bar}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--stage', choices=sorted(STAGES), default='shops')
+    parser.add_argument('--workers', default='1,5,10,20,50', help='danh sách số luồng, cách nhau bởi dấu phẩy')
+    parser.add_argument('--items', type=int, default=200, help='số category / product / shop của workload')
+    parser.add_argument('--time-scale', type=float, default=0.02, help='hệ số nén time.sleep và độ trễ')
+    parser.add_argument('--page-median', type=float, default=1.5, help='median thời gian tải trang (giây)')
+    parser.add_argument('--page-sigma', type=float, default=0.4)
+    parser.add_argument('--command-ms', type=float, default=4.0, help='độ trễ mỗi lệnh WebDriver (ms)')
+    parser.add_argument('--per-inflight-ms', type=float, default=50.0,
+                        help='độ trễ thêm cho mỗi request đang bay tới cùng host (ms)')
+    parser.add_argument('--error-rate', type=float, default=0.01)
+    parser.add_argument('--block-rate', type=float, default=0.0)
+    parser.add_argument('--safe-rate', type=float, default=0.0,
+                        help='request/s mỗi host trước khi bị chặn nhiều dần (0 = tắt)')
+    parser.add_argument('--accounts', default='0',
+                        help='số bộ cookie cho cookie pool, cách nhau bởi dấu phẩy để so sánh (0 = 1 file cookie như cũ)')
+    parser.add_argument('--crash-after', type=int, default=0,
+                        help='renderer của mỗi driver crash sau khoảng N trang (0 = không crash)')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--timeout', type=float, default=600.0, help='timeout mỗi kịch bản (giây thật)')
+    parser.add_argument('--output', type=Path, help='ghi đường cong ra CSV')
+    parser.add_argument('--keep-sandbox', action='store_true')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    model_kwargs = {
+        'page_median_s': args.page_median,
+        'page_sigma': args.page_sigma,
+        'command_s': args.command_ms / 1000.0,
+        'per_inflight_s': args.per_inflight_ms / 1000.0,
+        'error_rate': args.error_rate,
+        'block_rate': args.block_rate,
+        'safe_rate': args.safe_rate,
+        'crash_after': args.crash_after,
+        'seed': args.seed,
+    }
+
+    rows = []
+    for accounts in [int(x) for x in args.accounts.split(',') if x.strip()]:
+        for n in [int(x) for x in args.workers.split(',') if x.strip()]:
+            logger.info(f'Chạy stage={args.stage} workers={n} accounts={accounts}')
+            rows.append(run_scenario(args.stage, n, args.items, model_kwargs, args.time_scale,
+                                     args.timeout, keep=args.keep_sandbox, accounts=accounts))
+
+    print_curve(rows)
+
+    if args.output:
+        with args.output.open('w', encoding='utf-8', newline='') as f:
+            w = csv.DictWriter(f, fieldnames=list(rows[0].keys()) if rows else ['stage'], extrasaction='ignore')
+            w.writeheader()
+            w.writerows(rows)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,4 +1,5 @@
 from pathlib import Path
+import json
 import logging
 import threading
 import time
@@ -13,244 +14,582 @@ except Exception:
 
 logger = logging.getLogger(__name__)
 
+# Preset chặn ảnh/font/video/tracker qua CDP cho trang tìm kiếm Google Maps (None = tải đầy đủ như trình duyệt thường)
+RESOURCE_POLICY = 'ggmap_search'
 
-def shop_chunking(file_path: str | Path | None = None, num_threads: int | None = None):
+# Cache kết quả tìm kiếm theo tên shop đã chuẩn hoá (funcs.ggmap_cache), dùng lại giữa các lần chạy
+GGMAP_CACHE_FILE = 'cache/ggmap_queries.json'
+GGMAP_CACHE_TTL_DAYS = 30
+GGMAP_CACHE_MAX_ENTRIES = 200_000
+
+# Gom các tên shop gần trùng (funcs.name_clusters) trước khi chạy, mỗi cụm chỉ tìm trên Maps 1 lần
+GGMAP_CLUSTER_NAMES = True
+GGMAP_CLUSTER_THRESHOLD = 0.8
+
+# Cách tìm shop trên Maps: 'url' (mở thẳng /maps/search/<tên shop>, không ra kết quả thì gõ searchbox)
+# hoặc 'type' (mở trang chủ rồi gõ tên vào searchbox như người dùng)
+SEARCH_MODE = 'url'
+
+# Cách lấy kết quả: 'js' (lọc ngay trong trang, chỉ trả về top-N {name, href}) hoặc
+# 'source' (kéo toàn bộ page_source về rồi parse bằng parse_ggmap_results như cũ)
+EXTRACT_MODE = 'js'
+
+# Nhịp điều hướng: 'adaptive' = token bucket dùng chung theo domain, tự tăng/giảm tốc (funcs.rate_limiter);
+# 'sleep' = random_sleep cố định mỗi truy vấn như cũ
+PACING = 'adaptive'
+
+# Nạp cookie: 'cdp' = 1 lệnh Network.setCookies trước lần điều hướng đầu tiên (không cần mở trang chủ,
+# chờ và refresh); 'selenium' = mở trang chủ, add_cookie rồi refresh như cũ (tự dùng khi CDP lỗi)
+COOKIE_MODE = 'cdp'
+
+
+def read_shop_names_from_csv(path):
+    names = []
     try:
-        base = Path(file_path) if file_path else Path("shops")
-    except Exception:
-        base = Path("shops")
+        with open(path, newline='', encoding='utf-8') as f:
+            reader = csv.DictReader(f)
+            for row in reader:
+                if not isinstance(row, dict):
+                    continue
+                name = row.get('shop_name') or row.get('name') or row.get('shop')
+                if name:
+                    names.append(name.strip())
+    except Exception as e:
+        logger.error(f"Lỗi đọc file CSV {path}: {e}")
+    return names
 
-    if num_threads is None or (isinstance(num_threads, int) and num_threads < 1):
-        num_threads = 5
 
-    if not base.exists() or not base.is_dir():
-        logger.error(f"Thư mục shops không tồn tại: {base}")
-        return []
+_ggmap_cache = None
+_ggmap_cache_lock = threading.Lock()
 
-    all_files = sorted([str(p) for p in base.iterdir() if p.is_file() and p.suffix.lower() == ".csv"])
 
-    if not all_files:
-        logger.warning(f"Không tìm thấy file CSV trong thư mục: {base}")
-        return [[] for _ in range(num_threads)]
+def get_ggmap_cache():
+    global _ggmap_cache
+    from funcs.ggmap_cache import GgmapQueryCache
 
-    chunks: list[list[str]] = [[] for _ in range(num_threads)]
+    with _ggmap_cache_lock:
+        if _ggmap_cache is None:
+            _ggmap_cache = GgmapQueryCache(GGMAP_CACHE_FILE, ttl=GGMAP_CACHE_TTL_DAYS * 86400,
+                                           max_entries=GGMAP_CACHE_MAX_ENTRIES)
+        return _ggmap_cache
 
-    for idx, f in enumerate(all_files):
-        chunks[idx % num_threads].append(f)
 
-    logger.info(f"Đã chia {len(all_files)} file CSV thành {num_threads} chunks")
-    return chunks
+def save_cached_result(shop_csv: str, shop_name: str) -> bool:
+    """Tên shop đã có trong cache -> ghi kết quả vào ggmap_search/{category}.csv, không cần mở browser."""
+    results = get_ggmap_cache().get(shop_name)
+    if results is None:
+        return False
+    save_ggmap_results(Path(shop_csv).stem, shop_name, results)
+    return True
 
 
-def get_product_in_category(thread_idx, shops):
-    from funcs.setup_driver import setup_driver
-    from funcs.fake_agent import random_sleep, hover_element, random_scroll
-    from funcs.load_cookies_to_driver import load_cookies_to_driver
-    from funcs.click import auto_click
+# item đại diện -> các item khác cùng cụm tên, nhận chung kết quả khi item đại diện tìm xong
+_cluster_members: dict[tuple, list[tuple]] = {}
+_cluster_lock = threading.Lock()
 
-    driver = None
-    while driver is None:
-        driver = setup_driver(profile_idx=thread_idx)
 
-    screen_width = driver.execute_script("return window.screen.availWidth;")
-    screen_height = driver.execute_script("return window.screen.availHeight;")
-    window_width = screen_width // 5
-    window_height = screen_height // 2
-    position_x = thread_idx * window_width // 5
-    # position_x = thread_idx * window_width # for testing
-    position_y = 0
+def cluster_shop_items(items: list[tuple]) -> list[tuple]:
+    """Gom (file shops CSV, tên shop) theo cụm tên, trả về 1 item đại diện mỗi nhóm tên trùng hẳn.
 
-    driver.set_window_size(window_width, window_height)
-    driver.set_window_position(position_x, position_y)
+    Chỉ các item có canonical_name trùng hẳn với item đại diện mới được giữ trong _cluster_members để
+    save_search_results ghi chung kết quả; tên chỉ gần trùng (Jaccard) vẫn được tìm riêng vì có thể là shop khác.
+    """
+    from funcs.name_clusters import canonical_name, cluster_names, log_cluster_report
+
+    t0 = time.perf_counter()
+    names = [name for _, name in items]
+    # cụm gần trùng chỉ để thống kê số tên gần trùng, không quyết định tên nào được tìm
+    clusters = cluster_names(names, threshold=GGMAP_CLUSTER_THRESHOLD)
+
+    rep_items: dict[str, tuple] = {}
+    fuzzy = 0
+    with _cluster_lock:
+        for item in items:
+            canon = canonical_name(item[1])
+            if canon != canonical_name(clusters.get(item[1], item[1])):
+                fuzzy += 1
+            rep_item = rep_items.get(canon)
+            if rep_item is None:
+                rep_items[canon] = item
+            else:
+                _cluster_members.setdefault(rep_item, []).append(item)
+    log_cluster_report(names, clusters, len(rep_items), logger)
+    if fuzzy:
+        logger.info(f'{fuzzy} tên shop chỉ gần trùng tên đại diện của cụm, vẫn tìm riêng trên Maps')
+    logger.debug(f'Gom cụm tên shop mất {time.perf_counter() - t0:.2f}s')
+    return list(rep_items.values())
+
+
+def save_search_results(item: tuple, results: list[dict], from_cache: bool = False):
+    """Ghi kết quả của 1 item vào ggmap_search/{category}.csv và cache, rồi ghi cho các item cùng tên chuẩn hoá.
+
+    Chỉ tên đã thật sự tìm được ghi vào cache; các item cùng nhóm chỉ được ghi ra CSV.
+    from_cache=True: kết quả lấy từ cache, không ghi lại cache (để không gia hạn TTL).
+    """
+    with _cluster_lock:
+        members = _cluster_members.pop(item, [])
+    shop_csv, shop_name = item
+    save_ggmap_results(Path(shop_csv).stem, shop_name, results)
+    if not from_cache:
+        get_ggmap_cache().put(shop_name, results)
+    for member_csv, member_name in members:
+        save_ggmap_results(Path(member_csv).stem, member_name, results)
 
-    driver.get("https://www.google.com/maps")
-    driver.execute_script("document.body.style.zoom='25%'")
-    load_cookies_to_driver(driver, type="ggmap")
-    # mô phỏng hành vi người dùng sau khi load page
-    try:
-        random_sleep(1.0, 2.0)
-        random_scroll(driver, min_scrolls=2, max_scrolls=6)
-    except Exception:
-        pass
-    time.sleep(1)
-    driver.refresh()
-
-    def read_shop_names_from_csv(path):
-        names = []
-        try:
-            with open(path, newline='', encoding='utf-8') as f:
-                reader = csv.DictReader(f)
-                for row in reader:
-                    if not isinstance(row, dict):
-                        continue
-                    name = row.get('shop_name') or row.get('name') or row.get('shop')
-                    if name:
-                        names.append(name.strip())
-        except Exception as e:
-            logger.error(f"Lỗi đọc file CSV {path}: {e}")
-        return names
 
-    for shop_csv in shops:
+def drop_cluster_members(item: tuple) -> int:
+    """Item đại diện lỗi hẳn: bỏ các item cùng cụm (sẽ được tìm lại ở lần chạy sau)."""
+    with _cluster_lock:
+        members = _cluster_members.pop(item, [])
+    if members:
+        logger.warning(f"Bỏ qua {len(members)} shop cùng cụm với '{item[1]}' do tìm kiếm lỗi")
+    return len(members)
+
+
+def shop_queue(file_path: str | Path | None = None, files: list | None = None):
+    """Tạo WorkQueue với mỗi item là (file shops CSV, tên shop) để các worker cùng lấy dần.
+
+    Shop đã có trong cache được ghi kết quả luôn, không đưa vào hàng đợi.
+    """
+    from funcs.work_queue import WorkQueue
+
+    if files is None:
+        base = Path(file_path) if file_path else Path("shops")
+        if not base.exists() or not base.is_dir():
+            logger.error(f"Thư mục shops không tồn tại: {base}")
+            files = []
+        else:
+            files = sorted([str(p) for p in base.iterdir() if p.is_file() and p.suffix.lower() == ".csv"])
+
+    items = []
+    cached = 0
+    for shop_csv in files:
         shop_names = read_shop_names_from_csv(shop_csv)
         if not shop_names:
             logger.info(f"Không tìm thấy tên shop trong file: {shop_csv}")
             continue
-
         for shop_name in shop_names:
+            if save_cached_result(str(shop_csv), shop_name):
+                cached += 1
+            else:
+                items.append((str(shop_csv), shop_name))
+
+    if GGMAP_CLUSTER_NAMES and items:
+        items = cluster_shop_items(items)
+
+    logger.info(f"Đã đưa {len(items)} shop từ {len(files)} file CSV vào hàng đợi ({cached} shop lấy từ cache)")
+    tasks = WorkQueue(items, name='ggmap')
+    tasks.close()
+    return tasks
+
+
+def _search_by_typing(driver, shop_name: str, thread_idx=0):
+    """Cách cũ: mở trang chủ Maps, hover + click searchbox, gõ từng ký tự rồi Enter."""
+    from funcs.fake_agent import hover_element
+    from funcs.click import auto_click
+
+    driver.get("https://www.google.com/maps")
+
+    try:
+        searchbox = driver.find_element('id', 'searchbox')
+
+        if searchbox:
             try:
-                driver.get("https://www.google.com/maps")
+                # hover vào ô tìm kiếm trước khi click
+                try:
+                    hover_element(driver, searchbox)
+                except Exception:
+                    pass
 
+                clicked = False
                 try:
-                    searchbox = driver.find_element('id', 'searchbox')
-
-                    if searchbox:
-                        try:
-                            # hover vào ô tìm kiếm trước khi click
-                            try:
-                                hover_element(driver, searchbox)
-                            except Exception:
-                                pass
-
-                            clicked = False
-                            try:
-                                clicked = auto_click(driver, "//*[@id='searchbox']", 5, retries=2, log_callback=logger.info)
-                            except Exception:
-                                clicked = False
-
-                        except Exception:
-                            clicked = False
-
-                        if clicked:
-                            success_type = None
-                            try:
-                                driver.execute_script('arguments[0].focus();', searchbox)
-                            except Exception:
-                                pass
-
-                            try:
-                                from selenium.webdriver import ActionChains
-                                ac = ActionChains(driver)
-                                ac.click(searchbox)
-                                # mô phỏng gõ từng ký tự có delay
-                                for ch in shop_name:
-                                    ac.send_keys(ch)
-                                ac.send_keys('\ue007')
-                                ac.perform()
-                                success_type = 'actionchains'
-                            except Exception as e:
-                                logger.debug(f"ActionChains failed for '{shop_name}': {e}")
-
-                            logger.info(f"[Thread {thread_idx}] Input method used for '{shop_name}': {success_type}")
+                    clicked = auto_click(driver, "//*[@id='searchbox']", 5, retries=2, log_callback=logger.info)
+                except Exception:
+                    clicked = False
+
+            except Exception:
+                clicked = False
 
+            if clicked:
+                success_type = None
+                try:
+                    driver.execute_script('arguments[0].focus();', searchbox)
+                except Exception:
+                    pass
+
+                try:
+                    from selenium.webdriver import ActionChains
+                    ac = ActionChains(driver)
+                    ac.click(searchbox)
+                    # mô phỏng gõ từng ký tự có delay
+                    for ch in shop_name:
+                        ac.send_keys(ch)
+                    ac.send_keys('\ue007')
+                    ac.perform()
+                    success_type = 'actionchains'
                 except Exception as e:
-                    logger.debug(f"Lỗi khi thao tác searchbox: {e}")
+                    logger.debug(f"ActionChains failed for '{shop_name}': {e}")
+
+                logger.info(f"[Thread {thread_idx}] Input method used for '{shop_name}': {success_type}")
+
+    except Exception as e:
+        logger.debug(f"Lỗi khi thao tác searchbox: {e}")
+
+
+def search_url(shop_name: str) -> str:
+    return f"https://www.google.com/maps/search/{urllib.parse.quote_plus(shop_name)}"
 
-            except Exception as e:
-                logger.error(f"Lỗi khi xử lý shop '{shop_name}': {e}")
-                continue
 
-            # Chờ kết quả load và trích xuất tối đa 5 href gần nhất
+def _search_by_url(driver, shop_name: str) -> bool:
+    """Mở thẳng URL tìm kiếm của tên shop và chờ danh sách kết quả (role=feed) / trang địa điểm.
+
+    Trả về False nếu hết thời gian chờ mà chưa thấy kết quả (caller chuyển sang gõ searchbox).
+    """
+    from funcs.readiness import wait_until_ready
+
+    driver.get(search_url(shop_name))
+    return bool(wait_until_ready(driver, 'ggmap_search').get('ready'))
+
+
+_search_latency = None
+_search_latency_lock = threading.Lock()
+
+
+def get_search_latency():
+    """Độ trễ mỗi truy vấn (từ lúc bắt đầu tìm đến khi có kết quả) theo cách tìm: 'url', 'type', 'url->type'."""
+    global _search_latency
+    from funcs.readiness import ReadinessStats
+
+    with _search_latency_lock:
+        if _search_latency is None:
+            _search_latency = ReadinessStats()
+        return _search_latency
+
+
+def log_search_latency(log: logging.Logger | None = None) -> dict:
+    log = log or logger
+    summary = get_search_latency().summary()
+    for mode, st in summary.items():
+        reasons = ', '.join(f'{k}={v}' for k, v in sorted(st['reasons'].items()))
+        log.info(f"[ggmap_search] {mode}: {st['pages']} truy vấn, trung bình {st['mean_s']:.2f}s "
+                 f"(p50 {st['p50_s']:.2f}s, p95 {st['p95_s']:.2f}s, max {st['max_s']:.2f}s) - {reasons}")
+    return summary
+
+
+def get_product_in_category(thread_idx, shops):
+    """Worker tìm shop trên Google Maps.
+
+    `shops` là WorkQueue dùng chung (item = (file shops CSV, tên shop)) hoặc list file CSV như cũ.
+    """
+    from funcs.setup_driver import setup_driver
+    from funcs.resource_policy import log_resource_summary, report_page
+    from funcs.readiness import wait_until_ready
+    from funcs.fake_agent import random_sleep, random_scroll
+    from funcs.cookie_pool import get_cookie_pool
+    from funcs.work_queue import WorkQueue
+    from funcs.rate_limiter import get_limiter
+    from funcs.block_detect import BlockGuard, PageBlocked, check_page
+    from funcs.driver_supervisor import CRASH_RETRIES, DriverSupervisor
+
+    tasks = shops if isinstance(shops, WorkQueue) else shop_queue(files=list(shops))
+    limiter = get_limiter('google.com') if PACING == 'adaptive' else None
+    session = get_cookie_pool('ggmap').session(f'ggmap-{thread_idx}')
+    guard = BlockGuard(session.worker, session.account, limiter)
+
+    def open_driver():
+        driver = None
+        while driver is None:
+            driver = setup_driver(profile_idx=thread_idx, resource_policy=RESOURCE_POLICY)
+        return driver
+
+    def prepare_driver(driver):
+        screen_width = driver.execute_script("return window.screen.availWidth;")
+        screen_height = driver.execute_script("return window.screen.availHeight;")
+        window_width = screen_width // 5
+        window_height = screen_height // 2
+        position_x = thread_idx * window_width // 5
+        # position_x = thread_idx * window_width # for testing
+        position_y = 0
+
+        driver.set_window_size(window_width, window_height)
+        driver.set_window_position(position_x, position_y)
+
+        if COOKIE_MODE != 'cdp' or not session.load(driver, mode='cdp'):
+            driver.get("https://www.google.com/maps")
+            driver.execute_script("document.body.style.zoom='25%'")
+            session.load(driver)
+            # mô phỏng hành vi người dùng sau khi load page
             try:
+                random_sleep(1.0, 2.0)
+                random_scroll(driver, min_scrolls=2, max_scrolls=6)
+            except Exception:
+                pass
+            time.sleep(1)
+            driver.refresh()
+
+    # Chrome được mở lại sau RECYCLE_AFTER_PAGES trang / khi vượt ngưỡng RAM / khi crash (funcs.driver_supervisor)
+    supervisor = DriverSupervisor(session.worker, open_driver, prepare=prepare_driver,
+                                  on_quit=lambda d: log_resource_summary(d, logger))
+    retry = None
+
+    while True:
+        # tài khoản đang bị tạm dừng (worker khác vừa gặp chặn): không mở trang trong lúc chờ
+        guard.wait()
+        if guard.stopped or supervisor.driver is None:
+            if guard.stopped:
+                logger.error(f"[Thread {thread_idx}] Google chặn liên tục, dừng worker")
+            else:
+                logger.error(f"[Thread {thread_idx}] Không mở lại được Chrome, dừng worker")
+            if retry is not None:
+                tasks.release(thread_idx, retry)
+            tasks.leave(thread_idx)
+            break
+        driver = supervisor.driver
+        # shop đang tìm dở khi Chrome crash được tìm lại ngay trên Chrome mới
+        if retry is not None:
+            item, retry = retry, None
+        else:
+            item, item_crashes = tasks.get(thread_idx), 0
+        if item is None:
+            break
+        shop_csv, shop_name = item
+
+        # shop cùng tên (đã chuẩn hoá) vừa được worker khác tìm xong; tên đã được tra cache (tính hit/miss)
+        # lúc đưa vào hàng đợi nên chỉ peek()
+        try:
+            cached = get_ggmap_cache().peek(shop_name)
+            if cached is not None:
+                save_search_results(item, cached, from_cache=True)
+                tasks.done(thread_idx)
+                continue
+        except Exception as e:
+            logger.debug(f"Lỗi khi đọc cache ggmap cho '{shop_name}': {e}")
+
+        t0 = time.monotonic()
+        mode = SEARCH_MODE
+        try:
+            if limiter is not None:
+                limiter.acquire()
+            if mode == 'url' and not _search_by_url(driver, shop_name):
+                # trang /sorry/ (captcha) cũng không ra kết quả: không gõ searchbox trên trang đó
+                check_page(driver, 'google', probe_page=True)
+                logger.info(f"[Thread {thread_idx}] URL tìm kiếm chưa ra kết quả cho '{shop_name}', chuyển sang gõ searchbox")
+                mode = 'url->type'
+                if limiter is not None:
+                    limiter.acquire()
+            if mode != 'url':
+                _search_by_typing(driver, shop_name, thread_idx)
+        except PageBlocked as e:
+            tasks.release(thread_idx, item)
+            guard.blocked(e.signature, rotate=lambda: session.rotate(driver, retire=guard.stopped))
+            continue
+        except Exception as e:
+            if supervisor.crashed(e) and item_crashes < CRASH_RETRIES:
+                # Chrome chết giữa chừng, không phải lỗi của shop: tìm lại trên Chrome mới
+                item_crashes += 1
+                retry = item
+                continue
+            logger.error(f"Lỗi khi xử lý shop '{shop_name}': {e}")
+            if limiter is not None:
+                limiter.failure('error')
+            if not tasks.failed(thread_idx, item):
+                drop_cluster_members(item)
+            continue
+
+        # Chờ kết quả load và trích xuất tối đa 5 href gần nhất
+        try:
+            if mode != 'url':
                 # mô phỏng tương tác người dùng trước khi lấy page_source
                 try:
-                    random_sleep(0.8, 1.6)
+                    if limiter is None:
+                        random_sleep(0.8, 1.6)
                     random_scroll(driver, min_scrolls=1, max_scrolls=4)
                 except Exception:
                     pass
 
-                time.sleep(1)
-                page_source = driver.page_source
-                results = parse_ggmap_results(page_source, max_items=5)
-
-                # Lưu kết quả vào thư mục ggmap_search theo category (dùng shop_csv tên file làm category)
-                category_name = Path(shop_csv).stem
-                save_ggmap_results(category_name, shop_name, results)
-
-            except Exception as e:
-                logger.error(f"Lỗi khi trích xuất kết quả ggmap cho '{shop_name}': {e}")
+                wait_until_ready(driver, 'ggmap_search')
+            results = get_ggmap_results(driver, mode=EXTRACT_MODE, max_items=5)
+            report_page(driver, shop_name)
+            check_page(driver, 'google', probe_page=not results)
+            if results:
+                guard.ok()
+            get_search_latency().record(mode, time.monotonic() - t0, 'ok' if results else 'empty')
+            if limiter is not None and results:
+                limiter.success()
+
+            # Lưu kết quả vào thư mục ggmap_search theo category (dùng shop_csv tên file làm category),
+            # kèm các shop cùng cụm tên
+            save_search_results(item, results)
+            tasks.done(thread_idx)
+
+        except PageBlocked as e:
+            get_search_latency().record(mode, time.monotonic() - t0, 'blocked')
+            tasks.release(thread_idx, item)
+            guard.blocked(e.signature, rotate=lambda: session.rotate(driver, retire=guard.stopped))
+            continue
+        except Exception as e:
+            if supervisor.crashed(e) and item_crashes < CRASH_RETRIES:
+                # Chrome chết giữa chừng, không phải lỗi của shop: tìm lại trên Chrome mới
+                item_crashes += 1
+                retry = item
                 continue
+            logger.error(f"Lỗi khi trích xuất kết quả ggmap cho '{shop_name}': {e}")
+            get_search_latency().record(mode, time.monotonic() - t0, 'error')
+            if limiter is not None:
+                limiter.failure('error')
+            if not tasks.failed(thread_idx, item):
+                drop_cluster_members(item)
+            continue
+        supervisor.page()
+
+    session.release()
+    supervisor.close()
+
+
+# Chạy trong trang, cùng quy tắc với funcs.ggmap_parsers (parse_ggmap_results):
+# container div[role=feed] (fallback div có aria-label bắt đầu bằng 'kết quả'), anchor có href
+# '/maps/place' | '/place/' | '/maps?cid=', href tương đối nối với https://www.google.com, bỏ href trùng,
+# name = aria-label -> text của anchor -> text của tối đa 4 cấp cha (dài hơn 2 ký tự).
+_GGMAP_RESULTS_JS = r"""
+var maxItems = arguments[0];
+var SKIP = {SCRIPT: 1, STYLE: 1, TEMPLATE: 1};
+function textOf(el, sep) {
+    var parts = [];
+    var walker = document.createTreeWalker(el, NodeFilter.SHOW_TEXT, {
+        acceptNode: function (n) {
+            for (var p = n.parentNode; p && p !== el.parentNode; p = p.parentNode) {
+                if (p.nodeType === 1 && SKIP[p.tagName]) return NodeFilter.FILTER_REJECT;
+            }
+            return NodeFilter.FILTER_ACCEPT;
+        }
+    });
+    while (walker.nextNode()) {
+        var t = walker.currentNode.nodeValue.trim();
+        if (t) parts.push(t);
+    }
+    return parts.join(sep);
+}
+function absolute(href) {
+    if (href.slice(0, 2) === '//') return 'https:' + href;
+    if (href.charAt(0) === '/') return 'https://www.google.com' + href;
+    return href;
+}
+
+var container = document.querySelector('div[role="feed"]');
+if (!container) {
+    var divs = document.querySelectorAll('div[aria-label]');
+    for (var i = 0; i < divs.length; i++) {
+        if (divs[i].getAttribute('aria-label').toLowerCase().indexOf('kết quả') === 0) { container = divs[i]; break; }
+    }
+}
+if (!container) return JSON.stringify({found: false, items: []});
+
+var items = [], seen = {};
+var anchors = container.querySelectorAll('a[href]');
+for (var j = 0; j < anchors.length && items.length < maxItems; j++) {
+    var a = anchors[j];
+    var href = a.getAttribute('href') || '';
+    if (href.indexOf('/maps/place') === -1 && href.indexOf('/place/') === -1 && href.indexOf('/maps?cid=') === -1) continue;
+    href = absolute(href);
+    if (seen[href]) continue;
+    seen[href] = true;
+
+    var name = a.getAttribute('aria-label') || textOf(a, '') || '';
+    if (!name) {
+        var parent = a.parentElement;
+        for (var k = 0; k < 4 && parent; k++) {
+            var text = textOf(parent, ' ');
+            if (text && text.length > 2) { name = text; break; }
+            parent = parent.parentElement;
+        }
+    }
+    items.push({name: name, href: href});
+}
+return JSON.stringify({found: true, items: items});
+"""
+
+_extract_stats: dict[str, dict] = {}
+_extract_stats_lock = threading.Lock()
+
+
+def _record_extract(mode: str, nbytes: int, seconds: float):
+    with _extract_stats_lock:
+        st = _extract_stats.setdefault(mode, {'queries': 0, 'bytes': 0, 'seconds': 0.0})
+        st['queries'] += 1
+        st['bytes'] += nbytes
+        st['seconds'] += seconds
+
+
+def log_extract_stats(log: logging.Logger | None = None) -> dict:
+    """Số byte kéo qua WebDriver và thời gian lấy kết quả trung bình mỗi truy vấn theo từng cách."""
+    log = log or logger
+    with _extract_stats_lock:
+        stats = {mode: dict(st) for mode, st in _extract_stats.items()}
+    for mode, st in stats.items():
+        n = st['queries'] or 1
+        log.info(f"[ggmap_extract] {mode}: {st['queries']} truy vấn, trung bình {st['bytes'] / n / 1024:.1f} KiB "
+                 f"và {1000 * st['seconds'] / n:.1f} ms mỗi truy vấn")
+    return stats
+
+
+def get_ggmap_results(driver, mode: str = 'js', max_items: int = 5) -> list[dict]:
+    """Lấy tối đa max_items kết quả {name, href} của trang tìm kiếm Maps đang mở.
+
+    - mode='js': lọc trong trang bằng _GGMAP_RESULTS_JS, chỉ trả về JSON của top-N kết quả
+    - mode='source': kéo page_source về và parse bằng parse_ggmap_results (cách cũ)
+    Script lỗi thì tự fallback sang 'source'.
+    """
+    if mode == 'js':
+        t0 = time.perf_counter()
+        try:
+            raw = driver.execute_script(_GGMAP_RESULTS_JS, max_items) or '{}'
+            payload = json.loads(raw)
+            results = [{'name': (r.get('name') or ''), 'href': r.get('href') or ''}
+                       for r in payload.get('items') or []]
+            _record_extract('js', len(raw.encode('utf-8')), time.perf_counter() - t0)
+            return results
+        except Exception as e:
+            logger.debug(f'Lỗi khi lấy kết quả ggmap trong trang, fallback sang page_source: {e}')
 
-    try:
-        driver.quit()
-    except Exception:
-        pass
+    t0 = time.perf_counter()
+    page_source = driver.page_source
+    results = parse_ggmap_results(page_source, max_items=max_items)
+    _record_extract('source', len((page_source or '').encode('utf-8')), time.perf_counter() - t0)
+    return results
 
 
-def parse_ggmap_results(page_source: str, max_items: int = 5) -> list[dict]:
+def parse_ggmap_results(page_source: str, max_items: int = 5, backend: str | None = None) -> list[dict]:
     """Parse page_source của Google Maps và trả về list các dict {name, href} tối đa max_items
 
+    backend: 'selectolax' | 'lxml' | 'scan' | 'html.parser' (BeautifulSoup).
+    None = backend nhanh nhất đang được cài (xem funcs.ggmap_parsers.GGMAP_PARSER_BACKENDS).
     Trả về rỗng khi không tìm được. Không raise exception.
     """
     try:
-        from bs4 import BeautifulSoup
-    except Exception:
-        logger.error("BeautifulSoup không được cài đặt. Hãy cài bằng 'pip install beautifulsoup4'")
+        from funcs.ggmap_parsers import parse
+    except Exception as e:
+        logger.error(f"Không thể import funcs.ggmap_parsers: {e}")
         return []
 
     try:
-        soup = BeautifulSoup(page_source, 'html.parser')
-        container = soup.find('div', attrs={'role': 'feed'})
-        if not container:
-            # fallback: tìm phần tử có nhiều mục con giống feed
-            container = soup.find(lambda tag: tag.name == 'div' and tag.get('aria-label', '').lower().startswith('kết quả'))
-
-        if not container:
-            return []
-
-        # Thay vì dựa vào class (bị mã hóa), tìm tất cả anchor bên trong container mà href chứa '/maps/place' hoặc '/place/'
-        anchors = []
-        for a in container.find_all('a', href=True):
-            href = a['href']
-            if ('/maps/place' in href) or ('/place/' in href) or ('/maps?cid=' in href):
-                anchors.append(a)
-
-        results = []
-        seen = set()
-        for a in anchors:
-            if len(results) >= max_items:
-                break
-
-            href = a['href']
-            # normalize full url if relative
-            if href.startswith('/'):
-                href = urllib.parse.urljoin('https://www.google.com', href)
-
-            # lấy tên từ aria-label của anchor nếu có
-            name = a.get('aria-label') or a.get_text(strip=True) or ''
-
-            # nếu name rỗng, tìm text gần nhất: div trước/sau
-            if not name:
-                parent = a.parent
-                found_name = ''
-                # kiểm tra vài cấp cha để tìm text mô tả
-                for _ in range(4):
-                    if not parent:
-                        break
-                    text = parent.get_text(separator=' ', strip=True)
-                    if text and len(text) > 2:
-                        found_name = text
-                        break
-                    parent = parent.parent
-                name = found_name
-
-            # tránh trùng href
-            if href in seen:
-                continue
-            seen.add(href)
-
-            results.append({'name': name, 'href': href})
-
-        return results
+        return parse(page_source, max_items=max_items, backend=backend)
     except Exception as e:
         logger.error(f"Lỗi khi parse page_source: {e}")
         return []
 
 
+_save_lock = threading.Lock()
+
+
 def save_ggmap_results(category: str, query_name: str, results: list[dict]):
     """Lưu kết quả vào ggmap_search/{category}.csv với 2 cột: shop_name, list_href (JSON/semicolon separated)
 
     Nếu thư mục không tồn tại thì tạo.
     """
+    with _save_lock:
+        _save_ggmap_results(category, query_name, results)
+
+
+def _save_ggmap_results(category: str, query_name: str, results: list[dict]):
     try:
         out_dir = Path('ggmap_search')
         out_dir.mkdir(parents=True, exist_ok=True)
@@ -273,24 +612,40 @@ def save_ggmap_results(category: str, query_name: str, results: list[dict]):
         logger.error(f"Lỗi khi lưu kết quả ggmap: {e}")
 
 
-if __name__ == '__main__':
-    NUM_THREADS = 5
-    list_shops = shop_chunking(num_threads=NUM_THREADS)
+def main(num_threads: int = 5):
+    from funcs.block_detect import log_block_summary
+    from funcs.cookie_pool import log_cookie_pool_summary
+    from funcs.driver_supervisor import log_recycle_summary
+    from funcs.memory import log_rss_summary
+    from funcs.rate_limiter import log_rate_limiter_summary
+    from funcs.readiness import log_readiness_summary
 
-    for i, chunk in enumerate(list_shops):
-        logger.info(f"Chunk {i}: {len(chunk)} files")
+    tasks = shop_queue()
 
     threads = []
 
-    for idx, shop in enumerate(list_shops):
-        if not shop:
-            logger.info(f"Bỏ qua luồng {idx} vì không có file để xử lý")
-            continue
-
-        thread = threading.Thread(target=get_product_in_category, args=(idx, shop))
+    for idx in range(min(num_threads, len(tasks))):
+        thread = threading.Thread(target=get_product_in_category, args=(idx, tasks))
         thread.start()
-        time.sleep(1)
         threads.append(thread)
 
-    for thread in threads:
-        thread.join()
+    try:
+        for thread in threads:
+            thread.join()
+    finally:
+        get_ggmap_cache().save()
+
+    tasks.log_report(logger)
+    get_ggmap_cache().log_report(logger)
+    log_search_latency(logger)
+    log_extract_stats(logger)
+    log_rate_limiter_summary(logger)
+    log_block_summary(logger)
+    log_cookie_pool_summary(logger)
+    log_rss_summary(logger)
+    log_recycle_summary(logger, 'ggmap')
+    log_readiness_summary(logger)
+
+
+if __name__ == '__main__':
+    main()
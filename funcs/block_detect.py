@@ -0,0 +1,268 @@
+"""Nhận diện trang chặn / captcha / hết phiên và circuit breaker cho worker và tài khoản.
+
+Thay cho việc so tên shop với 2 chuỗi cố định rồi os._exit(0): khi gặp trang chặn, worker bị ảnh
+hưởng tạm dừng (backoff tăng dần) và đổi phiên; chỉ khi cả tài khoản bị chặn liên tục thì các worker
+dùng tài khoản đó mới dừng hẳn (thoát vòng lặp bình thường để flush / compact dữ liệu).
+"""
+from dataclasses import dataclass
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class BlockSignature:
+    """Dấu hiệu của 1 loại trang lỗi: khớp nếu URL chứa 1 trong url_patterns hoặc text chứa 1 trong texts.
+
+    kind: 'block' (bị giới hạn / lỗi tải), 'captcha' hoặc 'session' (cookie hết hạn, bị đẩy ra trang login).
+    """
+    name: str
+    kind: str = 'block'
+    texts: tuple = ()
+    url_patterns: tuple = ()
+
+    def match(self, url: str = '', text: str = '') -> bool:
+        if url and any(p in url for p in self.url_patterns):
+            return True
+        if text:
+            low = text.lower()
+            return any(t.lower() in low for t in self.texts)
+        return False
+
+
+BLOCK_SIGNATURES: dict[str, list[BlockSignature]] = {
+    'shopee': [
+        BlockSignature('shopee_load_error', 'block',
+                       texts=('Lỗi tải\nXin lỗi, chúng tôi đang gặp sự cố tải', 'chúng tôi đang gặp sự cố tải')),
+        BlockSignature('shopee_restricted', 'block',
+                       texts=('Trang không khả dụng', 'tần suất truy cập bất thường', 'bị giới hạn tạm thời')),
+        BlockSignature('shopee_captcha', 'captcha', url_patterns=('/verify/captcha', '/verify/traffic')),
+        BlockSignature('shopee_login', 'session', url_patterns=('/buyer/login',)),
+    ],
+    'google': [
+        BlockSignature('google_sorry', 'captcha', url_patterns=('/sorry/', 'google.com/sorry'),
+                       texts=('unusual traffic from your computer', 'lưu lượng truy cập bất thường')),
+        BlockSignature('google_consent', 'session', url_patterns=('consent.google.com',)),
+    ],
+}
+
+_PAGE_TEXT_JS = "return (document.body && document.body.innerText || '').slice(0, arguments[0]);"
+
+
+def register_signature(site: str, signature: BlockSignature):
+    """Thêm dấu hiệu mới cho 1 site (vd. khi Shopee đổi nội dung trang chặn)."""
+    BLOCK_SIGNATURES.setdefault(site, []).append(signature)
+
+
+def _page_text(driver, limit: int = 4000) -> str:
+    try:
+        return driver.execute_script(_PAGE_TEXT_JS, limit) or ''
+    except Exception:
+        pass
+    try:
+        return (driver.find_element('tag name', 'body').text or '')[:limit]
+    except Exception:
+        return ''
+
+
+def detect_block(driver, site: str, texts: list | None = None, probe_page: bool = False) -> BlockSignature | None:
+    """Trả về dấu hiệu khớp với trang đang mở, None nếu trang bình thường.
+
+    - luôn kiểm tra driver.current_url
+    - `texts`: các đoạn text đã lấy được (vd. tên shop) - kiểm tra không tốn thêm round-trip
+    - probe_page=True: đọc thêm innerText của trang (dùng khi không lấy được gì từ trang)
+    """
+    signatures = BLOCK_SIGNATURES.get(site, [])
+    try:
+        url = driver.current_url or ''
+    except Exception:
+        url = ''
+    for sig in signatures:
+        if sig.match(url=url):
+            return sig
+    for text in texts or []:
+        for sig in signatures:
+            if text and sig.match(text=str(text)):
+                return sig
+    if probe_page:
+        page = _page_text(driver)
+        for sig in signatures:
+            if sig.match(text=page):
+                return sig
+    return None
+
+
+class PageBlocked(Exception):
+    """Trang đang mở là trang chặn / captcha / hết phiên (xem check_page)."""
+
+    def __init__(self, signature: BlockSignature):
+        super().__init__(f'{signature.kind}: {signature.name}')
+        self.signature = signature
+
+
+def check_page(driver, site: str, texts: list | None = None, probe_page: bool = False):
+    """Như detect_block nhưng raise PageBlocked khi trang khớp dấu hiệu, để worker xử lý riêng."""
+    sig = detect_block(driver, site, texts=texts, probe_page=probe_page)
+    if sig is not None:
+        raise PageBlocked(sig)
+
+
+class CircuitBreaker:
+    """closed -> open sau `threshold` lần lỗi liên tiếp, mỗi lần mở chờ backoff tăng gấp đôi (tối đa max_backoff).
+
+    record_success() đóng lại và reset backoff (bỏ qua khi breaker còn đang mở: trang sạch của 1 worker chưa
+    dừng kịp không xoá được các lần mở trước). `max_trips`: số lần mở liên tiếp (không có lần thành công
+    nào ở giữa) thì `stopped` = True - caller nên dừng hẳn thay vì thử tiếp.
+    """
+
+    def __init__(self, name: str, threshold: int = 1, base_backoff: float = 30.0, max_backoff: float = 600.0,
+                 max_trips: int | None = None):
+        self.name = name
+        self.threshold = max(1, threshold)
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self.max_trips = max_trips
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._trips = 0
+        self._open_until = 0.0
+        self.stats = {'failures': 0, 'trips': 0, 'successes': 0}
+
+    def record_success(self):
+        with self._lock:
+            self.stats['successes'] += 1
+            if time.monotonic() < self._open_until:
+                return
+            self._failures = 0
+            self._trips = 0
+
+    def record_failure(self) -> float:
+        """Ghi nhận 1 lần lỗi, trả về số giây nên tạm dừng (0 nếu breaker chưa mở)."""
+        with self._lock:
+            self.stats['failures'] += 1
+            self._failures += 1
+            if self._failures < self.threshold:
+                return 0.0
+            self._failures = 0
+            backoff = min(self.max_backoff, self.base_backoff * (2 ** self._trips))
+            self._trips += 1
+            self.stats['trips'] += 1
+            self._open_until = time.monotonic() + backoff
+            return backoff
+
+    @property
+    def stopped(self) -> bool:
+        with self._lock:
+            return self.max_trips is not None and self._trips >= self.max_trips
+
+    def remaining(self) -> float:
+        """Số giây còn lại trước khi breaker cho thử lại."""
+        with self._lock:
+            return max(0.0, self._open_until - time.monotonic())
+
+
+_account_breakers: dict[str, CircuitBreaker] = {}
+_account_breakers_lock = threading.Lock()
+
+# Breaker của 1 tài khoản: mở khi các worker dùng chung tài khoản gặp chặn 3 lần liên tiếp,
+# mở liên tiếp 3 lần (không có trang nào sạch ở giữa) thì dừng các worker của tài khoản đó
+ACCOUNT_BREAKER = {'threshold': 3, 'base_backoff': 60.0, 'max_backoff': 900.0, 'max_trips': 3}
+# Breaker của 1 worker: mở ngay khi gặp chặn, tạm dừng 30s, 60s, 120s... rồi đổi phiên
+WORKER_BREAKER = {'threshold': 1, 'base_backoff': 30.0, 'max_backoff': 600.0}
+
+
+def get_account_breaker(account: str) -> CircuitBreaker:
+    with _account_breakers_lock:
+        breaker = _account_breakers.get(account)
+        if breaker is None:
+            breaker = CircuitBreaker(f'account:{account}', **ACCOUNT_BREAKER)
+            _account_breakers[account] = breaker
+        return breaker
+
+
+class BlockGuard:
+    """Gom breaker của 1 worker, breaker của tài khoản nó đang dùng và rate limiter của domain.
+
+    - ok(): trang sạch -> đóng cả 2 breaker
+    - blocked(sig, rotate): báo limiter, tạm dừng worker theo backoff, gọi rotate() để đổi phiên;
+      trả về False nếu tài khoản đã bị dừng hẳn (worker nên thoát vòng lặp)
+    - wait(): chờ hết thời gian breaker của tài khoản đang mở (gọi ở đầu mỗi vòng lặp, trước khi mở trang),
+      để mọi worker của tài khoản cùng tạm dừng chứ không chỉ worker vừa gặp chặn
+    - stopped: tài khoản đã bị dừng hẳn (kiểm tra ở đầu mỗi vòng lặp)
+    rotate() có thể trả về tên tài khoản mới (vd. WorkerSession.rotate của funcs.cookie_pool): guard chuyển
+    sang breaker của tài khoản đó, nên tài khoản cũ bị dừng hẳn thì worker vẫn chạy tiếp bằng tài khoản khác.
+    """
+
+    def __init__(self, worker: str, account: str, limiter=None):
+        self.worker = worker
+        self.account = account
+        self.limiter = limiter
+        self.breaker = CircuitBreaker(f'worker:{worker}', **WORKER_BREAKER)
+        self.account_breaker = get_account_breaker(account)
+
+    @property
+    def stopped(self) -> bool:
+        return self.account_breaker.stopped
+
+    def wait(self) -> float:
+        """Ngủ tới khi breaker của tài khoản đóng lại, trả về số giây đã chờ."""
+        pause = self.account_breaker.remaining()
+        if pause > 0:
+            logger.info(f"[{self.worker}] Tài khoản '{self.account}' đang tạm dừng vì bị chặn, chờ {pause:.0f}s")
+            time.sleep(pause)
+        return pause
+
+    def ok(self):
+        self.breaker.record_success()
+        self.account_breaker.record_success()
+
+    def switch_account(self, account: str):
+        self.account = account
+        self.account_breaker = get_account_breaker(account)
+
+    def _rotate(self, rotate):
+        if rotate is None:
+            return None
+        try:
+            return rotate()
+        except Exception as e:
+            logger.warning(f'[{self.worker}] Không đổi được phiên: {e}')
+            return None
+
+    def blocked(self, sig: BlockSignature, rotate=None) -> bool:
+        if self.limiter is not None:
+            self.limiter.failure('block')
+        pause = self.breaker.record_failure()
+        account_pause = self.account_breaker.record_failure()
+        if self.account_breaker.stopped:
+            logger.error(f"[{self.worker}] Tài khoản '{self.account}' bị chặn liên tục ({sig.name}), "
+                         f"dừng các worker dùng tài khoản này")
+            account = self._rotate(rotate)
+            if not isinstance(account, str) or get_account_breaker(account).stopped:
+                return False
+            logger.warning(f"[{self.worker}] Chuyển sang tài khoản '{account}'")
+            self.switch_account(account)
+            return True
+        pause = max(pause, account_pause)
+        logger.warning(f"[{self.worker}] Gặp trang {sig.kind} ({sig.name}), tạm dừng {pause:.0f}s rồi đổi phiên")
+        if pause > 0:
+            time.sleep(pause)
+        account = self._rotate(rotate)
+        if isinstance(account, str) and account != self.account:
+            self.switch_account(account)
+        return True
+
+
+def log_block_summary(log: logging.Logger | None = None) -> dict:
+    log = log or logger
+    with _account_breakers_lock:
+        breakers = dict(_account_breakers)
+    out = {}
+    for account, breaker in breakers.items():
+        s = out[account] = dict(breaker.stats, stopped=breaker.stopped)
+        if s['failures']:
+            log.info(f"[block] Tài khoản '{account}': {s['failures']} trang bị chặn, breaker mở {s['trips']} lần"
+                     f"{', đã dừng' if s['stopped'] else ''}")
+    return out
@@ -0,0 +1,249 @@
+"""Pool các bộ cookie (mỗi bộ = 1 tài khoản / phiên) dùng chung cho các worker.
+
+Mỗi file JSON trong cookies/{type}/ là 1 bộ cookie (cùng định dạng export với cookies/{type}_cookies.json).
+Pool đọc và chuẩn hoá tất cả 1 lần, bỏ các bộ đã / sắp hết hạn, chia bộ ít worker nhất cho mỗi worker.
+Khi worker gặp trang chặn, bộ đang dùng bị tạm nghỉ (cooldown) và worker được đổi sang bộ khác mà không
+cần khởi động lại process. Không có thư mục cookies/{type}/ thì dùng file cookies/{type}_cookies.json như cũ.
+"""
+from dataclasses import dataclass, field
+from pathlib import Path
+import logging
+import threading
+import time
+
+try:
+    import config
+except Exception:
+    config = None
+
+logger = logging.getLogger(__name__)
+
+# Cookie xác thực của từng loại: bộ cookie hết hạn nếu 1 trong các cookie này đã hết hạn
+AUTH_COOKIES = {
+    'shopee': ('SPC_EC', 'SPC_ST', 'SPC_U'),
+    'ggmap': ('SID', 'HSID', 'SSID'),
+}
+# Bỏ các bộ cookie còn sống ít hơn chừng này giây (tránh hết hạn giữa chừng)
+COOKIE_MIN_TTL_S = 3600
+# Bộ cookie vừa bị chặn được nghỉ chừng này giây trước khi chia lại cho worker khác
+COOKIE_COOLDOWN_S = 600
+
+
+@dataclass
+class CookieSet:
+    name: str
+    path: str
+    cookies: list
+    expires_at: float | None = None
+    assigned: set = field(default_factory=set)
+    cooldown_until: float = 0.0
+    retired: bool = False
+    blocks: int = 0
+    uses: int = 0
+
+
+def cookie_set_expiry(cookies: list, kind: str) -> float | None:
+    """Thời điểm (epoch) bộ cookie hết hạn: hạn sớm nhất trong các cookie xác thực có hạn,
+    nếu không có cookie xác thực nào có hạn thì lấy hạn muộn nhất của cả bộ. None = không rõ (cookie phiên)."""
+    auth = set(AUTH_COOKIES.get(kind, ()))
+    auth_expiry = [c['expiry'] for c in cookies if c.get('name') in auth and isinstance(c.get('expiry'), (int, float))]
+    if auth_expiry:
+        return float(min(auth_expiry))
+    all_expiry = [c['expiry'] for c in cookies if isinstance(c.get('expiry'), (int, float))]
+    return float(max(all_expiry)) if all_expiry else None
+
+
+def cookie_files(kind: str) -> list[Path]:
+    base = Path(getattr(config, 'COOKIES_DIR', 'cookies'))
+    files = sorted((base / kind).glob('*.json')) if (base / kind).is_dir() else []
+    if not files:
+        single = base / f'{kind}_cookies.json'
+        if single.exists():
+            files = [single]
+    return files
+
+
+def load_cookie_sets(kind: str, min_ttl: float = COOKIE_MIN_TTL_S) -> list[CookieSet]:
+    """Đọc + chuẩn hoá mọi bộ cookie của `kind`, bỏ bộ rỗng hoặc hết hạn trong vòng min_ttl giây."""
+    from funcs.load_cookies_to_driver import read_cookies_file
+
+    now = time.time()
+    sets = []
+    for path in cookie_files(kind):
+        cookies = read_cookies_file(str(path))
+        if not cookies:
+            continue
+        expires_at = cookie_set_expiry(cookies, kind)
+        if expires_at is not None and expires_at - now < min_ttl:
+            logger.warning(f"[cookie_pool:{kind}] Bỏ bộ cookie '{path.stem}': hết hạn lúc "
+                           f"{time.strftime('%Y-%m-%d %H:%M', time.localtime(expires_at))}")
+            continue
+        sets.append(CookieSet(path.stem, str(path), cookies, expires_at))
+    return sets
+
+
+class CookiePool:
+    """Chia các bộ cookie cho worker, mỗi bộ càng ít worker dùng chung càng tốt.
+
+    - acquire(worker): bộ đang rảnh (không cooldown) có ít worker nhất, None nếu pool rỗng
+    - rotate(worker, current, retire): cho bộ hiện tại nghỉ COOKIE_COOLDOWN_S (retire=True: bỏ hẳn),
+      trả về bộ khác; không còn bộ nào khác thì giữ bộ cũ (retire=True thì trả về None)
+    - release(worker): worker dừng, trả bộ đang dùng
+    """
+
+    def __init__(self, kind: str, sets: list[CookieSet], cooldown: float = COOKIE_COOLDOWN_S):
+        self.kind = kind
+        self.sets = sets
+        self.cooldown = cooldown
+        self._lock = threading.Lock()
+        self._by_worker: dict[str, CookieSet] = {}
+        self.stats = {'acquired': 0, 'rotations': 0, 'retired': 0}
+
+    def __len__(self):
+        return len(self.sets)
+
+    def _pick(self, exclude: CookieSet | None = None) -> CookieSet | None:
+        now = time.monotonic()
+        live = [s for s in self.sets if not s.retired and s is not exclude]
+        if not live:
+            return None
+        ready = [s for s in live if s.cooldown_until <= now]
+        # tất cả đang nghỉ: lấy bộ sắp hết nghỉ nhất thay vì để worker đứng chờ
+        candidates = ready or sorted(live, key=lambda s: s.cooldown_until)[:1]
+        return min(candidates, key=lambda s: (len(s.assigned), s.uses))
+
+    def _assign(self, worker: str, cookie_set: CookieSet | None) -> CookieSet | None:
+        old = self._by_worker.pop(worker, None)
+        if old is not None:
+            old.assigned.discard(worker)
+        if cookie_set is not None:
+            cookie_set.assigned.add(worker)
+            cookie_set.uses += 1
+            self._by_worker[worker] = cookie_set
+        return cookie_set
+
+    def acquire(self, worker: str) -> CookieSet | None:
+        with self._lock:
+            current = self._by_worker.get(worker)
+            if current is not None and not current.retired:
+                return current
+            self.stats['acquired'] += 1
+            return self._assign(worker, self._pick())
+
+    def rotate(self, worker: str, current: CookieSet | None, retire: bool = False) -> CookieSet | None:
+        with self._lock:
+            if current is not None:
+                current.blocks += 1
+                current.cooldown_until = time.monotonic() + self.cooldown
+                if retire and not current.retired:
+                    current.retired = True
+                    self.stats['retired'] += 1
+                    logger.warning(f"[cookie_pool:{self.kind}] Bỏ bộ cookie '{current.name}' (bị chặn liên tục)")
+            nxt = self._pick(exclude=current)
+            if nxt is None:
+                nxt = None if current is None or current.retired else current
+            else:
+                self.stats['rotations'] += 1
+            return self._assign(worker, nxt)
+
+    def release(self, worker: str):
+        with self._lock:
+            self._assign(worker, None)
+
+    def session(self, worker: str) -> 'WorkerSession':
+        return WorkerSession(self, worker)
+
+    def summary(self) -> dict:
+        with self._lock:
+            return {
+                'sets': len(self.sets),
+                'retired': self.stats['retired'],
+                'rotations': self.stats['rotations'],
+                'per_set': {s.name: {'uses': s.uses, 'blocks': s.blocks, 'retired': s.retired} for s in self.sets},
+            }
+
+
+class WorkerSession:
+    """Bộ cookie mà 1 worker đang dùng.
+
+    account: tên tài khoản cho circuit breaker (funcs.block_detect) - '{kind}:{tên bộ}', hoặc `kind` khi pool rỗng.
+    """
+
+    def __init__(self, pool: CookiePool, worker: str):
+        self.pool = pool
+        self.worker = worker
+        self.cookie_set = pool.acquire(worker)
+        self.mode = 'selenium'
+
+    @property
+    def account(self) -> str:
+        if self.cookie_set is None:
+            return self.pool.kind
+        return f'{self.pool.kind}:{self.cookie_set.name}'
+
+    def load(self, driver, mode: str = 'selenium') -> int:
+        """Nạp cookie của bộ đang dùng vào driver (thay cho load_cookies_to_driver(driver, type=kind)).
+
+        mode='cdp' nạp qua DevTools trước khi mở trang nào (xem load_cookies_to_driver); rotate() dùng lại
+        mode của lần load thành công gần nhất.
+        """
+        from funcs.load_cookies_to_driver import load_cookies_to_driver
+
+        if self.cookie_set is None:
+            added = load_cookies_to_driver(driver, type=self.pool.kind, mode=mode)
+        else:
+            added = load_cookies_to_driver(driver, type=self.pool.kind, cookies=self.cookie_set.cookies,
+                                           source=self.cookie_set.path, mode=mode)
+        if added:
+            self.mode = mode
+        return added
+
+    def rotate(self, driver, retire: bool = False) -> str | None:
+        """Đổi sang bộ cookie khác và nạp lại phiên cho driver; trả về account mới (None nếu hết bộ dùng được).
+
+        Dùng làm `rotate` của BlockGuard.blocked.
+        """
+        from funcs.load_cookies_to_driver import reload_session
+
+        if self.cookie_set is None:
+            reload_session(driver, type=self.pool.kind, mode=self.mode)
+            return None
+        old = self.cookie_set.name
+        self.cookie_set = self.pool.rotate(self.worker, self.cookie_set, retire=retire)
+        if self.cookie_set is None:
+            return None
+        if self.cookie_set.name != old:
+            logger.info(f"[{self.worker}] Đổi bộ cookie '{old}' -> '{self.cookie_set.name}'")
+        reload_session(driver, type=self.pool.kind, cookies=self.cookie_set.cookies, source=self.cookie_set.path,
+                       mode=self.mode)
+        return self.account
+
+    def release(self):
+        self.pool.release(self.worker)
+
+
+_pools: dict[str, CookiePool] = {}
+_pools_lock = threading.Lock()
+
+
+def get_cookie_pool(kind: str = 'shopee') -> CookiePool:
+    with _pools_lock:
+        pool = _pools.get(kind)
+        if pool is None:
+            pool = CookiePool(kind, load_cookie_sets(kind))
+            logger.info(f"[cookie_pool:{kind}] {len(pool)} bộ cookie dùng được")
+            _pools[kind] = pool
+        return pool
+
+
+def log_cookie_pool_summary(log: logging.Logger | None = None) -> dict:
+    log = log or logger
+    with _pools_lock:
+        pools = dict(_pools)
+    out = {}
+    for kind, pool in pools.items():
+        s = out[kind] = pool.summary()
+        blocks = sum(v['blocks'] for v in s['per_set'].values())
+        log.info(f"[cookie_pool:{kind}] {s['sets']} bộ cookie, {blocks} lần bị chặn, đổi bộ {s['rotations']} lần, "
+                 f"bỏ {s['retired']} bộ")
+    return out
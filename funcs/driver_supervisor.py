@@ -0,0 +1,198 @@
+"""Mở lại Chrome của worker trước khi nó phình RAM tới mức crash.
+
+Chrome chạy hàng nghìn trang liên tục trong 1 process sẽ tăng RSS dần (cache, heap của renderer, log
+performance...) tới khi máy swap hoặc renderer crash; sau đó mọi lệnh WebDriver đều lỗi ngay
+('tab crashed', 'invalid session id') và các item còn lại của worker bị đánh lỗi hàng loạt.
+
+DriverSupervisor giữ driver của 1 worker và mở lại Chrome (quit + hàm start của worker: setup_driver,
+cookie...) khi:
+- đã mở RECYCLE_AFTER_PAGES trang kể từ lần khởi động gần nhất
+- RSS cây process Chrome của worker vượt RSS_WATERMARK_MB (đo mỗi RSS_CHECK_EVERY trang)
+- lệnh WebDriver lỗi vì browser / renderer đã chết (crashed())
+
+Việc mở lại chỉ xảy ra giữa 2 item (page()) hoặc ngay sau lỗi crash, worker xử lý lại đúng item đang dở.
+Mở lại lỗi START_ATTEMPTS lần liên tiếp thì `driver` = None: worker trả item đang giữ về hàng đợi và dừng.
+Mỗi lần đo được ghi vào chuỗi RSS theo worker của funcs.memory (log_recycle_summary ghi ra CSV).
+"""
+from collections import Counter
+import logging
+import threading
+import time
+from typing import Callable
+
+logger = logging.getLogger(__name__)
+
+# Số trang tối đa của 1 Chrome trước khi mở lại (0 = không giới hạn)
+RECYCLE_AFTER_PAGES = 400
+# Mở lại khi RSS cây process của worker vượt ngưỡng này (MiB, 0 = tắt). Chế độ tab (BROWSER_MODE='shared'):
+# RSS của browser dùng chung chia đều cho số tab
+RSS_WATERMARK_MB = 1500
+# Đo RSS mỗi N trang (đọc cây process mất vài ms)
+RSS_CHECK_EVERY = 10
+# Số lần thử lại ngay 1 item sau khi Chrome crash, quá số này item bị tính lỗi như thường
+CRASH_RETRIES = 1
+# Số lần thử mở Chrome mới (start + prepare) trước khi bỏ cuộc, và thời gian chờ giữa 2 lần (giây)
+START_ATTEMPTS = 3
+START_RETRY_S = 10
+# Thư mục ghi chuỗi RSS theo worker
+MEMORY_SERIES_DIR = 'logs'
+
+# Lỗi WebDriver cho biết browser / renderer đã chết, không phải lỗi của trang
+CRASH_MARKERS = ('tab crashed', 'page crash', 'invalid session id', 'chrome not reachable',
+                 'disconnected: not connected to devtools', 'no such window', 'target window already closed',
+                 'failed to establish a new connection', 'max retries exceeded')
+
+_stats = Counter()
+_stats_lock = threading.Lock()
+
+
+def is_crash(exc: BaseException) -> bool:
+    msg = str(exc).lower()
+    return any(marker in msg for marker in CRASH_MARKERS)
+
+
+class DriverSupervisor:
+    """Driver của 1 worker, tự mở lại theo số trang / RSS / crash.
+
+    start(): mở Chrome mới (setup_driver). prepare(driver): chuẩn bị driver vừa mở (cửa sổ, cookie); lỗi
+    thì driver đó bị đóng và thử mở lại từ đầu.
+    on_quit(driver): gọi trước khi đóng 1 driver (vd. log_resource_summary).
+    Worker đọc `supervisor.driver` sau mỗi lần page() / crashed() trả về True; None nghĩa là không mở lại
+    được Chrome, worker phải trả item đang giữ và dừng. Các hàm của supervisor không raise.
+    """
+
+    def __init__(self, worker: str, start: Callable[[], object], prepare: Callable[[object], None] | None = None,
+                 on_quit: Callable[[object], None] | None = None, after_pages: int = RECYCLE_AFTER_PAGES,
+                 watermark_mb: float = RSS_WATERMARK_MB, check_every: int = RSS_CHECK_EVERY):
+        self.worker = worker
+        self._start = start
+        self._prepare = prepare
+        self._on_quit = on_quit
+        self.after_pages = after_pages
+        self.watermark = watermark_mb * 1024 * 1024
+        self.check_every = max(1, check_every)
+        self.pages = 0          # số trang của Chrome hiện tại
+        self.total_pages = 0
+        self.generation = 0     # số lần đã mở lại
+        self.driver = self._launch()
+
+    def _launch(self):
+        """Mở + chuẩn bị Chrome mới, thử tối đa START_ATTEMPTS lần. None nếu đều lỗi."""
+        for attempt in range(1, START_ATTEMPTS + 1):
+            driver = None
+            try:
+                driver = self._start()
+                if self._prepare is not None:
+                    self._prepare(driver)
+                return driver
+            except Exception as e:
+                logger.error(f"[{self.worker}] Không mở được Chrome (lần {attempt}/{START_ATTEMPTS}): {e}")
+                if driver is not None:
+                    try:
+                        driver.quit()
+                    except Exception:
+                        pass
+            if attempt < START_ATTEMPTS:
+                time.sleep(START_RETRY_S)
+        return None
+
+    def _sample(self) -> int:
+        from funcs.memory import get_rss_monitor, worker_rss
+
+        try:
+            rss = worker_rss(self.driver)
+        except Exception as e:
+            logger.debug(f"[{self.worker}] Lỗi khi đo RSS: {e}")
+            return 0
+        get_rss_monitor().record(self.worker, rss, pages=self.pages, total_pages=self.total_pages,
+                                 generation=self.generation)
+        return rss
+
+    def page(self) -> bool:
+        """Gọi sau mỗi trang đã xử lý xong, trước khi lấy item tiếp theo. True nếu vừa mở lại Chrome."""
+        if self.driver is None:
+            return False
+        self.pages += 1
+        self.total_pages += 1
+        if self.after_pages and self.pages >= self.after_pages:
+            self._sample()
+            self.recycle('pages')
+            return True
+        if self.pages % self.check_every == 0:
+            rss = self._sample()
+            if self.watermark and rss > self.watermark:
+                logger.warning(f"[{self.worker}] RSS {rss / 1048576:.0f} MiB vượt ngưỡng "
+                               f"{self.watermark / 1048576:.0f} MiB sau {self.pages} trang")
+                self.recycle('rss')
+                return True
+        return False
+
+    def crashed(self, exc: BaseException) -> bool:
+        """Lỗi `exc` là do Chrome đã chết thì mở lại Chrome và trả về True (item nên được xử lý lại, hoặc trả về
+        hàng đợi nếu `driver` là None)."""
+        if not is_crash(exc):
+            return False
+        logger.warning(f"[{self.worker}] Chrome không còn phản hồi sau {self.pages} trang ({str(exc).strip()[:120]})")
+        self.recycle('crash')
+        return True
+
+    def _quit(self):
+        driver, self.driver = self.driver, None
+        if driver is None:
+            return
+        if self._on_quit is not None:
+            try:
+                self._on_quit(driver)
+            except Exception as e:
+                logger.debug(f"[{self.worker}] Lỗi on_quit: {e}")
+        try:
+            driver.quit()
+        except Exception as e:
+            logger.debug(f"[{self.worker}] Lỗi khi đóng Chrome cũ: {e}")
+
+    def recycle(self, reason: str) -> bool:
+        t0 = time.monotonic()
+        pages = self.pages
+        self._quit()
+        self.driver = self._launch()
+        self.pages = 0
+        with _stats_lock:
+            _stats[reason if self.driver is not None else 'failed'] += 1
+        if self.driver is None:
+            logger.error(f"[{self.worker}] Không mở lại được Chrome ({reason}, sau {pages} trang)")
+            return False
+        self.generation += 1
+        logger.info(f"[{self.worker}] Đã mở lại Chrome ({reason}, {pages} trang, lần {self.generation}, "
+                    f"{time.monotonic() - t0:.1f}s)")
+        return True
+
+    def close(self):
+        if self.driver is not None and self.pages:
+            try:
+                self._sample()
+            except Exception:
+                pass
+        self._quit()
+
+
+def log_recycle_summary(log: logging.Logger | None = None, label: str = 'crawl') -> dict:
+    """Log số lần mở lại Chrome + RSS theo worker, ghi chuỗi RSS ra {MEMORY_SERIES_DIR}/memory_{label}_*.csv."""
+    from funcs.memory import get_rss_monitor
+
+    log = log or logger
+    with _stats_lock:
+        out = dict(_stats)
+    monitor = get_rss_monitor()
+    growth = monitor.series_summary()
+    if out:
+        log.info(f"[recycle] Mở lại Chrome {sum(out.values())} lần "
+                 f"({', '.join(f'{k}: {v}' for k, v in sorted(out.items()))})")
+    if growth:
+        mib = 1024 * 1024
+        log.info(f"[recycle] {growth['workers']} worker: RSS đỉnh {growth['peak_rss'] / mib:.0f} MiB mỗi worker, "
+                 f"tăng ~{growth['growth_per_100_pages'] / mib:.0f} MiB / 100 trang")
+        path = monitor.write_series(f"{MEMORY_SERIES_DIR}/memory_{label}_{time.strftime('%Y%m%d_%H%M%S')}.csv")
+        if path:
+            growth['series_path'] = path
+            log.info(f"[recycle] Chuỗi RSS theo worker: {path}")
+    return dict(out, **growth)
@@ -0,0 +1,169 @@
+from collections import OrderedDict
+from pathlib import Path
+import json
+import logging
+import os
+import re
+import threading
+import time
+import unicodedata
+
+logger = logging.getLogger(__name__)
+
+# Các hậu tố trang trí thường gặp ở cuối tên shop Shopee, bỏ đi trước khi so tên (đã bỏ dấu, viết thường)
+NAME_SUFFIXES = (
+    'official store', 'official shop', 'official', 'flagship store', 'store', 'mall', 'shopee mall',
+    'chinh hang', 'vietnam', 'viet nam', 'vn',
+)
+
+_SUFFIX_RE = re.compile(r'(?:\s+(?:' + '|'.join(re.escape(s) for s in sorted(NAME_SUFFIXES, key=len, reverse=True))
+                        + r'))+$')
+
+
+def strip_diacritics(text: str) -> str:
+    """'Đồ Gia Dụng' -> 'Do Gia Dung' (đ/Đ không tách được bằng NFKD nên thay riêng)."""
+    text = (text or '').replace('đ', 'd').replace('Đ', 'D')
+    return ''.join(ch for ch in unicodedata.normalize('NFKD', text) if not unicodedata.combining(ch))
+
+
+def normalize_shop_name(name: str) -> str:
+    """Key cache của 1 tên shop: bỏ dấu, viết thường, bỏ ký tự không phải chữ/số, gộp khoảng trắng
+    và bỏ các hậu tố như 'Official Store', 'Mall'. Tên chỉ toàn hậu tố thì giữ nguyên phần đã chuẩn hoá.
+    """
+    text = strip_diacritics(name).lower()
+    text = re.sub(r'[^\w]+', ' ', text).replace('_', ' ')
+    text = re.sub(r'\s+', ' ', text).strip()
+    stripped = _SUFFIX_RE.sub('', ' ' + text).strip()
+    return stripped or text
+
+
+class GgmapQueryCache:
+    """Cache kết quả tìm kiếm Google Maps theo tên shop đã chuẩn hoá, lưu qua các lần chạy.
+
+    - entry: key -> {query, results: [{name, href}], ts}; hết hạn sau `ttl` giây (kết quả rỗng
+      sau `negative_ttl` giây, để lần sau tìm lại)
+    - giữ tối đa `max_entries` entry, bỏ entry dùng lâu nhất (LRU) khi vượt
+    - file JSON được ghi lại (tmp + os.replace) khi save() và sau mỗi `save_every` entry mới
+    - get() được tính vào hit/miss của log_report(); peek() để kiểm tra lại tên đã get() rồi, không tính lần 2
+    """
+
+    def __init__(self, path: str | Path, ttl: float = 30 * 86400, negative_ttl: float = 3 * 86400,
+                 max_entries: int = 200_000, save_every: int = 200):
+        self.path = Path(path)
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.max_entries = max(1, int(max_entries))
+        self.save_every = save_every
+        self._lock = threading.Lock()
+        # giữ suốt lúc ghi file: save() từ put() của worker và từ main không ghi chồng lên cùng file tmp
+        self._save_lock = threading.Lock()
+        self._entries: OrderedDict[str, dict] = OrderedDict()
+        self._unsaved = 0
+        self.stats = {'hits': 0, 'misses': 0, 'expired': 0, 'evicted': 0, 'puts': 0}
+        self._load()
+
+    def _load(self):
+        try:
+            if not self.path.exists():
+                return
+            with self.path.open('r', encoding='utf-8') as f:
+                data = json.load(f) or {}
+            now = time.time()
+            # file lưu theo thứ tự dùng gần nhất ở cuối, giữ nguyên thứ tự đó cho LRU
+            for key, entry in (data.get('entries') or {}).items():
+                if isinstance(entry, dict) and not self._expired(entry, now):
+                    self._entries[key] = entry
+            self._evict()
+            logger.info(f'Đã đọc {len(self._entries)} truy vấn ggmap trong cache {self.path}')
+        except Exception as e:
+            logger.exception(f'Lỗi khi đọc cache ggmap {self.path}, bỏ qua cache cũ: {e}')
+
+    def _expired(self, entry: dict, now: float) -> bool:
+        ttl = self.ttl if entry.get('results') else self.negative_ttl
+        try:
+            return now - float(entry.get('ts') or 0) > ttl
+        except Exception:
+            return True
+
+    def _evict(self):
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.stats['evicted'] += 1
+
+    def get(self, shop_name: str) -> list[dict] | None:
+        """Kết quả đã lưu cho tên shop, None nếu chưa có hoặc đã hết hạn."""
+        key = normalize_shop_name(shop_name)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self._expired(entry, time.time()):
+                del self._entries[key]
+                self.stats['expired'] += 1
+                entry = None
+            if entry is None:
+                self.stats['misses'] += 1
+                return None
+            self._entries.move_to_end(key)
+            self.stats['hits'] += 1
+            return [dict(r) for r in entry.get('results') or []]
+
+    def peek(self, shop_name: str) -> list[dict] | None:
+        """Như get() nhưng không tính vào hit/miss."""
+        key = normalize_shop_name(shop_name)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or self._expired(entry, time.time()):
+                return None
+            self._entries.move_to_end(key)
+            return [dict(r) for r in entry.get('results') or []]
+
+    def put(self, shop_name: str, results: list[dict]):
+        key = normalize_shop_name(shop_name)
+        if not key:
+            return
+        with self._lock:
+            self._entries[key] = {
+                'query': shop_name,
+                'results': [{'name': r.get('name', ''), 'href': r.get('href', '')} for r in results or []],
+                'ts': time.time(),
+            }
+            self._entries.move_to_end(key)
+            self.stats['puts'] += 1
+            self._evict()
+            self._unsaved += 1
+            due = self.save_every and self._unsaved >= self.save_every
+        if due:
+            self.save()
+
+    def save(self) -> bool:
+        with self._save_lock:
+            with self._lock:
+                if not self._unsaved and self.path.exists():
+                    return True
+                data = {'version': 1, 'entries': dict(self._entries)}
+                self._unsaved = 0
+            tmp = self.path.with_suffix(self.path.suffix + '.tmp')
+            try:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                with tmp.open('w', encoding='utf-8') as f:
+                    json.dump(data, f, ensure_ascii=False)
+                os.replace(tmp, self.path)
+            except Exception as e:
+                logger.exception(f'Lỗi khi ghi cache ggmap {self.path}: {e}')
+                return False
+            return True
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
+
+    def log_report(self, log: logging.Logger | None = None) -> dict:
+        log = log or logger
+        with self._lock:
+            stats = dict(self.stats)
+            stats['entries'] = len(self._entries)
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_ratio'] = stats['hits'] / lookups if lookups else 0.0
+        log.info(f"[ggmap_cache] {stats['hits']}/{lookups} truy vấn dùng cache ({stats['hit_ratio']:.0%}), "
+                 f"{stats['puts']} truy vấn mới, {stats['expired']} hết hạn, {stats['evicted']} bị bỏ, "
+                 f"{stats['entries']} entry")
+        return stats
@@ -0,0 +1,391 @@
+"""Các backend parse page_source Google Maps cho `parse_ggmap_results`.
+
+Mỗi backend trả về list {name, href} theo cùng một quy tắc:
+- container: div[role=feed] đầu tiên, fallback div có aria-label bắt đầu bằng 'kết quả'
+- chỉ lấy anchor có href chứa '/maps/place', '/place/' hoặc '/maps?cid='
+- href tương đối được nối với https://www.google.com, bỏ href trùng
+- name: aria-label -> text của anchor -> text của tối đa 4 cấp cha (dài hơn 2 ký tự)
+
+Backend trả về None khi không dùng được (thiếu thư viện, không chắc chắn kết quả)
+để caller chuyển sang backend kế tiếp. Không raise exception.
+"""
+from html.parser import HTMLParser
+import logging
+import re
+import urllib.parse
+from typing import Callable, Iterable, Optional
+
+logger = logging.getLogger(__name__)
+
+# Thứ tự ưu tiên = nhanh nhất trước (đo bằng benchmarks/bench_parse_ggmap_results.py)
+GGMAP_PARSER_BACKENDS = ('scan', 'selectolax', 'lxml', 'html.parser')
+
+_SKIP_TEXT_TAGS = ('script', 'style', 'template')
+_VOID_TAGS = frozenset(('area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input', 'link',
+                        'meta', 'param', 'source', 'track', 'wbr'))
+
+
+def is_place_href(href: str) -> bool:
+    return ('/maps/place' in href) or ('/place/' in href) or ('/maps?cid=' in href)
+
+
+def _absolute(href: str) -> str:
+    if href.startswith('/'):
+        return urllib.parse.urljoin('https://www.google.com', href)
+    return href
+
+
+def _join_text(strings: Iterable[str], separator: str = '') -> str:
+    """Giống BeautifulSoup.get_text(separator, strip=True)."""
+    return separator.join(s for s in (x.strip() for x in strings) if s)
+
+
+def _collect(anchors: Iterable, max_items: int,
+             get_href: Callable, get_label: Callable,
+             get_text: Callable, get_parent: Callable) -> list[dict]:
+    results: list[dict] = []
+    seen = set()
+    for a in anchors:
+        if len(results) >= max_items:
+            break
+
+        href = get_href(a) or ''
+        if not is_place_href(href):
+            continue
+        href = _absolute(href)
+        if href in seen:
+            continue
+        seen.add(href)
+
+        name = get_label(a) or get_text(a, '') or ''
+        if not name:
+            parent = get_parent(a)
+            for _ in range(4):
+                if parent is None:
+                    break
+                text = get_text(parent, ' ')
+                if text and len(text) > 2:
+                    name = text
+                    break
+                parent = get_parent(parent)
+
+        results.append({'name': name, 'href': href})
+    return results
+
+
+# ---------------------------------------------------------------- html.parser
+def parse_with_html_parser(page_source: str, max_items: int = 5) -> Optional[list[dict]]:
+    try:
+        from bs4 import BeautifulSoup
+    except Exception:
+        return None
+
+    soup = BeautifulSoup(page_source, 'html.parser')
+    container = soup.find('div', attrs={'role': 'feed'})
+    if not container:
+        container = soup.find(lambda tag: tag.name == 'div' and tag.get('aria-label', '').lower().startswith('kết quả'))
+    if not container:
+        return []
+
+    return _collect(
+        container.find_all('a', href=True), max_items,
+        get_href=lambda a: a['href'],
+        get_label=lambda a: a.get('aria-label'),
+        get_text=lambda el, sep: el.get_text(separator=sep, strip=True),
+        get_parent=lambda el: el.parent,
+    )
+
+
+# ----------------------------------------------------------------------- lxml
+def _lxml_strings(el):
+    if el.text and el.tag not in _SKIP_TEXT_TAGS:
+        yield el.text
+    for child in el:
+        if isinstance(child.tag, str):
+            yield from _lxml_strings(child)
+        if child.tail:
+            yield child.tail
+
+
+def parse_with_lxml(page_source: str, max_items: int = 5) -> Optional[list[dict]]:
+    try:
+        import lxml.html
+    except Exception:
+        return None
+
+    if not page_source or not page_source.strip():
+        return []
+
+    root = lxml.html.document_fromstring(page_source)
+    container = next(root.iterfind(".//div[@role='feed']"), None)
+    if container is None:
+        container = next((d for d in root.iter('div')
+                          if (d.get('aria-label') or '').lower().startswith('kết quả')), None)
+    if container is None:
+        return []
+
+    return _collect(
+        container.iterfind('.//a[@href]'), max_items,
+        get_href=lambda a: a.get('href'),
+        get_label=lambda a: a.get('aria-label'),
+        get_text=lambda el, sep: _join_text(_lxml_strings(el), sep),
+        get_parent=lambda el: el.getparent(),
+    )
+
+
+# ----------------------------------------------------------------- selectolax
+def _lexbor_strings(node):
+    for child in node.iter(include_text=True):
+        if child.tag == '-text':
+            yield child.text(deep=False)
+        elif child.tag not in _SKIP_TEXT_TAGS and not child.tag.startswith('-'):
+            yield from _lexbor_strings(child)
+
+
+def parse_with_selectolax(page_source: str, max_items: int = 5) -> Optional[list[dict]]:
+    try:
+        from selectolax.lexbor import LexborHTMLParser
+    except Exception:
+        return None
+
+    tree = LexborHTMLParser(page_source)
+    container = tree.css_first('div[role="feed"]')
+    if container is None:
+        container = next((d for d in tree.css('div[aria-label]')
+                          if (d.attributes.get('aria-label') or '').lower().startswith('kết quả')), None)
+    if container is None:
+        return []
+
+    return _collect(
+        container.css('a[href]'), max_items,
+        get_href=lambda a: a.attributes.get('href'),
+        get_label=lambda a: a.attributes.get('aria-label'),
+        get_text=lambda el, sep: _join_text(_lexbor_strings(el), sep),
+        get_parent=lambda el: el.parent,
+    )
+
+
+# ----------------------------------------------------------------------- scan
+# Vị trí thẻ mở container được tìm bằng str.find trên một chuỗi cố định (rẻ trên page vài MB),
+# sau đó mới kiểm tra ngữ cảnh bằng regex; cuối cùng thẻ mở được parse lại để xác nhận.
+_FEED_NEEDLES = ('feed',)
+_FEED_PREFIX_RE = re.compile(r'''\srole\s*=\s*["']?$''', re.IGNORECASE)
+_RESULTS_LABEL_NEEDLES = ('quả', 'Quả', 'QUẢ')
+_RESULTS_LABEL_PREFIX_RE = re.compile(r'''\saria-label\s*=\s*["']?kết $''', re.IGNORECASE)
+
+
+class _ScanNode:
+    __slots__ = ('tag', 'attrs', 'parent', 'children', 'closed')
+
+    def __init__(self, tag, attrs, parent):
+        self.tag = tag
+        self.attrs = attrs
+        self.parent = parent
+        self.children = []
+        self.closed = False
+
+
+def _scan_strings(node):
+    for child in node.children:
+        if isinstance(child, str):
+            yield child
+        else:
+            yield from _scan_strings(child)
+
+
+class _FeedScanner(HTMLParser):
+    """Dựng cây con tối giản của riêng container, dừng khi đã đủ max_items anchor."""
+
+    def __init__(self, max_items: int):
+        super().__init__(convert_charrefs=True)
+        self.max_items = max_items
+        self.root: Optional[_ScanNode] = None
+        self.stack: list[_ScanNode] = []
+        self.picked: list[_ScanNode] = []
+        self.seen_hrefs = set()
+        self.done = False
+        self.outside = False
+
+    def _open(self, tag, attrs, push: bool):
+        if self.done:
+            return
+        parent = self.stack[-1] if self.stack else None
+        if parent is None and self.root is not None:
+            return
+        node = _ScanNode(tag, dict(attrs), parent)
+        if parent is None:
+            self.root = node
+        else:
+            parent.children.append(node)
+
+        if tag == 'a' and node.attrs.get('href') is not None:
+            href = node.attrs.get('href') or ''
+            if is_place_href(href) and len(self.picked) < self.max_items:
+                href = _absolute(href)
+                if href not in self.seen_hrefs:
+                    self.seen_hrefs.add(href)
+                    self.picked.append(node)
+
+        if push and tag not in _VOID_TAGS:
+            self.stack.append(node)
+        else:
+            node.closed = True
+
+    def handle_starttag(self, tag, attrs):
+        self._open(tag, attrs, push=True)
+
+    def handle_startendtag(self, tag, attrs):
+        self._open(tag, attrs, push=False)
+
+    def handle_endtag(self, tag):
+        if self.done or not any(n.tag == tag for n in self.stack):
+            return
+        while self.stack:
+            node = self.stack.pop()
+            node.closed = True
+            if node.tag == tag:
+                break
+        if not self.stack:
+            self.done = True
+        elif len(self.picked) >= self.max_items and all(self._name_ready(a) for a in self.picked):
+            self.done = True
+
+    def handle_data(self, data):
+        if self.done or not self.stack:
+            return
+        if self.stack[-1].tag in _SKIP_TEXT_TAGS:
+            return
+        self.stack[-1].children.append(data)
+
+    def _name_ready(self, a: _ScanNode) -> bool:
+        if a.attrs.get('aria-label'):
+            return True
+        if not a.closed:
+            return False
+        if _join_text(_scan_strings(a)):
+            return True
+        parent = a.parent
+        for _ in range(4):
+            if parent is None:
+                # cần text ngoài container -> không đủ thông tin, nhường backend khác
+                self.outside = True
+                return True
+            if not parent.closed:
+                return False
+            text = _join_text(_scan_strings(parent), ' ')
+            if text and len(text) > 2:
+                return True
+            parent = parent.parent
+        return True
+
+    def finish(self):
+        if not self.done:
+            self.close()
+            for node in self.stack:
+                node.closed = True
+            self.stack = []
+        for a in self.picked:
+            self._name_ready(a)
+
+
+def _find_attr(page_source: str, needles: tuple, prefix_re: re.Pattern):
+    hits = []
+    for needle in needles:
+        pos = page_source.find(needle)
+        while pos != -1:
+            if prefix_re.search(page_source, max(0, pos - 64), pos):
+                hits.append(pos)
+            pos = page_source.find(needle, pos + 1)
+    return sorted(hits)
+
+
+def _scan_container(page_source: str, needles: tuple, prefix_re: re.Pattern, accept: Callable, max_items: int):
+    for found in _find_attr(page_source, needles, prefix_re):
+        start = page_source.rfind('<', 0, found)
+        if start == -1 or page_source[start + 1:start + 4].lower() != 'div':
+            continue
+        scanner = _FeedScanner(max_items)
+        # xác nhận thẻ mở thật sự là container trước khi quét tiếp
+        end = page_source.find('>', start)
+        scanner.feed(page_source[start:end + 1 if end != -1 else len(page_source)])
+        if scanner.root is not None and scanner.root.tag == 'div' and accept(scanner.root.attrs):
+            chunk = 4096
+            offset = end + 1 if end != -1 else len(page_source)
+            while not scanner.done and offset < len(page_source):
+                scanner.feed(page_source[offset:offset + chunk])
+                offset += chunk
+            scanner.finish()
+            return scanner
+
+
+def parse_with_scan(page_source: str, max_items: int = 5) -> Optional[list[dict]]:
+    if not page_source:
+        return []
+
+    scanner = _scan_container(page_source, _FEED_NEEDLES, _FEED_PREFIX_RE,
+                              lambda attrs: attrs.get('role') == 'feed', max_items)
+    if scanner is None:
+        scanner = _scan_container(page_source, _RESULTS_LABEL_NEEDLES, _RESULTS_LABEL_PREFIX_RE,
+                                  lambda attrs: (attrs.get('aria-label') or '').lower().startswith('kết quả'),
+                                  max_items)
+    if scanner is None:
+        return []
+    if scanner.outside:
+        return None
+
+    return _collect(
+        scanner.picked, max_items,
+        get_href=lambda a: a.attrs.get('href'),
+        get_label=lambda a: a.attrs.get('aria-label'),
+        get_text=lambda el, sep: _join_text(_scan_strings(el), sep),
+        get_parent=lambda el: el.parent,
+    )
+
+
+_PARSERS: dict[str, Callable[[str, int], Optional[list[dict]]]] = {
+    'selectolax': parse_with_selectolax,
+    'lxml': parse_with_lxml,
+    'scan': parse_with_scan,
+    'html.parser': parse_with_html_parser,
+}
+
+
+def available_backends() -> list[str]:
+    """Các backend dùng được trong môi trường hiện tại, theo thứ tự ưu tiên."""
+    out = []
+    for name in GGMAP_PARSER_BACKENDS:
+        try:
+            if name == 'scan':
+                pass
+            elif name == 'selectolax':
+                import selectolax.lexbor  # noqa: F401
+            elif name == 'lxml':
+                import lxml.html  # noqa: F401
+            elif name == 'html.parser':
+                import bs4  # noqa: F401
+        except Exception:
+            continue
+        out.append(name)
+    return out
+
+
+def parse(page_source: str, max_items: int = 5, backend: Optional[str] = None) -> list[dict]:
+    """Parse bằng `backend` (None = nhanh nhất đang có), tự chuyển backend kế tiếp nếu không dùng được."""
+    order = list(available_backends())
+    if backend:
+        if backend not in _PARSERS:
+            logger.warning(f"Backend parse ggmap không hợp lệ: {backend}, dùng mặc định")
+        else:
+            order = [backend] + [b for b in order if b != backend]
+
+    for name in order:
+        try:
+            results = _PARSERS[name](page_source or '', max_items)
+        except Exception as e:
+            logger.debug(f"Backend {name} lỗi khi parse page_source: {e}")
+            continue
+        if results is not None:
+            return results
+
+    logger.error("Không có backend nào parse được page_source ggmap")
+    return []
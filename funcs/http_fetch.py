@@ -0,0 +1,189 @@
+import asyncio
+import json
+import logging
+import os
+import time
+
+from funcs.shopee_api import parse_item_href
+
+logger = logging.getLogger(__name__)
+
+SHOPEE_BASE_URL = 'https://shopee.vn'
+SHOP_INFO_PATH = '/api/v4/product/get_shop_info'
+
+_BLOCK_STATUSES = (401, 403, 418, 429)
+_BLOCK_MARKERS = ('captcha', '/verify/', 'Trang không khả dụng', 'Lỗi tải', 'tần suất truy cập bất thường')
+
+DEFAULT_HEADERS = {
+    'User-Agent': ('Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 '
+                   '(KHTML, like Gecko) Chrome/129.0.0.0 Safari/537.36'),
+    'Accept': 'application/json',
+    'Accept-Language': 'vi-VN,vi;q=0.9',
+    'X-Api-Source': 'pc',
+    'X-Shopee-Language': 'vi',
+    'X-Requested-With': 'XMLHttpRequest',
+}
+
+
+def load_cookie_jar(path: str | None = None, kind: str = 'shopee') -> dict[str, str]:
+    """Đọc cùng file cookie mà load_cookies_to_driver dùng, trả về {name: value}."""
+    if path is None:
+        try:
+            import config
+            path = getattr(config, 'COOKIES_FILE_PATH', None)
+        except Exception:
+            path = None
+        path = path or f'cookies/{kind}_cookies.json'
+
+    if not os.path.exists(path):
+        logger.warning(f'File cookies không tồn tại: {path}')
+        return {}
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            cookies = json.load(f)
+    except Exception as e:
+        logger.error(f"Không thể đọc file cookies '{path}': {e}")
+        return {}
+
+    jar = {}
+    for c in cookies if isinstance(cookies, list) else []:
+        if isinstance(c, dict) and c.get('name'):
+            jar[str(c['name'])] = str(c.get('value', ''))
+    return jar
+
+
+def looks_blocked(status: int, text: str) -> bool:
+    if status in _BLOCK_STATUSES:
+        return True
+    head = (text or '')[:4000]
+    if any(m in head for m in _BLOCK_MARKERS):
+        return True
+    # API trả 200 nhưng error != 0 và không có data (anti-bot / cần đăng nhập)
+    try:
+        js = json.loads(head) if head.lstrip().startswith('{') else None
+    except Exception:
+        js = None
+    if isinstance(js, dict) and js.get('error') not in (None, 0) and not js.get('data'):
+        return True
+    return False
+
+
+class HttpShopResolver:
+    """Lấy thông tin shop của nhiều sản phẩm cùng lúc bằng HTTP (aiohttp), không mở Chrome.
+
+    - 1 ClientSession dùng chung: connection pool + keep-alive, giới hạn `concurrency` request
+      đồng thời và `per_host` kết nối mỗi host
+    - mỗi shopid chỉ gọi API 1 lần (các sản phẩm cùng shop dùng chung kết quả)
+    - response trông như bị chặn -> trả None cho sản phẩm đó để caller chạy lại bằng browser;
+      bị chặn liên tiếp `max_blocked` lần thì dừng hẳn đường HTTP
+    """
+
+    def __init__(self, cookies: dict | None = None, base_url: str = SHOPEE_BASE_URL,
+                 concurrency: int = 16, per_host: int = 8, timeout: float = 15.0, max_blocked: int = 5):
+        self.cookies = cookies or {}
+        self.base_url = base_url.rstrip('/')
+        self.concurrency = max(1, concurrency)
+        self.per_host = max(1, per_host)
+        self.timeout = timeout
+        self.max_blocked = max_blocked
+        self.stats = {'requests': 0, 'ok': 0, 'blocked': 0, 'errors': 0, 'cache_hits': 0}
+        self._consecutive_blocked = 0
+        self._tripped = False
+
+    @property
+    def tripped(self) -> bool:
+        """True khi đã dừng đường HTTP vì bị chặn liên tiếp."""
+        return self._tripped
+
+    async def _fetch_shop(self, session, sem, shopid: str) -> list[dict] | None:
+        from funcs.shopee_api import shops_from_payloads
+
+        if self._tripped:
+            return None
+        async with sem:
+            if self._tripped:
+                return None
+            self.stats['requests'] += 1
+            try:
+                async with session.get(f'{self.base_url}{SHOP_INFO_PATH}', params={'shopid': shopid},
+                                       headers={'Referer': f'{self.base_url}/'}) as resp:
+                    text = await resp.text()
+                    status = resp.status
+            except Exception as e:
+                self.stats['errors'] += 1
+                logger.debug(f'Lỗi HTTP khi lấy shop {shopid}: {e}')
+                return None
+
+        if looks_blocked(status, text):
+            self.stats['blocked'] += 1
+            self._consecutive_blocked += 1
+            if self._consecutive_blocked >= self.max_blocked and not self._tripped:
+                self._tripped = True
+                logger.warning(f'Bị chặn {self._consecutive_blocked} lần liên tiếp, dừng đường HTTP, chuyển sang browser')
+            return None
+        self._consecutive_blocked = 0
+
+        try:
+            shops = shops_from_payloads([json.loads(text)])
+        except Exception as e:
+            self.stats['errors'] += 1
+            logger.debug(f'Response shop {shopid} không phải JSON: {e}')
+            return None
+        self.stats['ok'] += 1
+        return shops
+
+    async def resolve_async(self, hrefs: list[str]) -> list[list[dict] | None]:
+        import aiohttp
+
+        connector = aiohttp.TCPConnector(limit=self.concurrency, limit_per_host=self.per_host,
+                                         keepalive_timeout=30, ttl_dns_cache=300)
+        timeout = aiohttp.ClientTimeout(total=self.timeout)
+        sem = asyncio.Semaphore(self.concurrency)
+        tasks: dict[str, asyncio.Task] = {}
+
+        async with aiohttp.ClientSession(connector=connector, timeout=timeout, headers=DEFAULT_HEADERS,
+                                         cookies=self.cookies) as session:
+            waits = []
+            for href in hrefs:
+                ids = parse_item_href(href)
+                if ids is None:
+                    waits.append(None)
+                    continue
+                shopid = ids[0]
+                if shopid in tasks:
+                    self.stats['cache_hits'] += 1
+                else:
+                    tasks[shopid] = asyncio.ensure_future(self._fetch_shop(session, sem, shopid))
+                waits.append(tasks[shopid])
+            done = await asyncio.gather(*tasks.values())
+            by_shop = dict(zip(tasks.keys(), done))
+
+        results = []
+        for href, task in zip(hrefs, waits):
+            if task is None:
+                results.append(None)
+            else:
+                shops = by_shop.get(parse_item_href(href)[0])
+                results.append([dict(s) for s in shops] if shops is not None else None)
+        return results
+
+    def resolve(self, hrefs: list[str]) -> list[list[dict] | None]:
+        """Trả về list cùng thứ tự với hrefs: [shop,...] nếu lấy được, None nếu cần chạy lại bằng browser."""
+        try:
+            import aiohttp  # noqa: F401
+        except ImportError:
+            logger.warning('Chưa cài aiohttp, bỏ qua chế độ fetch HTTP')
+            return [None] * len(hrefs)
+
+        t0 = time.perf_counter()
+        try:
+            results = asyncio.run(self.resolve_async(hrefs))
+        except Exception as e:
+            logger.error(f'Lỗi khi lấy shop qua HTTP, chuyển toàn bộ sang browser: {e}')
+            return [None] * len(hrefs)
+        elapsed = time.perf_counter() - t0
+        resolved = sum(1 for r in results if r is not None)
+        logger.info(f'[http] {resolved}/{len(hrefs)} sản phẩm lấy được shop qua HTTP trong {elapsed:.1f}s '
+                    f"({self.stats['requests']} request, {self.stats['cache_hits']} dùng lại, "
+                    f"{self.stats['blocked']} bị chặn, {self.stats['errors']} lỗi)")
+        return results
@@ -8,60 +8,146 @@ import config
 logger = logging.getLogger(__name__)
 
 
-def load_cookies_to_driver(driver, cookies_file: Optional[str] = None, type: str = "shopee") -> int:
-    """Tải cookie từ file JSON vào driver Selenium.
-
-    - cookies_file: đường dẫn tới file cookie. Nếu None, sẽ lấy `config.COOKIES_FILE_PATH`.
-    - Trả về số cookie đã thử thêm thành công.
+def normalize_cookie(cookie) -> Optional[dict]:
+    """Chuẩn hoá 1 cookie export từ extension (EditThisCookie, Cookie-Editor...) sang dạng Selenium nhận.
 
-    Hàm luôn xử lý lỗi và không raise exception (Nguyên tắc NEVER CRASH).
+    Trả về dict mới (không sửa bản ghi gốc), None nếu bản ghi không phải dict.
     """
-    # Lấy đường dẫn từ tham số hoặc config
-    path = cookies_file or getattr(config, "COOKIES_FILE_PATH", f"cookies/{type}_cookies.json")
+    if not isinstance(cookie, dict):
+        return None
+    cookie = dict(cookie)
+
+    if "expirationDate" in cookie:
+        try:
+            cookie["expiry"] = int(cookie["expirationDate"])
+            del cookie["expirationDate"]
+        except Exception:
+            cookie.pop("expirationDate", None)
+
+    # Bỏ các key không hợp lệ cho Selenium
+    for k in ["hostOnly", "storeId", "id", "sameSite"]:
+        cookie.pop(k, None)
+
+    # Domain bắt đầu bằng '.' có thể gây lỗi cho add_cookie ở một số driver
+    if "domain" in cookie and isinstance(cookie["domain"], str) and cookie["domain"].startswith("."):
+        cookie["domain"] = cookie["domain"][1:]
+    return cookie
 
-    # Kiểm tra tồn tại file
+
+def read_cookies_file(path: str) -> Optional[list]:
+    """Đọc và chuẩn hoá file cookie JSON, None nếu file không tồn tại / không đọc được."""
     if not os.path.exists(path):
         logger.error(f"File cookies không tồn tại: {path}")
-        return 0
+        return None
 
     try:
         with open(path, "r", encoding="utf-8") as f:
             cookies = json.load(f)
     except Exception as e:
         logger.error(f"Không thể đọc file cookies '{path}': {e}")
-        return 0
+        return None
 
     if not isinstance(cookies, list):
         logger.warning(f"File cookies không phải list, bỏ qua: {path}")
-        return 0
+        return None
 
-    added = 0
+    out = []
     for cookie in cookies:
-        # Chuẩn hoá các trường khác nhau giữa các export formats
-        if not isinstance(cookie, dict):
+        cookie = normalize_cookie(cookie)
+        if cookie is None:
             logger.debug("Bản ghi cookie không phải dict, skip")
             continue
+        out.append(cookie)
+    return out
 
-        if "expirationDate" in cookie:
-            try:
-                cookie["expiry"] = int(cookie["expirationDate"])
-                del cookie["expirationDate"]
-            except Exception:
-                cookie.pop("expirationDate", None)
-
-        # Bỏ các key không hợp lệ cho Selenium
-        for k in ["hostOnly", "storeId", "id", "sameSite"]:
-            cookie.pop(k, None)
-
-        # Domain bắt đầu bằng '.' có thể gây lỗi cho add_cookie ở một số driver
-        if "domain" in cookie and isinstance(cookie["domain"], str) and cookie["domain"].startswith("."):
-            cookie["domain"] = cookie["domain"][1:]
 
+def add_cookies(driver, cookies: list, source: str = "") -> int:
+    """Thêm các cookie đã chuẩn hoá vào driver, trả về số cookie thêm thành công."""
+    added = 0
+    for cookie in cookies:
         try:
-            driver.add_cookie(cookie)
+            driver.add_cookie(dict(cookie))
             added += 1
         except Exception as e:
             logger.warning(f"Không thể thêm cookie '{cookie.get('name') or cookie.get('domain')}': {e}")
 
-    logger.info(f"Đã load {added} cookies vào driver (từ {path})")
+    logger.info(f"Đã load {added} cookies vào driver (từ {source})")
+    return added
+
+
+# URL gốc dùng cho cookie không có domain khi nạp qua DevTools (CDP bắt buộc có domain hoặc url)
+COOKIE_URLS = {"shopee": "https://shopee.vn/", "ggmap": "https://www.google.com/"}
+
+
+def to_cdp_cookie(cookie: dict, url: str) -> dict:
+    """Cookie dạng Selenium -> CookieParam của Network.setCookies."""
+    out = {"name": cookie["name"], "value": str(cookie.get("value", ""))}
+    if cookie.get("domain"):
+        out["domain"] = cookie["domain"]
+    else:
+        out["url"] = url
+    out["path"] = cookie.get("path") or "/"
+    for src, dst in (("secure", "secure"), ("httpOnly", "httpOnly")):
+        if src in cookie:
+            out[dst] = bool(cookie[src])
+    if isinstance(cookie.get("expiry"), (int, float)):
+        out["expires"] = cookie["expiry"]
+    return out
+
+
+def set_cookies_cdp(driver, cookies: list, url: str, source: str = "") -> int:
+    """Nạp mọi cookie trong 1 lệnh Network.setCookies; chạy được trước lần điều hướng đầu tiên.
+
+    Trả về số cookie đã gửi, 0 nếu driver không hỗ trợ CDP / lệnh lỗi.
+    """
+    params = [to_cdp_cookie(c, url) for c in cookies if c.get("name")]
+    try:
+        driver.execute_cdp_cmd("Network.setCookies", {"cookies": params})
+    except Exception as e:
+        logger.warning(f"Không nạp được cookies qua DevTools (từ {source}): {e}")
+        return 0
+    logger.info(f"Đã load {len(params)} cookies vào driver qua DevTools (từ {source})")
+    return len(params)
+
+
+def load_cookies_to_driver(driver, cookies_file: Optional[str] = None, type: str = "shopee",
+                           cookies: Optional[list] = None, source: str = "", mode: str = "selenium") -> int:
+    """Tải cookie từ file JSON vào driver Selenium.
+
+    - cookies_file: đường dẫn tới file cookie. Nếu None, sẽ lấy `config.COOKIES_FILE_PATH`.
+    - cookies: list cookie đã chuẩn hoá sẵn (vd. từ funcs.cookie_pool) - khi có thì không đọc file.
+    - mode='selenium': driver.add_cookie từng cookie, driver phải đang mở 1 trang của đúng domain.
+      mode='cdp': 1 lệnh Network.setCookies, gọi được ngay sau setup_driver (chưa cần mở trang nào).
+    - Trả về số cookie đã thử thêm thành công.
+
+    Hàm luôn xử lý lỗi và không raise exception (Nguyên tắc NEVER CRASH).
+    """
+    if cookies is None:
+        # Lấy đường dẫn từ tham số hoặc config
+        source = cookies_file or getattr(config, "COOKIES_FILE_PATH", f"cookies/{type}_cookies.json")
+        cookies = read_cookies_file(source)
+        if cookies is None:
+            return 0
+
+    if mode == "cdp":
+        return set_cookies_cdp(driver, cookies, COOKIE_URLS.get(type, "https://shopee.vn/"), source)
+    return add_cookies(driver, cookies, source or "cookie pool")
+
+
+def reload_session(driver, cookies_file: Optional[str] = None, type: str = "shopee",
+                   cookies: Optional[list] = None, source: str = "", mode: str = "selenium") -> int:
+    """Đổi phiên của driver: xoá cookie hiện tại, nạp lại cookie rồi tải lại trang. Không raise exception."""
+    try:
+        if mode == "cdp":
+            # delete_all_cookies của WebDriver chỉ xoá cookie của trang đang mở
+            driver.execute_cdp_cmd("Network.clearBrowserCookies", {})
+        else:
+            driver.delete_all_cookies()
+    except Exception as e:
+        logger.warning(f"Không xoá được cookie của driver: {e}")
+    added = load_cookies_to_driver(driver, cookies_file, type=type, cookies=cookies, source=source, mode=mode)
+    try:
+        driver.refresh()
+    except Exception as e:
+        logger.debug(f"Không refresh được sau khi đổi phiên: {e}")
     return added
@@ -0,0 +1,267 @@
+"""Đo RSS của cây process Chrome (chromedriver + browser + renderer/GPU...) theo từng worker.
+
+Dùng psutil nếu đã cài, không thì đọc /proc (Linux). Trên máy không đo được (macOS không có psutil,
+FakeDriver của benchmark) mọi hàm trả về 0 / rỗng chứ không raise.
+"""
+import csv
+import logging
+import os
+import statistics
+import sys
+import threading
+import time
+
+try:
+    import psutil
+except Exception:
+    psutil = None
+
+logger = logging.getLogger(__name__)
+
+# Chu kỳ lấy mẫu RSS của RssMonitor (giây)
+RSS_SAMPLE_S = 15.0
+
+
+def driver_pids(driver) -> list[int]:
+    """Các pid gốc của 1 driver: chromedriver và browser (uc.Chrome), hoặc của browser dùng chung (tab)."""
+    custom = getattr(driver, 'root_pids', None)
+    if callable(custom):
+        return custom()
+    pids = []
+    for pid in (getattr(getattr(getattr(driver, 'service', None), 'process', None), 'pid', None),
+                getattr(driver, 'browser_pid', None)):
+        if isinstance(pid, int) and pid > 0:
+            pids.append(pid)
+    return pids
+
+
+def _proc_children() -> dict[int, list[int]]:
+    children: dict[int, list[int]] = {}
+    for name in os.listdir('/proc'):
+        if not name.isdigit():
+            continue
+        try:
+            with open(f'/proc/{name}/stat', 'rb') as f:
+                stat = f.read()
+            # tên process nằm trong (...) và có thể chứa dấu cách: lấy phần sau dấu ')' cuối cùng
+            ppid = int(stat[stat.rindex(b')') + 2:].split()[1])
+        except Exception:
+            continue
+        children.setdefault(ppid, []).append(int(name))
+    return children
+
+
+def _proc_rss(pid: int) -> int:
+    try:
+        with open(f'/proc/{pid}/statm', 'rb') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except Exception:
+        return 0
+
+
+def process_tree(pids: list[int]) -> set[int]:
+    """Các pid trong `pids` còn sống cùng mọi process con cháu của chúng."""
+    out: set[int] = set()
+    if psutil is not None:
+        for pid in pids:
+            try:
+                proc = psutil.Process(pid)
+                out.add(pid)
+                out.update(c.pid for c in proc.children(recursive=True))
+            except Exception:
+                continue
+        return out
+    if not os.path.isdir('/proc'):
+        return out
+    children = _proc_children()
+    stack = [pid for pid in pids if os.path.exists(f'/proc/{pid}')]
+    while stack:
+        pid = stack.pop()
+        if pid in out:
+            continue
+        out.add(pid)
+        stack.extend(children.get(pid, ()))
+    return out
+
+
+def pid_rss(pid: int) -> int:
+    if psutil is not None:
+        try:
+            return psutil.Process(pid).memory_info().rss
+        except Exception:
+            return 0
+    return _proc_rss(pid)
+
+
+def tree_rss(pids: list[int]) -> int:
+    """Tổng RSS (byte) của cây process. RSS cộng dồn nên tính trùng phần shared memory giữa các process
+    Chrome; dùng để so sánh giữa các chế độ / theo thời gian chứ không phải số tuyệt đối chính xác."""
+    return sum(pid_rss(pid) for pid in process_tree(pids))
+
+
+def worker_rss(driver) -> int:
+    """RSS của 1 worker: cây process của driver, chia đều cho số tab nếu là tab của browser dùng chung."""
+    rss = tree_rss(driver_pids(driver))
+    shared = getattr(driver, 'shared_browser', None)
+    if shared is not None:
+        rss //= max(1, len(getattr(shared, 'tabs', ())))
+    return rss
+
+
+class RssMonitor:
+    """Lấy mẫu RSS của mọi driver đang chạy trong 1 thread nền.
+
+    Process của các driver dùng chung 1 browser (chế độ tab, funcs.shared_browser) chỉ được cộng 1 lần rồi chia
+    đều cho số worker đang chạy. summary() trả về RSS trung bình / đỉnh mỗi worker đang chạy.
+
+    Ngoài ra giữ chuỗi RSS theo từng worker (record(), do funcs.driver_supervisor ghi kèm số trang) để ước
+    lượng RAM tăng theo số trang và chọn số worker / ngưỡng mở lại Chrome.
+    """
+
+    def __init__(self, interval: float = RSS_SAMPLE_S):
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._drivers: dict[str, object] = {}
+        self._thread: threading.Thread | None = None
+        self.samples: list[dict] = []
+        self.series: dict[str, list[dict]] = {}
+
+    def register(self, worker: str, driver):
+        if not driver_pids(driver):
+            return
+        with self._lock:
+            self._drivers[worker] = driver
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='rss-monitor', daemon=True)
+                self._thread.start()
+
+    def unregister(self, worker: str):
+        with self._lock:
+            self._drivers.pop(worker, None)
+
+    def unregister_driver(self, driver):
+        with self._lock:
+            for worker in [w for w, d in self._drivers.items() if d is driver]:
+                del self._drivers[worker]
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            try:
+                self.sample()
+            except Exception as e:
+                logger.debug(f'Lỗi khi lấy mẫu RSS: {e}')
+
+    def sample(self) -> dict | None:
+        with self._lock:
+            drivers = dict(self._drivers)
+        pids: set[int] = set()
+        browsers: set[int] = set()
+        workers = 0
+        for worker, driver in drivers.items():
+            tree = process_tree(driver_pids(driver))
+            if not tree:
+                # browser đã đóng (worker quit) mà chưa unregister
+                self.unregister(worker)
+                continue
+            # tab của browser dùng chung: cây process của browser chỉ được cộng 1 lần
+            pids |= tree
+            browsers.add(id(getattr(driver, 'shared_browser', driver)))
+            workers += 1
+        if not workers:
+            return None
+        total = sum(pid_rss(pid) for pid in pids)
+        s = {'t': time.time(), 'workers': workers, 'browsers': len(browsers), 'rss': total,
+             'rss_per_worker': total / workers}
+        with self._lock:
+            self.samples.append(s)
+        return s
+
+    def record(self, worker: str, rss: int, **fields):
+        """Thêm 1 điểm vào chuỗi RSS của worker (bỏ qua khi không đo được RSS)."""
+        if rss <= 0:
+            return
+        with self._lock:
+            self.series.setdefault(worker, []).append(dict(t=time.time(), rss=rss, **fields))
+
+    def series_summary(self) -> dict:
+        """RSS đỉnh mỗi worker và mức tăng RSS / 100 trang (median theo từng đời Chrome của mỗi worker)."""
+        with self._lock:
+            series = {w: list(points) for w, points in self.series.items() if points}
+        if not series:
+            return {}
+        slopes = []
+        for points in series.values():
+            runs: dict = {}
+            for p in points:
+                runs.setdefault(p.get('generation', 0), []).append(p)
+            for run in runs.values():
+                first, last = run[0], run[-1]
+                pages = last.get('pages', 0) - first.get('pages', 0)
+                if pages > 0:
+                    slopes.append(100 * (last['rss'] - first['rss']) / pages)
+        return {
+            'workers': len(series),
+            'points': sum(len(points) for points in series.values()),
+            'peak_rss': max(p['rss'] for points in series.values() for p in points),
+            'growth_per_100_pages': statistics.median(slopes) if slopes else 0.0,
+        }
+
+    def write_series(self, path: str) -> str | None:
+        """Ghi chuỗi RSS theo worker ra CSV (1 dòng / điểm đo). Trả về đường dẫn, None nếu rỗng / lỗi."""
+        with self._lock:
+            rows = [dict(worker=w, **p) for w, points in self.series.items() for p in points]
+        if not rows:
+            return None
+        fields = ['t', 'worker'] + sorted({k for r in rows for k in r} - {'t', 'worker'})
+        try:
+            os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+            with open(path, 'w', encoding='utf-8', newline='') as f:
+                w = csv.DictWriter(f, fieldnames=fields)
+                w.writeheader()
+                w.writerows(sorted(rows, key=lambda r: r['t']))
+            return path
+        except Exception as e:
+            logger.warning(f'Không ghi được chuỗi RSS ra {path}: {e}')
+            return None
+
+    def summary(self) -> dict:
+        with self._lock:
+            samples = list(self.samples)
+        if not samples:
+            return {}
+        per_worker = [s['rss_per_worker'] for s in samples]
+        return {
+            'samples': len(samples),
+            'max_workers': max(s['workers'] for s in samples),
+            'max_browsers': max(s['browsers'] for s in samples),
+            'peak_rss': max(s['rss'] for s in samples),
+            'mean_rss_per_worker': sum(per_worker) / len(per_worker),
+            'peak_rss_per_worker': max(per_worker),
+        }
+
+
+_rss_monitor: RssMonitor | None = None
+_rss_monitor_lock = threading.Lock()
+
+
+def get_rss_monitor() -> RssMonitor:
+    global _rss_monitor
+    with _rss_monitor_lock:
+        if _rss_monitor is None:
+            _rss_monitor = RssMonitor()
+        return _rss_monitor
+
+
+def log_rss_summary(log: logging.Logger | None = None, label: str | None = None) -> dict:
+    log = log or logger
+    if label is None:
+        # BROWSER_MODE của funcs.setup_driver nếu đã được import (không import để tránh kéo theo uc)
+        label = getattr(sys.modules.get('funcs.setup_driver'), 'BROWSER_MODE', '')
+    s = get_rss_monitor().summary()
+    if s:
+        mib = 1024 * 1024
+        log.info(f"[rss{':' + label if label else ''}] {s['max_workers']} worker / {s['max_browsers']} browser: "
+                 f"RSS trung bình {s['mean_rss_per_worker'] / mib:.0f} MiB mỗi worker "
+                 f"(đỉnh {s['peak_rss_per_worker'] / mib:.0f} MiB), tổng đỉnh {s['peak_rss'] / mib:.0f} MiB")
+    return s
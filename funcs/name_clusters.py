@@ -0,0 +1,147 @@
+"""Gom các tên shop gần trùng nhau (chỉ khác phần trang trí) để chỉ tìm trên Google Maps 1 lần mỗi cụm.
+
+Không so từng cặp (O(n^2)): mỗi tên được chuẩn hoá (funcs.ggmap_cache.normalize_shop_name, bỏ thêm
+các token trang trí như 'official', 'vn' ở đầu / cuối tên và số cửa hàng ở cuối), tên trùng hẳn sau chuẩn hoá
+gộp luôn; các tên còn lại được băm MinHash trên 3-gram ký tự rồi chia band (LSH) - chỉ các tên rơi vào cùng
+bucket mới được so Jaccard thật với tên đại diện của cụm.
+
+Cụm gần trùng (Jaccard) chỉ dùng để thống kê / gợi ý; nơi dùng chung kết quả giữa các tên (find_shop_on_ggmap)
+chỉ nên dùng cho các tên có canonical_name trùng hẳn.
+"""
+import logging
+import random
+import re
+import zlib
+
+from funcs.ggmap_cache import normalize_shop_name
+
+logger = logging.getLogger(__name__)
+
+# Token chỉ để trang trí, bỏ khi đứng ở đầu / cuối tên (đã bỏ dấu, viết thường); ở giữa tên thì giữ
+DECORATION_TOKENS = frozenset((
+    'official', 'store', 'shop', 'mall', 'vn', 'vietnam', 'authentic', 'genuine', 'flagship',
+))
+# Tiền tố số cửa hàng / chi nhánh, chỉ bỏ khi đứng ngay trước số ở cuối tên ('Store 2', 'CS 3', 'Chi Nhánh 1').
+# 'so', 'no', 'chi', 'nhanh' còn là từ thường ('Sò Điệp Quán', 'Giao Hàng Nhanh') nên không bỏ ở chỗ khác
+BRANCH_PREFIXES = (('chi', 'nhanh'), ('co', 'so'), ('cs',), ('cn',), ('so',), ('no',), ('store',), ('shop',))
+
+NUM_PERM = 24
+BANDS = 8
+SHINGLE_SIZE = 3
+# bucket quá đông (tên rất ngắn / phổ biến) chỉ so với chừng này cụm để không thành O(n^2)
+MAX_BUCKET_CLUSTERS = 50
+
+_MASKS = tuple(random.Random(20240901).getrandbits(32) for _ in range(NUM_PERM))
+
+
+def canonical_name(name: str) -> str:
+    """Tên dùng để so: normalize_shop_name, bỏ số cửa hàng ở cuối ('store 2', 'cs 3', 'chi nhanh 1') rồi bỏ
+    token trang trí ở đầu / cuối tên. Không bao giờ chỉ còn lại số.
+
+    Số ở chỗ khác được giữ lại (và phải trùng khớp khi gom cụm) vì thường là 1 phần tên shop.
+    """
+    normalized = normalize_shop_name(name)
+    tokens = normalized.split()
+    if tokens and tokens[-1].isdigit():
+        for prefix in BRANCH_PREFIXES:
+            n = len(prefix)
+            if len(tokens) > n + 1 and tuple(tokens[-n - 1:-1]) == prefix:
+                tokens = tokens[:-n - 1]
+                break
+    # không bỏ nếu phần còn lại chỉ toàn số ('Shop 24' giữ nguyên)
+    while len(tokens) > 1 and tokens[-1] in DECORATION_TOKENS and not ''.join(tokens[:-1]).isdigit():
+        tokens.pop()
+    while len(tokens) > 1 and tokens[0] in DECORATION_TOKENS and not ''.join(tokens[1:]).isdigit():
+        tokens.pop(0)
+    return ' '.join(tokens) or normalized
+
+
+def _digits(canon: str) -> tuple:
+    return tuple(re.findall(r'\d+', canon))
+
+
+def shingles(text: str, size: int = SHINGLE_SIZE) -> set[int]:
+    text = f' {text} '
+    if len(text) <= size:
+        return {zlib.crc32(text.encode('utf-8'))}
+    return {zlib.crc32(text[i:i + size].encode('utf-8')) for i in range(len(text) - size + 1)}
+
+
+def jaccard(a: set, b: set) -> float:
+    if not a or not b:
+        return 0.0
+    inter = len(a & b)
+    return inter / (len(a) + len(b) - inter)
+
+
+def minhash(hashes: set[int]) -> tuple[int, ...]:
+    """Chữ ký MinHash: hoán vị = XOR với mask ngẫu nhiên cố định."""
+    return tuple(min(h ^ m for h in hashes) for m in _MASKS)
+
+
+def cluster_names(names: list[str], threshold: float = 0.8) -> dict[str, str]:
+    """Trả về {tên gốc: tên đại diện của cụm}. Tên đại diện là tên gặp đầu tiên của cụm.
+
+    `threshold`: Jaccard tối thiểu giữa 3-gram của tên chuẩn hoá và của tên đại diện; các số trong
+    tên (vd. 'A12') phải giống hệt.
+    """
+    rows = len(_MASKS) // BANDS
+    by_canonical: dict[str, str] = {}      # tên chuẩn hoá -> tên gốc đại diện của cụm
+    reps: list[tuple[tuple, set[int]]] = []  # các số trong tên + shingles của tên đại diện
+    rep_of_cluster: list[str] = []
+    buckets: dict[tuple, list[int]] = {}
+    result: dict[str, str] = {}
+
+    for name in names:
+        if name in result:
+            continue
+        canon = canonical_name(name)
+        if canon in by_canonical:
+            result[name] = by_canonical[canon]
+            continue
+
+        sh = shingles(canon)
+        digits = _digits(canon)
+        sig = minhash(sh)
+        keys = [(b, sig[b * rows:(b + 1) * rows]) for b in range(BANDS)]
+
+        best, best_score = None, threshold
+        checked = set()
+        for key in keys:
+            for cid in buckets.get(key, ()):
+                if cid in checked:
+                    continue
+                checked.add(cid)
+                if reps[cid][0] != digits:
+                    continue
+                score = jaccard(sh, reps[cid][1])
+                if score >= best_score:
+                    best, best_score = cid, score
+
+        if best is None:
+            best = len(reps)
+            reps.append((digits, sh))
+            rep_of_cluster.append(name)
+            for key in keys:
+                bucket = buckets.setdefault(key, [])
+                if len(bucket) < MAX_BUCKET_CLUSTERS:
+                    bucket.append(best)
+        by_canonical[canon] = rep_of_cluster[best]
+        result[name] = rep_of_cluster[best]
+
+    return result
+
+
+def log_cluster_report(names: list[str], clusters: dict[str, str], queries: int,
+                       log: logging.Logger | None = None) -> dict:
+    """Log số truy vấn Maps thật sự bớt được (`queries`: số tên còn phải tìm sau khi gộp tên trùng hẳn).
+
+    Số cụm gần trùng của cluster_names() chỉ để tham khảo, không quyết định tên nào được tìm.
+    """
+    log = log or logger
+    stats = {'names': len(names), 'unique_names': len(set(names)), 'queries': queries,
+             'queries_saved': len(names) - queries, 'fuzzy_clusters': len(set(clusters.values()))}
+    log.info(f"[name_clusters] {stats['names']} shop ({stats['unique_names']} tên khác nhau) -> "
+             f"{stats['queries']} truy vấn, bớt {stats['queries_saved']} truy vấn Google Maps "
+             f"({stats['fuzzy_clusters']} cụm gần trùng, chỉ để tham khảo)")
+    return stats
@@ -0,0 +1,71 @@
+from pathlib import Path
+import logging
+import os
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+def journal_path_for(csv_path: str | Path) -> Path:
+    """products/X.csv -> products/X.journal"""
+    return Path(csv_path).with_suffix('.journal')
+
+
+class ProgressJournal:
+    """Nhật ký tiến độ chỉ ghi nối (append-only): mỗi dòng là 1 key (href) đã xử lý xong.
+
+    Thay cho việc ghi lại toàn bộ CSV mỗi khi đổi 1 status: mark() chỉ append 1 dòng nên O(1).
+    Sau khi gộp trạng thái về CSV (compact) thì gọi remove() để xoá journal.
+    """
+
+    def __init__(self, path: str | Path, fsync: bool = False):
+        self.path = Path(path)
+        self.fsync = fsync
+        self._lock = threading.Lock()
+        self._fh = None
+
+    def load(self) -> set[str]:
+        """Đọc các key đã xong từ lần chạy trước (bỏ qua dòng cuối bị ghi dở)."""
+        keys: set[str] = set()
+        try:
+            if not self.path.exists():
+                return keys
+            with self.path.open('r', encoding='utf-8') as f:
+                for line in f:
+                    if not line.endswith('\n'):
+                        continue
+                    key = line.rstrip('\n')
+                    if key:
+                        keys.add(key)
+        except Exception as e:
+            logger.exception(f'Lỗi khi đọc journal {self.path}: {e}')
+        return keys
+
+    def mark(self, key: str):
+        key = (key or '').replace('\n', ' ').strip()
+        if not key:
+            return
+        with self._lock:
+            if self._fh is None:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                self._fh = self.path.open('a', encoding='utf-8')
+            self._fh.write(key + '\n')
+            self._fh.flush()
+            if self.fsync:
+                os.fsync(self._fh.fileno())
+
+    def close(self):
+        with self._lock:
+            if self._fh is not None:
+                try:
+                    self._fh.close()
+                except Exception:
+                    pass
+                self._fh = None
+
+    def remove(self):
+        self.close()
+        try:
+            self.path.unlink(missing_ok=True)
+        except Exception as e:
+            logger.debug(f'Không xoá được journal {self.path}: {e}')
@@ -0,0 +1,136 @@
+import logging
+import threading
+import time
+import urllib.parse
+
+logger = logging.getLogger(__name__)
+
+# Giới hạn cho từng domain, dùng chung cho mọi worker trong process (request/giây cho cả process).
+# rate: tốc độ ban đầu; increase: cộng thêm sau mỗi trang tải sạch; block_decrease / error_decrease:
+# nhân với rate khi gặp trang chặn / captcha hoặc lỗi tải; cooldown: không giảm 2 lần trong khoảng này
+# (nhiều worker cùng gặp 1 đợt chặn chỉ tính 1 lần).
+RATE_LIMITS = {
+    'shopee.vn': {'rate': 1.0, 'min_rate': 0.05, 'max_rate': 5.0, 'burst': 2.0, 'increase': 0.02,
+                  'block_decrease': 0.3, 'error_decrease': 0.7, 'cooldown': 10.0},
+    'google.com': {'rate': 1.0, 'min_rate': 0.05, 'max_rate': 4.0, 'burst': 2.0, 'increase': 0.02,
+                   'block_decrease': 0.3, 'error_decrease': 0.7, 'cooldown': 10.0},
+}
+
+
+class AdaptiveRateLimiter:
+    """Token bucket dùng chung giữa các worker, tốc độ tự điều chỉnh kiểu AIMD.
+
+    - acquire(): lấy 1 token trước mỗi lần điều hướng, chờ nếu bucket rỗng
+    - success(): trang tải sạch -> rate += increase (tăng cộng)
+    - failure('block' | 'error'): trang chặn / captcha / lỗi tải -> rate *= hệ số (giảm nhân);
+      'block' còn xả hết token để các worker cùng dừng 1 nhịp
+    Chờ bằng time.sleep nên các worker không giữ lock khi chờ.
+    """
+
+    def __init__(self, name: str, rate: float = 1.0, min_rate: float = 0.05, max_rate: float = 5.0,
+                 burst: float = 2.0, increase: float = 0.02, block_decrease: float = 0.3,
+                 error_decrease: float = 0.7, cooldown: float = 10.0):
+        self.name = name
+        self.rate = float(rate)
+        self.min_rate = float(min_rate)
+        self.max_rate = float(max_rate)
+        self.burst = max(1.0, float(burst))
+        self.increase = float(increase)
+        self.block_decrease = float(block_decrease)
+        self.error_decrease = float(error_decrease)
+        self.cooldown = float(cooldown)
+        self._lock = threading.Lock()
+        self._tokens = 1.0
+        self._last = time.monotonic()
+        self._last_cut = float('-inf')
+        self.stats = {'acquired': 0, 'wait_s': 0.0, 'success': 0, 'block': 0, 'error': 0, 'cuts': 0,
+                      'min_rate': self.rate, 'max_rate': self.rate}
+
+    def _refill(self, now: float):
+        self._tokens = min(self.burst, self._tokens + (now - self._last) * self.rate)
+        self._last = now
+
+    def acquire(self) -> float:
+        """Lấy 1 token, trả về số giây đã chờ."""
+        waited = 0.0
+        while True:
+            with self._lock:
+                self._refill(time.monotonic())
+                if self._tokens >= 1.0:
+                    self._tokens -= 1.0
+                    self.stats['acquired'] += 1
+                    self.stats['wait_s'] += waited
+                    return waited
+                need = (1.0 - self._tokens) / self.rate
+            # ngủ tối đa 1s mỗi lần để thấy ngay khi rate thay đổi
+            delay = min(need, 1.0)
+            time.sleep(delay)
+            waited += delay
+
+    def success(self):
+        with self._lock:
+            self.stats['success'] += 1
+            self.rate = min(self.max_rate, self.rate + self.increase)
+            self.stats['max_rate'] = max(self.stats['max_rate'], self.rate)
+
+    def failure(self, kind: str = 'error'):
+        kind = 'block' if kind == 'block' else 'error'
+        with self._lock:
+            self.stats[kind] += 1
+            now = time.monotonic()
+            if now - self._last_cut < self.cooldown:
+                return
+            self._last_cut = now
+            old = self.rate
+            factor = self.block_decrease if kind == 'block' else self.error_decrease
+            self.rate = max(self.min_rate, self.rate * factor)
+            if kind == 'block':
+                self._refill(now)
+                self._tokens = 0.0
+            self.stats['cuts'] += 1
+            self.stats['min_rate'] = min(self.stats['min_rate'], self.rate)
+        logger.warning(f'[rate:{self.name}] Gặp {kind}, giảm tốc {old:.2f} -> {self.rate:.2f} request/s')
+
+    def summary(self) -> dict:
+        with self._lock:
+            out = dict(self.stats)
+            out['rate'] = self.rate
+            return out
+
+
+_limiters: dict[str, AdaptiveRateLimiter] = {}
+_limiters_lock = threading.Lock()
+
+
+def domain_of(url: str) -> str | None:
+    """URL -> key trong RATE_LIMITS (so theo đuôi host), None nếu không có giới hạn cho domain đó."""
+    host = (urllib.parse.urlparse(url).hostname or url or '').lower()
+    for domain in RATE_LIMITS:
+        if host == domain or host.endswith('.' + domain):
+            return domain
+    return None
+
+
+def get_limiter(url_or_domain: str) -> AdaptiveRateLimiter | None:
+    domain = url_or_domain if url_or_domain in RATE_LIMITS else domain_of(url_or_domain)
+    if domain is None:
+        return None
+    with _limiters_lock:
+        limiter = _limiters.get(domain)
+        if limiter is None:
+            limiter = AdaptiveRateLimiter(domain, **RATE_LIMITS[domain])
+            _limiters[domain] = limiter
+        return limiter
+
+
+def log_rate_limiter_summary(log: logging.Logger | None = None) -> dict:
+    log = log or logger
+    with _limiters_lock:
+        limiters = dict(_limiters)
+    out = {}
+    for domain, limiter in limiters.items():
+        s = out[domain] = limiter.summary()
+        log.info(f"[rate:{domain}] {s['acquired']} lần điều hướng, chờ tổng {s['wait_s']:.1f}s, "
+                 f"rate hiện tại {s['rate']:.2f}/s (min {s['min_rate']:.2f}, max {s['max_rate']:.2f}), "
+                 f"{s['block']} lần bị chặn, {s['error']} lỗi, giảm tốc {s['cuts']} lần")
+    return out
@@ -0,0 +1,224 @@
+import json
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Điều kiện "trang đã sẵn sàng" cho từng loại trang: 1 trong các XPath xuất hiện và DOM không đổi
+# trong quiet_ms. Các XPath cuối của mỗi loại là trang lỗi / không có kết quả (cũng coi là xong).
+READINESS_CONDITIONS = {
+    'shopee_listing': {
+        'xpaths': [
+            "//div[contains(@class,'ofs-recommend-page')]//a[@href]",
+            "//div[contains(@class,'shopee-search-empty-result-section')]",
+            "//*[contains(text(),'Lỗi tải')]",
+        ],
+        'quiet_ms': 400,
+        'idle_ms': 2000,
+        'deadline': 15.0,
+    },
+    'shopee_product': {
+        'xpaths': [
+            "//section[contains(@class,'page-product__shop')]",
+            "//*[contains(text(),'Lỗi tải')]",
+            "//*[contains(text(),'Trang không khả dụng')]",
+        ],
+        'quiet_ms': 300,
+        'idle_ms': 2000,
+        'deadline': 10.0,
+    },
+    'ggmap_search': {
+        'xpaths': [
+            "//div[@role='feed']//a[contains(@href,'/maps/place/')]",
+            "//div[contains(@aria-label,'quả')]//a[contains(@href,'/maps/place/')]",
+            "//div[@role='main']//h1",
+            "//*[contains(text(),'Google Maps không tìm thấy')]",
+        ],
+        'quiet_ms': 500,
+        'idle_ms': 1500,
+        'deadline': 10.0,
+    },
+}
+
+# Chạy trong trang bằng execute_async_script: MutationObserver ghi lại lần đổi DOM cuối,
+# PerformanceObserver ghi lại lần có resource tải xong cuối; kiểm tra mỗi 50ms.
+_WAIT_READY_JS = r"""
+const xpaths = arguments[0], quietMs = arguments[1], idleMs = arguments[2], deadlineMs = arguments[3];
+const done = arguments[arguments.length - 1];
+const t0 = performance.now();
+let lastMut = t0, lastRes = t0, finished = false, timer = null, po = null;
+
+function match() {
+    for (const xp of xpaths) {
+        try {
+            if (document.evaluate(xp, document, null, XPathResult.FIRST_ORDERED_NODE_TYPE, null).singleNodeValue) return xp;
+        } catch (e) {}
+    }
+    return null;
+}
+
+const mo = new MutationObserver(() => { lastMut = performance.now(); });
+mo.observe(document.documentElement || document, {childList: true, subtree: true, characterData: true});
+try {
+    po = new PerformanceObserver((list) => { if (list.getEntries().length) lastRes = performance.now(); });
+    po.observe({type: 'resource', buffered: false});
+} catch (e) {}
+
+function finish(ready, reason, matched) {
+    if (finished) return;
+    finished = true;
+    mo.disconnect();
+    if (po) po.disconnect();
+    clearInterval(timer);
+    done(JSON.stringify({ready: ready, reason: reason, matched: matched, waited_ms: performance.now() - t0}));
+}
+
+function tick() {
+    const now = performance.now();
+    const m = match();
+    if (m && now - lastMut >= quietMs) return finish(true, 'dom', m);
+    if (idleMs > 0 && document.readyState === 'complete' && now - lastRes >= idleMs && now - lastMut >= quietMs)
+        return finish(!!m, 'network_idle', m);
+    if (now - t0 >= deadlineMs) return finish(!!m, 'deadline', m);
+}
+
+timer = setInterval(tick, 50);
+tick();
+"""
+
+
+class ReadinessStats:
+    """Thời gian chờ đo được của từng loại trang (để so với time.sleep cố định trước đây)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._waits: dict[str, list[float]] = {}
+        self._reasons: dict[str, dict[str, int]] = {}
+
+    def record(self, page_type: str, waited_s: float, reason: str):
+        with self._lock:
+            self._waits.setdefault(page_type, []).append(waited_s)
+            reasons = self._reasons.setdefault(page_type, {})
+            reasons[reason] = reasons.get(reason, 0) + 1
+
+    def summary(self) -> dict[str, dict]:
+        with self._lock:
+            out = {}
+            for page_type, waits in self._waits.items():
+                ordered = sorted(waits)
+                n = len(ordered)
+                out[page_type] = {
+                    'pages': n,
+                    'total_s': sum(ordered),
+                    'mean_s': sum(ordered) / n,
+                    'p50_s': ordered[n // 2],
+                    'p95_s': ordered[min(n - 1, int(n * 0.95))],
+                    'max_s': ordered[-1],
+                    'reasons': dict(self._reasons.get(page_type, {})),
+                }
+            return out
+
+
+readiness_stats = ReadinessStats()
+
+
+def _wait_by_polling(driver, xpaths: list[str], quiet_s: float, idle_s: float,
+                     deadline_s: float, interval: float = 0.2) -> tuple[bool, str, str | None]:
+    """Dự phòng khi không chạy được execute_async_script: hỏi driver mỗi `interval` giây đến khi thấy XPath.
+
+    Không đo được mạng nên coi page_source không đổi trong `idle_s` là trang đã tải xong.
+    Đếm theo số lần hỏi thay vì đồng hồ để deadline tính theo đúng các lần sleep.
+    """
+    try:
+        implicit = driver.timeouts.implicit_wait
+    except Exception:
+        implicit = 10
+    max_polls = max(1, int(deadline_s / interval))
+    idle_polls = max(1, int(idle_s / interval)) if idle_s > 0 else 0
+    last_size, unchanged = None, 0
+    try:
+        driver.implicitly_wait(0)
+        for _ in range(max_polls):
+            for xp in xpaths:
+                try:
+                    if driver.find_elements('xpath', xp):
+                        if quiet_s > 0:
+                            time.sleep(quiet_s)
+                        return True, 'dom', xp
+                except Exception:
+                    continue
+            if idle_polls:
+                try:
+                    size = len(driver.page_source or '')
+                except Exception:
+                    size = None
+                unchanged = unchanged + 1 if size is not None and size == last_size else 0
+                last_size = size
+                if unchanged >= idle_polls:
+                    return False, 'network_idle', None
+            time.sleep(interval)
+        return False, 'deadline', None
+    finally:
+        try:
+            driver.implicitly_wait(implicit)
+        except Exception:
+            pass
+
+
+def wait_until_ready(driver, page_type: str, deadline: float | None = None) -> dict:
+    """Chờ đến khi trang `page_type` sẵn sàng (DOM ổn định hoặc mạng rảnh), tối đa `deadline` giây.
+
+    Trả về {ready, reason, matched, waited_s}; reason là 'dom', 'network_idle', 'deadline' hoặc 'error'.
+    Thời gian chờ được ghi vào readiness_stats.
+    """
+    cond = READINESS_CONDITIONS.get(page_type)
+    if cond is None:
+        logger.warning(f"Không có điều kiện readiness cho '{page_type}'")
+        return {'ready': False, 'reason': 'error', 'matched': None, 'waited_s': 0.0}
+
+    deadline = cond['deadline'] if deadline is None else deadline
+    t0 = time.monotonic()
+    result = None
+    try:
+        try:
+            if driver.timeouts.script < deadline + 5:
+                driver.set_script_timeout(deadline + 5)
+        except Exception:
+            pass
+        raw = driver.execute_async_script(_WAIT_READY_JS, cond['xpaths'], cond['quiet_ms'],
+                                          cond['idle_ms'], int(deadline * 1000))
+        data = json.loads(raw) if isinstance(raw, str) else (raw or {})
+        result = {
+            'ready': bool(data.get('ready')),
+            'reason': data.get('reason') or 'dom',
+            'matched': data.get('matched'),
+        }
+    except Exception as e:
+        logger.debug(f"Không chờ được bằng MutationObserver ({page_type}), chuyển sang polling: {e}")
+
+    if result is None:
+        remaining = max(0.0, deadline - (time.monotonic() - t0))
+        try:
+            ready, reason, matched = _wait_by_polling(driver, cond['xpaths'], cond['quiet_ms'] / 1000,
+                                                      cond['idle_ms'] / 1000, remaining)
+        except Exception as e:
+            logger.debug(f"Lỗi khi chờ trang {page_type}: {e}")
+            ready, reason, matched = False, 'error', None
+        result = {'ready': ready, 'reason': reason, 'matched': matched}
+
+    result['waited_s'] = time.monotonic() - t0
+    readiness_stats.record(page_type, result['waited_s'], result['reason'])
+    if not result['ready']:
+        logger.debug(f"Trang {page_type} chưa sẵn sàng sau {result['waited_s']:.2f}s ({result['reason']})")
+    return result
+
+
+def log_readiness_summary(log: logging.Logger | None = None) -> dict:
+    log = log or logger
+    summary = readiness_stats.summary()
+    for page_type, s in summary.items():
+        reasons = ', '.join(f'{k}={v}' for k, v in sorted(s['reasons'].items()))
+        log.info(f"[readiness] {page_type}: {s['pages']} trang, chờ trung bình {s['mean_s']:.2f}s "
+                 f"(p50 {s['p50_s']:.2f}s, p95 {s['p95_s']:.2f}s, max {s['max_s']:.2f}s) - {reasons}")
+    return summary
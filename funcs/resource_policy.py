@@ -0,0 +1,209 @@
+import json
+import logging
+import threading
+import weakref
+from dataclasses import dataclass
+
+logger = logging.getLogger(__name__)
+
+# Ảnh / font / video theo đuôi file (Network.setBlockedURLs chỉ lọc theo URL, '*' là wildcard)
+_IMAGE_PATTERNS = ('*.jpg*', '*.jpeg*', '*.png*', '*.gif*', '*.webp*', '*.avif*', '*.ico*', '*.svg*')
+_FONT_PATTERNS = ('*.woff*', '*.woff2*', '*.ttf*', '*.otf*', '*.eot*')
+_MEDIA_PATTERNS = ('*.mp4*', '*.webm*', '*.m3u8*', '*.mp3*')
+_TRACKER_PATTERNS = (
+    '*google-analytics.com*', '*googletagmanager.com*', '*doubleclick.net*', '*googlesyndication.com*',
+    '*facebook.net*', '*connect.facebook.com*', '*analytics.tiktok.com*', '*bat.bing.com*',
+    '*criteo.com*', '*hotjar.com*',
+)
+
+# Shopee: ảnh sản phẩm / banner nằm trên CDN không có đuôi file
+_SHOPEE_CDN_PATTERNS = ('*.susercontent.com/file/*', '*cf.shopee.vn/file/*')
+
+# Google Maps: tile bản đồ, ảnh địa điểm, street view, font và các request log
+_GGMAP_PATTERNS = (
+    '*/maps/vt?*', '*/maps/vt/*', '*/kh/v=*', '*khms*.google.com*', '*streetviewpixels*',
+    '*.googleusercontent.com/*', '*fonts.gstatic.com*', '*fonts.googleapis.com*',
+    '*/gen_204*', '*/log204*', '*/maps/preview/log*', '*play.google.com/log*',
+)
+
+# Ước lượng kích thước trung bình của request bị chặn (không tải nên không biết chính xác),
+# được cập nhật dần theo các request cùng loại tải thành công.
+_DEFAULT_AVG_BYTES = {
+    'Image': 40_000,
+    'Media': 500_000,
+    'Font': 60_000,
+    'Stylesheet': 30_000,
+    'Script': 50_000,
+    'XHR': 5_000,
+    'Fetch': 5_000,
+    'Ping': 500,
+    'Other': 5_000,
+}
+
+
+@dataclass
+class ResourcePolicy:
+    """Danh sách URL pattern bị chặn qua CDP (Network.setBlockedURLs) cho 1 loại trang."""
+    name: str
+    blocked_urls: tuple = ()
+    report: bool = True
+
+    def patterns(self) -> list[str]:
+        seen = []
+        for p in self.blocked_urls:
+            if p not in seen:
+                seen.append(p)
+        return seen
+
+
+RESOURCE_POLICY_PRESETS = {
+    'none': ResourcePolicy('none', (), report=False),
+    # trang category/popular: chỉ cần href + tên sản phẩm trong card
+    'shopee_listing': ResourcePolicy('shopee_listing', _IMAGE_PATTERNS + _FONT_PATTERNS + _MEDIA_PATTERNS
+                                     + _TRACKER_PATTERNS + _SHOPEE_CDN_PATTERNS),
+    # trang sản phẩm: chỉ cần khối thông tin shop
+    'shopee_product': ResourcePolicy('shopee_product', _IMAGE_PATTERNS + _FONT_PATTERNS + _MEDIA_PATTERNS
+                                     + _TRACKER_PATTERNS + _SHOPEE_CDN_PATTERNS),
+    # trang tìm kiếm Google Maps: chỉ cần danh sách kết quả bên trái, không cần bản đồ
+    'ggmap_search': ResourcePolicy('ggmap_search', _IMAGE_PATTERNS + _FONT_PATTERNS + _MEDIA_PATTERNS
+                                   + _TRACKER_PATTERNS + _GGMAP_PATTERNS),
+}
+
+
+def get_policy(policy) -> ResourcePolicy | None:
+    """Nhận tên preset, ResourcePolicy hoặc None."""
+    if policy is None or isinstance(policy, ResourcePolicy):
+        return policy
+    preset = RESOURCE_POLICY_PRESETS.get(str(policy))
+    if preset is None:
+        logger.warning(f"Không có resource policy '{policy}', bỏ qua. Có: {', '.join(RESOURCE_POLICY_PRESETS)}")
+    return preset
+
+
+def performance_logging_capability() -> dict:
+    """Capability bật performance log (cần để đếm request/bytes qua driver.get_log('performance'))."""
+    return {'performance': 'ALL'}
+
+
+def apply_resource_policy(driver, policy) -> bool:
+    """Bật Network domain và đặt danh sách URL bị chặn cho driver. Có thể gọi lại để đổi policy."""
+    policy = get_policy(policy)
+    if policy is None:
+        return False
+    try:
+        driver.execute_cdp_cmd('Network.enable', {})
+        driver.execute_cdp_cmd('Network.setBlockedURLs', {'urls': policy.patterns()})
+    except Exception as e:
+        logger.warning(f"Không áp dụng được resource policy '{policy.name}': {e}")
+        return False
+    with _reports_lock:
+        _reports[driver] = ResourceReport(policy)
+    logger.debug(f"Đã áp dụng resource policy '{policy.name}' ({len(policy.patterns())} pattern)")
+    return True
+
+
+class ResourceReport:
+    """Đếm request / bytes đã tải và request bị chặn của từng trang từ performance log."""
+
+    def __init__(self, policy: ResourcePolicy):
+        self.policy = policy
+        self.avg_bytes = dict(_DEFAULT_AVG_BYTES)
+        self.pages = 0
+        self.requests = 0
+        self.bytes = 0
+        self.blocked = 0
+        self.saved_bytes = 0
+
+    def _learn(self, rtype: str, size: int):
+        if size <= 0:
+            return
+        old = self.avg_bytes.get(rtype, _DEFAULT_AVG_BYTES['Other'])
+        self.avg_bytes[rtype] = int(old * 0.9 + size * 0.1)
+
+    def consume(self, entries: list[dict], label: str = '') -> dict:
+        types: dict[str, str] = {}
+        loaded = loaded_bytes = 0
+        blocked_by_type: dict[str, int] = {}
+        for entry in entries:
+            try:
+                msg = json.loads(entry['message'])['message']
+            except Exception:
+                continue
+            method = msg.get('method')
+            params = msg.get('params') or {}
+            rid = params.get('requestId')
+            if method == 'Network.requestWillBeSent':
+                types[rid] = params.get('type') or 'Other'
+            elif method == 'Network.loadingFinished':
+                size = int(params.get('encodedDataLength') or 0)
+                loaded += 1
+                loaded_bytes += size
+                self._learn(types.get(rid, 'Other'), size)
+            elif method == 'Network.loadingFailed':
+                if params.get('blockedReason') or 'BLOCKED_BY_CLIENT' in (params.get('errorText') or ''):
+                    rtype = params.get('type') or types.get(rid) or 'Other'
+                    blocked_by_type[rtype] = blocked_by_type.get(rtype, 0) + 1
+
+        blocked = sum(blocked_by_type.values())
+        saved = sum(self.avg_bytes.get(t, _DEFAULT_AVG_BYTES['Other']) * n for t, n in blocked_by_type.items())
+        self.pages += 1
+        self.requests += loaded
+        self.bytes += loaded_bytes
+        self.blocked += blocked
+        self.saved_bytes += saved
+        return {
+            'page': label,
+            'policy': self.policy.name,
+            'requests': loaded,
+            'bytes': loaded_bytes,
+            'blocked': blocked,
+            'blocked_by_type': blocked_by_type,
+            'saved_bytes_est': saved,
+        }
+
+    def summary(self) -> dict:
+        return {
+            'policy': self.policy.name,
+            'pages': self.pages,
+            'requests': self.requests,
+            'bytes': self.bytes,
+            'blocked': self.blocked,
+            'saved_bytes_est': self.saved_bytes,
+        }
+
+
+_reports: 'weakref.WeakKeyDictionary' = weakref.WeakKeyDictionary()
+_reports_lock = threading.Lock()
+
+
+def report_page(driver, label: str = '', entries: list | None = None) -> dict | None:
+    """Đọc performance log từ lần gọi trước, log và trả về số request/bytes tải và bị chặn của trang vừa mở.
+
+    `entries`: các event đã được đọc ra trước đó (vd. bởi ApiCapture), đọc nốt phần còn lại trong log.
+    Trả về None nếu driver không áp dụng policy hoặc không bật performance log.
+    """
+    with _reports_lock:
+        report = _reports.get(driver)
+    if report is None or not report.policy.report:
+        return None
+    try:
+        entries = list(entries or []) + driver.get_log('performance')
+    except Exception as e:
+        logger.debug(f'Không đọc được performance log: {e}')
+        return None
+    row = report.consume(entries, label)
+    logger.info(f"[{row['policy']}] {label}: tải {row['requests']} request / {row['bytes'] / 1024:.0f} KiB, "
+                f"chặn {row['blocked']} request (~{row['saved_bytes_est'] / 1024:.0f} KiB)")
+    return row
+
+
+def log_resource_summary(driver, log: logging.Logger | None = None) -> dict | None:
+    log = log or logger
+    with _reports_lock:
+        report = _reports.get(driver)
+    if report is None or not report.pages:
+        return None
+    s = report.summary()
+    log.info(f"[{s['policy']}] {s['pages']} trang: tải {s['requests']} request / {s['bytes'] / 1048576:.1f} MiB, "
+             f"chặn {s['blocked']} request, tiết kiệm ~{s['saved_bytes_est'] / 1048576:.1f} MiB")
+    return s
@@ -1,31 +1,199 @@
 import undetected_chromedriver as uc
 import threading
 import os
+import shutil
+import sys
 import time
 import logging
 
 logger = logging.getLogger(__name__)
 driver_lock = threading.Lock()
 
+# Cách khởi động Chrome: 'parallel' = patch chromedriver 1 lần rồi mở nhiều Chrome cùng lúc (tối đa
+# STARTUP_CONCURRENCY); 'serial' = mỗi uc.Chrome tự tải + patch chromedriver, lần lượt trong driver_lock (cũ)
+STARTUP_MODE = 'parallel'
+STARTUP_CONCURRENCY = 8
+# Profile mẫu đã khởi động sẵn 1 lần: Profile_{idx} chưa tồn tại được clone từ đây (reflink nếu filesystem
+# hỗ trợ, không thì copy) thay vì để Chrome tạo profile lạnh. None = tắt.
+PROFILE_TEMPLATE = 'Profile_template'
+# Không clone cache / file lock của Chrome sang profile mới
+PROFILE_CLONE_SKIP = ('Cache', 'Code Cache', 'GPUCache', 'GrShaderCache', 'ShaderCache', 'DawnCache',
+                      'Service Worker', 'Crashpad', 'SingletonLock', 'SingletonSocket', 'SingletonCookie',
+                      'lockfile', 'LOCK')
 
-def setup_driver(profile_idx: int = 0, headless: bool = False, user_data_base: str = None):
-    options = uc.ChromeOptions()
-    base = user_data_base if user_data_base else '.'
-    profile_directory = os.path.join(base, f"Profile_{profile_idx}")
+# 'process' = mỗi worker 1 Chrome riêng; 'shared' = mỗi TABS_PER_BROWSER worker dùng chung 1 Chrome, mỗi worker
+# 1 tab trong browser context riêng (cookie / storage tách biệt), tốn ít RAM hơn (xem funcs.shared_browser)
+BROWSER_MODE = 'process'
+TABS_PER_BROWSER = 5
+
+_startup_slots = threading.BoundedSemaphore(STARTUP_CONCURRENCY)
+_prepare_lock = threading.Lock()
+_patched_driver: list = []  # [đường dẫn] sau lần chuẩn bị đầu tiên ([None] nếu lỗi)
+_template_lock = threading.Lock()
+_reflink_ok = [sys.platform.startswith('linux')]
+
+FICLONE = 0x40049409  # ioctl reflink của Linux (btrfs, xfs, bcachefs...)
+
+
+def get_patched_driver() -> str | None:
+    """Tải + patch chromedriver đúng 1 lần mỗi process, trả về đường dẫn binary đã patch (None nếu lỗi).
+
+    Binary được copy ra 1 file riêng nên uc.Chrome(driver_executable_path=...) coi là binary của người dùng:
+    không tải lại, không patch lại và không xoá khi driver đóng.
+    """
+    with _prepare_lock:
+        if _patched_driver:
+            return _patched_driver[0]
+        path = None
+        try:
+            from undetected_chromedriver.patcher import Patcher
+
+            t0 = time.perf_counter()
+            patcher = Patcher()
+            patcher.auto()
+            path = os.path.join(patcher.data_path, f'shared_{os.path.basename(patcher.executable_path)}')
+            tmp = f'{path}.{os.getpid()}.tmp'
+            shutil.copy2(patcher.executable_path, tmp)
+            os.replace(tmp, path)
+            logger.info(f'Đã chuẩn bị chromedriver dùng chung {path} ({time.perf_counter() - t0:.1f}s)')
+        except Exception as e:
+            logger.warning(f'Không chuẩn bị được chromedriver dùng chung, khởi động lần lượt như cũ: {e}')
+            path = None
+        _patched_driver.append(path)
+        return path
+
+
+def _clone_file(src: str, dst: str):
+    """Copy-on-write (FICLONE) nếu được, không thì copy thường.
+
+    Không dùng hardlink: Chrome ghi đè tại chỗ các file SQLite / LevelDB của profile, hardlink sẽ làm các
+    profile ghi chung 1 file.
+    """
+    if _reflink_ok[0]:
+        try:
+            import fcntl
+
+            with open(src, 'rb') as fs, open(dst, 'wb') as fd:
+                fcntl.ioctl(fd.fileno(), FICLONE, fs.fileno())
+            shutil.copystat(src, dst)
+            return dst
+        except Exception:
+            _reflink_ok[0] = False
+    return shutil.copy2(src, dst)
+
+
+def clone_profile(template: str, dest: str) -> bool:
+    """Tạo profile `dest` từ profile mẫu, bỏ cache và file lock. False nếu không có mẫu / lỗi."""
+    if not os.path.isdir(template):
+        return False
+    tmp = f'{dest}.clone-{os.getpid()}-{threading.get_ident()}'
+    try:
+        t0 = time.perf_counter()
+        shutil.copytree(template, tmp, copy_function=_clone_file, symlinks=True,
+                        ignore=shutil.ignore_patterns(*PROFILE_CLONE_SKIP))
+        os.replace(tmp, dest)
+        logger.info(f"Đã tạo {dest} từ profile mẫu ({'reflink' if _reflink_ok[0] else 'copy'}, "
+                    f"{time.perf_counter() - t0:.2f}s)")
+        return True
+    except Exception as e:
+        logger.warning(f'Không clone được profile mẫu sang {dest}: {e}')
+        shutil.rmtree(tmp, ignore_errors=True)
+        return False
 
+
+def _ensure_template(base: str) -> str | None:
+    """Khởi động Chrome 1 lần trên profile mẫu nếu chưa có (first-run, tạo cấu trúc profile) rồi đóng lại."""
+    template = os.path.join(base, PROFILE_TEMPLATE)
+    with _template_lock:
+        if os.path.isdir(template):
+            return template
+        driver = None
+        try:
+            driver = start_chrome(chrome_options(template))
+            driver.get('about:blank')
+            logger.info(f'Đã tạo profile mẫu {template}')
+        except Exception as e:
+            logger.warning(f'Không tạo được profile mẫu {template}: {e}')
+            shutil.rmtree(template, ignore_errors=True)
+            return None
+        finally:
+            if driver is not None:
+                try:
+                    driver.quit()
+                except Exception:
+                    pass
+        return template
+
+
+def prepare_profile(base: str, profile_idx: int) -> str:
+    profile_directory = os.path.join(base, f"Profile_{profile_idx}")
+    if not os.path.isdir(profile_directory) and PROFILE_TEMPLATE and STARTUP_MODE == 'parallel':
+        template = _ensure_template(base)
+        if template is not None:
+            clone_profile(template, profile_directory)
     os.makedirs(profile_directory, exist_ok=True)
+    return profile_directory
+
+
+def chrome_options(profile_directory: str, headless: bool = False, performance_log: bool = False):
+    options = uc.ChromeOptions()
     options.user_data_dir = profile_directory
     options.add_argument("--no-sandbox")
     options.add_argument("--disable-dev-shm-usage")
     options.add_argument("--disable-gpu")
     if headless:
         options.add_argument("--headless=new")
+    if performance_log:
+        from funcs.resource_policy import performance_logging_capability
+
+        options.set_capability('goog:loggingPrefs', performance_logging_capability())
+    return options
+
+
+def start_chrome(options):
+    """uc.Chrome theo STARTUP_MODE (raise nếu lỗi)."""
+    driver_path = get_patched_driver() if STARTUP_MODE == 'parallel' else None
+    if driver_path:
+        # binary đã patch sẵn: các Chrome khởi động song song, chỉ giới hạn số lần mở cùng lúc
+        with _startup_slots:
+            return uc.Chrome(options=options, driver_executable_path=driver_path)
+    with driver_lock:
+        return uc.Chrome(options=options)
+
+
+def setup_driver(profile_idx: int = 0, headless: bool = False, user_data_base: str = None, resource_policy=None,
+                 performance_log: bool = False):
+    """Khởi tạo Chrome cho 1 worker.
+
+    resource_policy: tên preset trong funcs.resource_policy.RESOURCE_POLICY_PRESETS ('shopee_listing',
+    'shopee_product', 'ggmap_search') hoặc ResourcePolicy; chặn ảnh/font/video/tracker qua CDP.
+    performance_log: bật performance log (Network.* events) để đọc response API (funcs.shopee_api).
+    BROWSER_MODE='shared': trả về 1 tab trong browser dùng chung (funcs.shared_browser) thay vì 1 Chrome riêng.
+    """
+    from funcs.memory import get_rss_monitor
+    from funcs.resource_policy import apply_resource_policy, get_policy
+
+    policy = get_policy(resource_policy)
+    base = user_data_base if user_data_base else '.'
+    performance_log = performance_log or (policy is not None and policy.report)
 
     try:
-        with driver_lock:
-            driver = uc.Chrome(options=options)
-            driver.set_page_load_timeout(30)
-            driver.implicitly_wait(10)
+        if BROWSER_MODE == 'shared':
+            from funcs.shared_browser import open_tab
+
+            driver = open_tab(profile_idx, headless=headless, user_data_base=base, performance_log=performance_log)
+        else:
+            driver = start_chrome(chrome_options(prepare_profile(base, profile_idx), headless, performance_log))
+        driver.set_page_load_timeout(30)
+        driver.implicitly_wait(10)
+        if policy is not None:
+            apply_resource_policy(driver, policy)
+        elif performance_log:
+            try:
+                driver.execute_cdp_cmd('Network.enable', {})
+            except Exception as e:
+                logger.debug(f"Network.enable lỗi: {e}")
+        get_rss_monitor().register(f'driver-{profile_idx}', driver)
         return driver
     except Exception as e:
         logger.error(f"Cannot initialize driver {profile_idx}: {e}")
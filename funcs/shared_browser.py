@@ -0,0 +1,205 @@
+"""Chế độ nhiều tab trong 1 Chrome (BROWSER_MODE='shared' của funcs.setup_driver).
+
+Mỗi SharedBrowser là 1 uc.Chrome (host) phục vụ tối đa TABS_PER_BROWSER worker. Mỗi worker được 1 tab
+trong 1 browser context riêng (Target.createBrowserContext - cookie, localStorage, cache tách biệt như 1
+cửa sổ ẩn danh) và 1 session chromedriver riêng gắn vào browser qua debuggerAddress, chỉ điều khiển tab
+đó. Vì vậy vòng lặp của worker (get, execute_script, find_element, execute_cdp_cmd, get_log...) chạy
+nguyên như với 1 Chrome riêng, các worker không phải chờ nhau, nhưng dùng chung browser process, GPU
+process và network service thay vì mỗi worker 1 cây process.
+"""
+import logging
+import os
+import threading
+
+from selenium import webdriver
+from selenium.webdriver.chrome.service import Service
+
+logger = logging.getLogger(__name__)
+
+
+class TabDriver(webdriver.Chrome):
+    """Session chromedriver gắn vào browser dùng chung, chỉ điều khiển 1 tab (target) của worker.
+
+    quit() đóng tab + browser context của worker và thoát chromedriver của session, browser vẫn chạy cho
+    các worker khác; tab cuối cùng đóng thì browser mới bị đóng.
+    """
+
+    def __init__(self, shared: 'SharedBrowser', target_id: str, context_id: str | None, options, service):
+        self.shared_browser = shared
+        self.target_id = target_id
+        self.context_id = context_id
+        super().__init__(options=options, service=service)
+        handle = next((h for h in self.window_handles if h == target_id or h.endswith(target_id)), None)
+        if handle is None:
+            raise RuntimeError(f'Không tìm thấy tab {target_id} trong session mới')
+        self.switch_to.window(handle)
+
+    def root_pids(self) -> list[int]:
+        """Cho funcs.memory: chromedriver của session này + cây process của browser dùng chung."""
+        pid = getattr(getattr(self.service, 'process', None), 'pid', None)
+        return ([pid] if isinstance(pid, int) else []) + self.shared_browser.root_pids()
+
+    def quit(self):
+        try:
+            from funcs.memory import get_rss_monitor
+
+            get_rss_monitor().unregister_driver(self)
+        except Exception:
+            pass
+        try:
+            super().quit()
+        except Exception as e:
+            logger.debug(f'Lỗi khi thoát session của tab {self.target_id}: {e}')
+        self.shared_browser.close_tab(self)
+
+
+class SharedBrowser:
+    def __init__(self, key: int, headless: bool = False, user_data_base: str = '.', performance_log: bool = False):
+        from funcs.setup_driver import chrome_options, prepare_profile, start_chrome
+
+        self.key = key
+        self.performance_log = performance_log
+        self._lock = threading.Lock()
+        # tabs / pending được sửa trong _browsers_lock: tab cuối đóng và worker mới xin tab không chạy chéo nhau
+        self.tabs: set[TabDriver] = set()
+        self.pending = 0
+        self.opened = 0
+        # profile riêng của browser dùng chung; tab của worker nằm trong browser context riêng nên không
+        # dùng cookie của profile này
+        profile = prepare_profile(user_data_base, f'shared_{key}')
+        self.host = start_chrome(chrome_options(profile, headless, performance_log))
+        self.debugger_address = self.host.options.debugger_address
+        self.closed = False
+        logger.info(f'[shared_browser {key}] Đã mở browser dùng chung tại {self.debugger_address}')
+
+    def root_pids(self) -> list[int]:
+        from funcs.memory import driver_pids
+
+        return driver_pids(self.host)
+
+    def _cdp(self, cmd: str, params: dict) -> dict:
+        with self._lock:
+            return self.host.execute_cdp_cmd(cmd, params) or {}
+
+    def open_tab(self, isolate: bool = True) -> TabDriver:
+        from funcs.resource_policy import performance_logging_capability
+        from funcs.setup_driver import get_patched_driver
+
+        context_id = None
+        if isolate:
+            context_id = self._cdp('Target.createBrowserContext', {'disposeOnDetach': False}).get('browserContextId')
+        params = {'url': 'about:blank'}
+        if context_id:
+            params['browserContextId'] = context_id
+        target_id = self._cdp('Target.createTarget', params)['targetId']
+
+        options = webdriver.ChromeOptions()
+        options.debugger_address = self.debugger_address
+        if self.performance_log:
+            options.set_capability('goog:loggingPrefs', performance_logging_capability())
+        driver_path = get_patched_driver()
+        service = Service(executable_path=driver_path) if driver_path else Service()
+        try:
+            tab = TabDriver(self, target_id, context_id, options, service)
+        except Exception:
+            self._close_target(target_id, context_id)
+            raise
+        with _browsers_lock:
+            self.tabs.add(tab)
+            self.opened += 1
+        return tab
+
+    def _close_target(self, target_id: str, context_id: str | None):
+        try:
+            self._cdp('Target.closeTarget', {'targetId': target_id})
+        except Exception as e:
+            logger.debug(f'Lỗi khi đóng tab {target_id}: {e}')
+        if context_id:
+            try:
+                self._cdp('Target.disposeBrowserContext', {'browserContextId': context_id})
+            except Exception as e:
+                logger.debug(f'Lỗi khi xoá browser context {context_id}: {e}')
+
+    def close_tab(self, tab: TabDriver):
+        self._close_target(tab.target_id, tab.context_id)
+        with _browsers_lock:
+            self.tabs.discard(tab)
+            last = not self.tabs and not self.pending
+            if last and _browsers.get(self.key) is self:
+                del _browsers[self.key]
+        if last:
+            self.close()
+
+    def close(self):
+        with _browsers_lock:
+            if _browsers.get(self.key) is self:
+                del _browsers[self.key]
+        if self.closed:
+            return
+        self.closed = True
+        try:
+            self.host.quit()
+        except Exception:
+            pass
+        logger.info(f'[shared_browser {self.key}] Đã đóng browser dùng chung ({self.opened} tab đã phục vụ)')
+
+
+_browsers: dict[int, SharedBrowser] = {}
+_browsers_lock = threading.Lock()
+_browser_start_locks: dict[int, threading.Lock] = {}
+
+
+def _reserve(key: int) -> SharedBrowser | None:
+    """Browser đang chạy của nhóm `key` và giữ chỗ 1 tab (pending) để browser không bị đóng giữa chừng."""
+    with _browsers_lock:
+        browser = _browsers.get(key)
+        if browser is not None and not browser.closed:
+            browser.pending += 1
+            return browser
+        return None
+
+
+def get_shared_browser(key: int, headless: bool = False, user_data_base: str = '.',
+                       performance_log: bool = False) -> SharedBrowser:
+    """Browser dùng chung của nhóm `key` (mở nếu chưa có), đã giữ chỗ 1 tab: gọi release_reservation sau khi mở tab."""
+    browser = _reserve(key)
+    if browser is not None:
+        return browser
+    with _browsers_lock:
+        start_lock = _browser_start_locks.setdefault(key, threading.Lock())
+    # mở browser ngoài _browsers_lock để các nhóm khác không phải chờ
+    with start_lock:
+        browser = _reserve(key)
+        if browser is not None:
+            return browser
+        browser = SharedBrowser(key, headless=headless, user_data_base=user_data_base, performance_log=performance_log)
+        with _browsers_lock:
+            browser.pending += 1
+            _browsers[key] = browser
+        return browser
+
+
+def release_reservation(browser: SharedBrowser):
+    with _browsers_lock:
+        browser.pending -= 1
+        last = not browser.tabs and not browser.pending
+        if last and _browsers.get(browser.key) is browser:
+            del _browsers[browser.key]
+    if last:
+        browser.close()
+
+
+def open_tab(profile_idx: int, headless: bool = False, user_data_base: str = '.',
+             performance_log: bool = False) -> TabDriver:
+    """Tab cho worker `profile_idx` trong browser dùng chung số profile_idx // TABS_PER_BROWSER."""
+    from funcs.setup_driver import TABS_PER_BROWSER
+
+    key = int(profile_idx) // max(1, TABS_PER_BROWSER) if str(profile_idx).isdigit() else 0
+    browser = get_shared_browser(key, headless=headless, user_data_base=user_data_base,
+                                 performance_log=performance_log)
+    try:
+        tab = browser.open_tab()
+    finally:
+        release_reservation(browser)
+    logger.info(f'[shared_browser {key}] Worker {profile_idx} dùng tab {tab.target_id} (pid {os.getpid()})')
+    return tab
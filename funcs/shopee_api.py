@@ -0,0 +1,230 @@
+import base64
+import json
+import logging
+import re
+import time
+import urllib.parse
+
+logger = logging.getLogger(__name__)
+
+SHOPEE_BASE_URL = 'https://shopee.vn'
+
+# Các API mà trang category/popular gọi để lấy danh sách sản phẩm
+LISTING_API_PATTERNS = (
+    '/api/v4/recommend/recommend',
+    '/api/v4/search/search_items',
+    '/api/v4/shop/rcmd_items',
+)
+
+# Các API mà trang sản phẩm gọi có chứa thông tin shop
+PRODUCT_API_PATTERNS = (
+    '/api/v4/pdp/get_pc',
+    '/api/v4/pdp/get',
+    '/api/v4/item/get',
+    '/api/v4/product/get_shop_info',
+    '/api/v4/shop/get_shop_base',
+    '/api/v4/shop/get_shop_detail',
+)
+
+
+_ITEM_RE = re.compile(r'-i\.(\d+)\.(\d+)')
+_SHOP_QUERY_RE = re.compile(r'[?&]shopid=(\d+)', re.IGNORECASE)
+
+
+def parse_item_href(href: str) -> tuple[str, str] | None:
+    """'...-i.<shopid>.<itemid>' (hoặc ?shopid=&itemid=) -> (shopid, itemid)."""
+    m = _ITEM_RE.search(href or '')
+    if m:
+        return m.group(1), m.group(2)
+    m = _SHOP_QUERY_RE.search(href or '')
+    if m:
+        itemid = re.search(r'[?&]itemid=(\d+)', href, re.IGNORECASE)
+        return m.group(1), itemid.group(1) if itemid else ''
+    return None
+
+
+def _slug(name: str) -> str:
+    """Tên sản phẩm -> đoạn slug trong href Shopee (giữ chữ có dấu, khoảng trắng thành '-')."""
+    cleaned = re.sub(r'[\\/?#%&"<>\[\]{}|^`]+', ' ', name or '')
+    cleaned = re.sub(r'\s+', '-', cleaned.strip())
+    return cleaned.strip('-') or 'product'
+
+
+def product_href(name: str, shopid, itemid) -> str:
+    return f"{SHOPEE_BASE_URL}/{_slug(name)}-i.{shopid}.{itemid}"
+
+
+def shop_href(shopid, username: str = '') -> str:
+    if username:
+        return f"{SHOPEE_BASE_URL}/{username}"
+    return f"{SHOPEE_BASE_URL}/shop/{shopid}"
+
+
+def shop_id_from_href(href: str) -> str:
+    """shop_id như nhánh DOM / JS của get_infor_shop: đoạn cuối path của shop_href (username hoặc shopid
+    với /shop/{shopid}), không có path thì lấy query shopid / shopId / sellerId."""
+    try:
+        parsed = urllib.parse.urlparse(href or '')
+        shop_id = (parsed.path or '').strip('/').split('/')[-1]
+        if not shop_id and parsed.query:
+            q = urllib.parse.parse_qs(parsed.query)
+            for key in ('shopid', 'shopId', 'sellerId'):
+                if q.get(key):
+                    return q[key][0]
+        return shop_id
+    except Exception:
+        return ''
+
+
+def _walk(obj):
+    """Duyệt mọi dict lồng nhau trong JSON (không đệ quy để tránh vượt giới hạn với JSON sâu)."""
+    stack = [obj]
+    while stack:
+        cur = stack.pop()
+        if isinstance(cur, dict):
+            yield cur
+            stack.extend(reversed(list(cur.values())))
+        elif isinstance(cur, list):
+            stack.extend(reversed(cur))
+
+
+def _first(d: dict, *keys):
+    for k in keys:
+        v = d.get(k)
+        if v not in (None, ''):
+            return v
+    return None
+
+
+def products_from_payloads(payloads: list) -> list[dict]:
+    """Lấy sản phẩm từ JSON của API listing, cùng dạng với get_infor_product: {href, name, status}."""
+    results: list[dict] = []
+    seen = set()
+    for payload in payloads:
+        for d in _walk(payload):
+            itemid = _first(d, 'itemid', 'item_id')
+            shopid = _first(d, 'shopid', 'shop_id')
+            name = _first(d, 'name', 'title')
+            if itemid is None or shopid is None or not isinstance(name, str):
+                continue
+            key = (str(shopid), str(itemid))
+            if key in seen:
+                continue
+            seen.add(key)
+            name = name.replace('\u00a0', ' ').strip()
+            results.append({'href': product_href(name, shopid, itemid), 'name': name, 'status': 0})
+    return results
+
+
+def shops_from_payloads(payloads: list) -> list[dict]:
+    """Lấy shop từ JSON của trang sản phẩm, cùng dạng với get_infor_shop: {shop_name, shop_href, shop_id}."""
+    for payload in payloads:
+        for d in _walk(payload):
+            # dict sản phẩm cũng có shopid + name, bỏ qua
+            if _first(d, 'itemid', 'item_id') is not None:
+                continue
+            shopid = _first(d, 'shopid', 'shop_id')
+            name = d.get('name')
+            if shopid is None or not isinstance(name, str) or not name.strip():
+                continue
+            account = d.get('account') if isinstance(d.get('account'), dict) else {}
+            username = _first(d, 'username') or _first(account, 'username') or ''
+            href = shop_href(shopid, str(username))
+            # shop_id cùng định dạng với nhánh DOM / JS để CSV và key dedup của ShopStore khớp nhau
+            return [{
+                'shop_name': name.strip(),
+                'shop_href': href,
+                'shop_id': shop_id_from_href(href),
+            }]
+    return []
+
+
+class ApiCapture:
+    """Đọc response JSON của các API Shopee từ performance log của Chrome (Network.* events).
+
+    Cần driver bật performance log (setup_driver(..., performance_log=True)). Body được lấy bằng
+    Network.getResponseBody sau khi request tải xong.
+    """
+
+    def __init__(self, driver, patterns: tuple):
+        self.driver = driver
+        self.patterns = patterns
+        self.entries: list = []
+        self._matched: dict[str, str] = {}
+        self._finished: set[str] = set()
+        self._fetched: set[str] = set()
+        self.payloads: list = []
+        self.available = True
+
+    def _drain(self) -> list:
+        if not self.available:
+            return []
+        try:
+            entries = self.driver.get_log('performance')
+        except Exception as e:
+            # driver không bật performance log -> không capture được, để caller fallback sang DOM
+            logger.warning(f'Không đọc được performance log, tắt capture API: {e}')
+            self.available = False
+            return []
+        self.entries.extend(entries)
+        return entries
+
+    def reset(self):
+        """Bỏ các event của trang trước; gọi ngay trước driver.get(...)."""
+        self._drain()
+        self.entries = []
+        self._matched.clear()
+        self._finished.clear()
+        self._fetched.clear()
+        self.payloads = []
+
+    def _scan(self, entries: list):
+        for entry in entries:
+            try:
+                msg = json.loads(entry['message'])['message']
+            except Exception:
+                continue
+            method = msg.get('method')
+            params = msg.get('params') or {}
+            rid = params.get('requestId')
+            if method == 'Network.responseReceived':
+                url = (params.get('response') or {}).get('url') or ''
+                if any(p in url for p in self.patterns):
+                    self._matched[rid] = url
+            elif method == 'Network.loadingFinished':
+                self._finished.add(rid)
+
+    def _fetch_ready(self):
+        for rid, url in self._matched.items():
+            if rid in self._fetched or rid not in self._finished:
+                continue
+            self._fetched.add(rid)
+            try:
+                res = self.driver.execute_cdp_cmd('Network.getResponseBody', {'requestId': rid})
+                body = res.get('body') or ''
+                if res.get('base64Encoded'):
+                    body = base64.b64decode(body).decode('utf-8', errors='replace')
+                self.payloads.append(json.loads(body))
+            except Exception as e:
+                logger.debug(f'Không lấy được body của {url}: {e}')
+
+    def wait(self, deadline: float = 10.0, settle: float = 0.3, interval: float = 0.25) -> list:
+        """Chờ đến khi có ít nhất 1 response khớp đã tải xong (và không còn response khớp đang tải).
+
+        Trả về list JSON đã parse (có thể rỗng nếu hết deadline).
+        """
+        max_polls = max(1, int(deadline / interval))
+        for _ in range(max_polls):
+            if not self.available:
+                break
+            self._scan(self._drain())
+            self._fetch_ready()
+            pending = [rid for rid in self._matched if rid not in self._fetched]
+            if self.payloads and not pending:
+                # chờ thêm 1 chút để gom các trang API gọi liên tiếp
+                time.sleep(settle)
+                self._scan(self._drain())
+                self._fetch_ready()
+                break
+            time.sleep(interval)
+        return self.payloads
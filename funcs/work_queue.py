@@ -0,0 +1,218 @@
+import logging
+import threading
+import time
+from typing import Hashable, Iterable, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class WorkQueue:
+    """Hàng đợi việc dùng chung giữa các worker thread, chia theo từng item nhỏ.
+
+    Thay cho việc chia chunk cố định trước khi chạy: worker nào rảnh thì lấy item kế tiếp,
+    nên 1 category chậm hay 1 driver chết không làm các worker khác ngồi chơi.
+
+    - get(worker_id) chặn khi hàng đợi rỗng nhưng vẫn còn item đang xử lý (có thể bị trả lại)
+      hoặc producer chưa close(); trả về None khi đã hết việc.
+    - done()/failed()/release() phải được gọi đúng 1 lần cho mỗi item lấy ra. failed() đưa item về
+      cuối hàng đợi cho tới khi vượt quá max_attempts. done() có thể gọi từ worker khác với worker
+      đã lấy item (item được gác lại cho worker kia xử lý).
+    - maxsize > 0 thì put() chặn khi đầy (dùng làm backpressure giữa các stage); put() trả False khi hàng
+      đợi đã close() / abort().
+    - report() trả về thời gian bận / rảnh của từng worker để thấy mất cân bằng tải.
+    """
+
+    def __init__(self, items: Optional[Iterable[Hashable]] = None, maxsize: int = 0,
+                 max_attempts: int = 2, name: str = 'queue'):
+        self.name = name
+        self.maxsize = maxsize
+        self.max_attempts = max(1, int(max_attempts))
+        self._items: list = []
+        self._head = 0
+        self._cond = threading.Condition()
+        self._closed = False
+        self._in_progress = 0
+        self._attempts: dict = {}
+        self._workers: dict = {}
+        self._started = time.monotonic()
+        self._finished: Optional[float] = None
+        self.total_put = 0
+        self.total_done = 0
+        self.total_failed = 0
+
+        if items is not None:
+            for item in items:
+                self._items.append(item)
+                self.total_put += 1
+
+    # ------------------------------------------------------------ producer side
+    def put(self, item: Hashable, timeout: Optional[float] = None) -> bool:
+        with self._cond:
+            deadline = None if timeout is None else time.monotonic() + timeout
+            while self.maxsize > 0 and self._size() >= self.maxsize and not self._closed:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+            if self._closed:
+                logger.debug(f'[{self.name}] put sau khi close, bỏ qua item')
+                return False
+            self._items.append(item)
+            self.total_put += 1
+            self._cond.notify_all()
+            return True
+
+    @property
+    def closed(self) -> bool:
+        with self._cond:
+            return self._closed
+
+    def abort(self) -> int:
+        """Không còn worker nào lấy việc: đóng hàng đợi, bỏ các item đang chờ và nhả các put() đang chặn.
+
+        Trả về số item bị bỏ.
+        """
+        with self._cond:
+            dropped = self._size()
+            self._items = []
+            self._head = 0
+            self._closed = True
+            self._cond.notify_all()
+            return dropped
+
+    def extend(self, items: Iterable[Hashable]):
+        for item in items:
+            self.put(item)
+
+    def close(self):
+        """Báo không còn item mới; get() sẽ trả None khi đã xử lý hết."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    # ------------------------------------------------------------ worker side
+    def _size(self) -> int:
+        return len(self._items) - self._head
+
+    def _pop(self):
+        item = self._items[self._head]
+        self._head += 1
+        if self._head > 1024 and self._head * 2 > len(self._items):
+            del self._items[:self._head]
+            self._head = 0
+        return item
+
+    def _stats(self, worker_id) -> dict:
+        st = self._workers.get(worker_id)
+        if st is None:
+            st = {'done': 0, 'failed': 0, 'busy_s': 0.0, 'wait_s': 0.0,
+                  'started': time.monotonic(), 'finished': None, 'current_since': None}
+            self._workers[worker_id] = st
+        return st
+
+    def get(self, worker_id=0, timeout: Optional[float] = None):
+        with self._cond:
+            st = self._stats(worker_id)
+            t0 = time.monotonic()
+            deadline = None if timeout is None else t0 + timeout
+            while self._size() == 0:
+                if self._closed and self._in_progress == 0:
+                    st['wait_s'] += time.monotonic() - t0
+                    st['finished'] = time.monotonic()
+                    if self._finished is None:
+                        self._finished = st['finished']
+                    self._cond.notify_all()
+                    return None
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    st['wait_s'] += time.monotonic() - t0
+                    return None
+                self._cond.wait(remaining)
+
+            item = self._pop()
+            self._in_progress += 1
+            now = time.monotonic()
+            st['wait_s'] += now - t0
+            st['current_since'] = now
+            self._cond.notify_all()
+            return item
+
+    def _finish(self, worker_id, key: str):
+        st = self._stats(worker_id)
+        if st['current_since'] is not None:
+            st['busy_s'] += time.monotonic() - st['current_since']
+            st['current_since'] = None
+        st[key] += 1
+        self._in_progress = max(0, self._in_progress - 1)
+
+    def done(self, worker_id=0):
+        with self._cond:
+            self._finish(worker_id, 'done')
+            self.total_done += 1
+            self._cond.notify_all()
+
+    def failed(self, worker_id, item: Hashable, requeue: bool = True) -> bool:
+        """Đánh dấu item lỗi. Trả về True nếu item được đưa lại vào hàng đợi để thử lại."""
+        with self._cond:
+            self._finish(worker_id, 'failed')
+            attempts = self._attempts.get(item, 0) + 1
+            self._attempts[item] = attempts
+            retried = requeue and attempts < self.max_attempts
+            if retried:
+                self._items.append(item)
+            else:
+                self.total_failed += 1
+            self._cond.notify_all()
+            return retried
+
+    def release(self, worker_id, item: Hashable):
+        """Trả item đang giữ về cuối hàng đợi mà không tính là lỗi (vd. item đã gác lại chờ item khác)."""
+        with self._cond:
+            self._stats(worker_id)
+            self._in_progress = max(0, self._in_progress - 1)
+            self._items.append(item)
+            self._cond.notify_all()
+
+    def leave(self, worker_id=0):
+        """Worker dừng hẳn (driver chết...) trước khi hết việc; ghi nhận thời điểm để tính idle."""
+        with self._cond:
+            st = self._stats(worker_id)
+            if st['finished'] is None:
+                st['finished'] = time.monotonic()
+
+    # --------------------------------------------------------------- reporting
+    def __len__(self):
+        with self._cond:
+            return self._size()
+
+    def report(self) -> list[dict]:
+        """Thống kê từng worker: số item xong/lỗi, thời gian bận, chờ trong get và ngồi không ở cuối."""
+        with self._cond:
+            end = self._finished or time.monotonic()
+            end = max([end] + [st['finished'] for st in self._workers.values() if st['finished']])
+            rows = []
+            for worker_id, st in sorted(self._workers.items(), key=lambda kv: str(kv[0])):
+                finished = st['finished'] or end
+                tail = max(0.0, end - finished)
+                rows.append({
+                    'worker': worker_id,
+                    'done': st['done'],
+                    'failed': st['failed'],
+                    'busy_s': st['busy_s'],
+                    'wait_s': st['wait_s'],
+                    'tail_idle_s': tail,
+                    'idle_s': st['wait_s'] + tail,
+                })
+            return rows
+
+    def log_report(self, log: Optional[logging.Logger] = None):
+        log = log or logger
+        rows = self.report()
+        log.info(f"[{self.name}] {self.total_done} xong, {self.total_failed} lỗi / {self.total_put} item, "
+                 f"{len(rows)} worker")
+        for r in rows:
+            total = r['busy_s'] + r['idle_s']
+            ratio = r['idle_s'] / total if total > 0 else 0.0
+            log.info(f"[{self.name}] worker {r['worker']}: {r['done']} xong, {r['failed']} lỗi, "
+                     f"bận {r['busy_s']:.1f}s, rảnh {r['idle_s']:.1f}s ({ratio:.0%})")
+        return rows
@@ -1,4 +1,5 @@
 from pathlib import Path
+import json
 import logging
 import threading
 import time
@@ -13,65 +14,46 @@ except Exception:
 
 logger = logging.getLogger(__name__)
 
+# Preset chặn ảnh/font/video/tracker qua CDP cho trang category/popular (None = tải đầy đủ như trình duyệt thường)
+RESOURCE_POLICY = 'shopee_listing'
 
-def category_chunking(file_path: str | Path | None = None, num_threads: int | None = None):
-    try:
-        base = Path(__file__).parent
-        # Xác định file CSV: dùng file_path nếu có, hoặc mặc định tới categories/category_hrefs.csv
-        if file_path:
-            fp = Path(file_path)
-        else:
-            fp = base / 'categories' / 'category_hrefs.csv'
+# Cách lấy sản phẩm: 'api' (đọc JSON API từ performance log), 'js' hoặc 'dom' (xem get_infor_product)
+EXTRACT_MODE = 'js'
 
-        categories = []
-        try:
-            with fp.open('r', encoding='utf-8') as f:
-                reader = csv.reader(f)
-                rows = [r for r in reader]
+# Nhịp điều hướng: 'adaptive' = token bucket dùng chung theo domain, tự tăng/giảm tốc (funcs.rate_limiter);
+# 'sleep' = random_sleep cố định mỗi trang như cũ
+PACING = 'adaptive'
 
-            # Bỏ header (dòng đầu)
-            data_rows = rows[1:]
-            categories = [r[0].strip() for r in data_rows if r and r[0].strip()]
-        except Exception as e:
-            logger.exception(f'Lỗi khi đọc CSV cố định {fp}: {e}')
-            return []
+# Nạp cookie: 'cdp' = 1 lệnh Network.setCookies trước lần điều hướng đầu tiên (không cần mở trang chủ,
+# chờ và refresh); 'selenium' = mở trang chủ, add_cookie rồi refresh như cũ (tự dùng khi CDP lỗi)
+COOKIE_MODE = 'cdp'
 
-        if not categories:
-            return []
 
-        if num_threads is not None:
-            try:
-                nt = int(num_threads)
-            except Exception:
-                logger.warning(f'num_threads không hợp lệ: {num_threads}')
-                nt = None
-
-            if nt is not None and nt > 0:
-                total = len(categories)
-                k, m = divmod(total, nt)
-                if k == 0:
-                    chunks = [[categories[i]] for i in range(total)]
-                    return chunks
-
-                chunks = []
-                start = 0
-                for i in range(nt):
-                    size = k + (1 if i < m else 0)
-                    if size <= 0:
-                        break
-                    chunks.append(categories[start:start + size])
-                    start += size
-                return chunks
+def read_categories(file_path: str | Path | None = None) -> list[str]:
+    base = Path(__file__).parent
+    # Xác định file CSV: dùng file_path nếu có, hoặc mặc định tới categories/category_hrefs.csv
+    if file_path:
+        fp = Path(file_path)
+    else:
+        fp = base / 'categories' / 'category_hrefs.csv'
+
+    try:
+        with fp.open('r', encoding='utf-8') as f:
+            reader = csv.reader(f)
+            rows = [r for r in reader]
 
+        # Bỏ header (dòng đầu)
+        data_rows = rows[1:]
+        return [r[0].strip() for r in data_rows if r and r[0].strip()]
     except FileNotFoundError:
         logger.error(f'Không tìm thấy file: {fp}')
         return []
     except Exception as e:
-        logger.exception(f'Lỗi không mong muốn trong category_chunking: {e}')
+        logger.exception(f'Lỗi khi đọc CSV cố định {fp}: {e}')
         return []
 
 
-def get_infor_product(driver) -> list:
+def _get_infor_product_dom(driver) -> list:
     from selenium.webdriver.common.by import By
 
     results: list = []
@@ -120,6 +102,99 @@ def get_infor_product(driver) -> list:
     return results
 
 
+# Script chạy trong trang: gom href/name của mọi card trong 1 lần gọi execute_script.
+# Dùng đúng các XPath của nhánh DOM để 2 chế độ trả về cùng kết quả.
+_PRODUCT_CARDS_JS = r"""
+var XR = XPathResult;
+function first(xp, ctx) {
+    return document.evaluate(xp, ctx, null, XR.FIRST_ORDERED_NODE_TYPE, null).singleNodeValue;
+}
+function shown(el) {
+    if (!el.getClientRects().length) return false;
+    var st = window.getComputedStyle(el);
+    return st.visibility !== 'hidden' && st.visibility !== 'collapse' && st.opacity !== '0';
+}
+function text(el) {
+    if (!el || !shown(el)) return '';
+    return (el.innerText || '').replace(/\u00a0/g, ' ').trim();
+}
+var container = first("//div[contains(@class,'ofs-recommend-page')]", document);
+if (!container) return JSON.stringify({found: false, items: []});
+var snap = document.evaluate(".//a[@href][.//img or .//div]", container, null, XR.ORDERED_NODE_SNAPSHOT_TYPE, null);
+var items = [];
+for (var i = 0; i < snap.snapshotLength; i++) {
+    var a = snap.snapshotItem(i);
+    var name = '';
+    var img = first(".//img[@alt]", a);
+    if (img) name = (img.getAttribute('alt') || '').trim();
+    if (!name) name = text(a);
+    if (!name) name = text(first(".//div[normalize-space(text())!='']", a));
+    items.push({href: a.href || a.getAttribute('href') || '', name: name});
+}
+return JSON.stringify({found: true, items: items});
+"""
+
+
+def _get_infor_product_js(driver) -> list | None:
+    """Trích xuất card sản phẩm bằng 1 round-trip execute_script.
+
+    Trả về None nếu script lỗi để caller fallback sang nhánh DOM.
+    """
+    try:
+        payload = json.loads(driver.execute_script(_PRODUCT_CARDS_JS) or '{}')
+    except Exception as e:
+        logger.debug(f"Lỗi khi chạy script trích xuất sản phẩm: {e}")
+        return None
+
+    if not payload.get('found'):
+        logger.warning("Không tìm thấy container 'ofs-recommend-page'")
+        return []
+
+    results: list = []
+    for item in payload.get('items') or []:
+        try:
+            results.append({
+                'href': item.get('href') or '',
+                'name': (item.get('name') or '').strip(),
+                'status': 0,
+            })
+        except Exception as e:
+            logger.debug(f"Lỗi khi xử lý 1 product từ script: {e}")
+            continue
+
+    return results
+
+
+def get_infor_product(driver, mode: str = 'js', capture=None) -> list:
+    """Lấy danh sách {href, name, status} của các sản phẩm trên trang listing.
+
+    - mode='api': đọc JSON của API listing từ performance log qua `capture` (funcs.shopee_api.ApiCapture),
+      không cần chờ DOM render; không bắt được response thì chờ trang sẵn sàng rồi dùng 'js'.
+    - mode='js': chạy 1 script trong trang, trả về toàn bộ card trong 1 lần gọi.
+    - mode='dom': duyệt từng anchor bằng WebDriver (cách cũ, mỗi card vài round-trip).
+    Nếu script lỗi sẽ tự fallback sang 'dom'.
+    """
+    if mode == 'api':
+        from funcs.readiness import wait_until_ready
+        from funcs.shopee_api import products_from_payloads
+
+        if capture is not None:
+            results = products_from_payloads(capture.wait())
+            if results:
+                return results
+        logger.debug("Không bắt được API listing, fallback sang chế độ JS")
+        wait_until_ready(driver, 'shopee_listing')
+        mode = 'js'
+
+    if mode == 'js':
+        results = _get_infor_product_js(driver)
+        if results is not None:
+            return results
+        logger.debug("Fallback sang chế độ DOM cho get_infor_product")
+
+    return _get_infor_product_dom(driver)
+
+
 def extract_category_name_from_url(url: str) -> str:
     try:
         seg = urllib.parse.unquote(str(url).rstrip('/').split('/')[-1])
@@ -145,100 +220,289 @@ def sanitize_filename(name: str, max_len: int = 200) -> str:
         return 'category'
 
 
-def get_product_in_category(thread_idx, categories, page_num: int = 5):
-    from funcs.setup_driver import setup_driver
-    from funcs.fake_agent import random_sleep, hover_element, random_scroll
-    from funcs.load_cookies_to_driver import load_cookies_to_driver
+class CategoryPages:
+    """Gom kết quả từng trang của 1 category (do nhiều worker lấy) rồi trả về list đầy đủ khi đủ trang."""
+
+    def __init__(self, page_num: int):
+        self.page_num = page_num
+        self._lock = threading.Lock()
+        self._pages: dict[str, dict[int, list]] = {}
+
+    def add(self, cat: str, page: int, products: list) -> list | None:
+        with self._lock:
+            pages = self._pages.setdefault(cat, {})
+            pages[page] = products or []
+            if len(pages) < self.page_num:
+                return None
+            self._pages.pop(cat, None)
+        return [p for i in sorted(pages) for p in pages[i]]
+
+    def drain(self) -> dict[str, dict[int, list]]:
+        """Lấy ra (và xoá) các category chưa đủ trang: {category: {pageNumber: products}}."""
+        with self._lock:
+            partial, self._pages = self._pages, {}
+        return partial
+
+
+def save_partial_categories(pages: CategoryPages, on_saved=None) -> int:
+    """Ghi CSV cho các category chưa đủ page_num trang khi worker dừng sớm (bị chặn, Chrome không mở được...).
+
+    Các trang đã lấy được không bị bỏ: CSV chỉ gồm các trang đó, lần chạy sau ghi đè lại đủ trang.
+    Trả về số category đã ghi.
+    """
+    saved = 0
+    for cat, got in pages.drain().items():
+        missing = [i for i in range(1, pages.page_num + 1) if i not in got]
+        logger.warning(f"Category {cat}: chỉ lấy được {len(got)}/{pages.page_num} trang, "
+                       f"thiếu trang {missing}, vẫn ghi các trang đã lấy")
+        products_all = [p for i in sorted(got) for p in got[i]]
+        csv_path = save_products_for_category(cat, products_all)
+        if csv_path is None:
+            continue
+        saved += 1
+        if on_saved is not None:
+            try:
+                on_saved(csv_path)
+            except Exception as e:
+                logger.exception(f"Lỗi khi chuyển products của {cat} sang stage sau: {e}")
+    return saved
 
-    driver = None
-    while driver is None:
-        driver = setup_driver(profile_idx=thread_idx)
-
-    screen_width = driver.execute_script("return window.screen.availWidth;")
-    screen_height = driver.execute_script("return window.screen.availHeight;")
-    window_width = screen_width // 5
-    window_height = screen_height // 2
-    position_x = thread_idx * window_width // 5
-    # position_x = thread_idx * window_width # for testing
-    position_y = 0
-
-    driver.set_window_size(window_width, window_height)
-    driver.set_window_position(position_x, position_y)
-
-    driver.get("https://shopee.vn/mall")
-    driver.execute_script("document.body.style.zoom='25%'")
-    load_cookies_to_driver(driver)
-    time.sleep(3)
-    driver.refresh()
-    
-    for cat in categories:
-        logger.info(f"[Thread {thread_idx}] Bắt đầu lấy sản phẩm trong category: {cat}")
-
-        cat_name = extract_category_name_from_url(cat)
-        safe_name = sanitize_filename(cat_name)
-        out_dir = Path(__file__).parent / 'products'
-        try:
-            out_dir.mkdir(parents=True, exist_ok=True)
-        except Exception as e:
-            logger.debug(f"Không thể tạo thư mục products: {e}")
 
-        out_file = out_dir / f"{safe_name}.json"
+def category_queue(file_path: str | Path | None = None, page_num: int = 5, categories: list | None = None):
+    """Tạo WorkQueue với mỗi item là 1 trang (category, pageNumber)."""
+    from funcs.work_queue import WorkQueue
 
-        products_all: list = []
+    if categories is None:
+        categories = read_categories(file_path)
+    items = [(cat, i) for cat in categories for i in range(1, page_num + 1)]
+    tasks = WorkQueue(items, name='category_pages')
+    tasks.close()
+    return tasks
 
-        for i in range(1, page_num + 1):
-            driver.get(f"{cat}/popular?pageNumber={i}")
+
+def save_products_for_category(cat: str, products_all: list, thread_idx=None) -> Path | None:
+    """Ghi products/{category}.csv (href, name, status); trả về đường dẫn file CSV, None nếu lỗi."""
+    cat_name = extract_category_name_from_url(cat)
+    safe_name = sanitize_filename(cat_name)
+    out_dir = Path(__file__).parent / 'products'
+    try:
+        out_dir.mkdir(parents=True, exist_ok=True)
+    except Exception as e:
+        logger.debug(f"Không thể tạo thư mục products: {e}")
+
+    out_file = out_dir / f"{safe_name}.json"
+
+    try:
+        with out_file.with_suffix('.csv').open('w', encoding='utf-8-sig', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=['href', 'name', 'status'])
+            writer.writeheader()
+            for p in products_all:
+                try:
+                    row = {
+                        'href': p.get('href', ''),
+                        'name': p.get('name', ''),
+                        'status': p.get('status', 0)
+                    }
+                    writer.writerow(row)
+                except Exception as e:
+                    logger.debug(f"Lỗi khi ghi 1 dòng CSV: {e}")
+
+        # CSV mới ghi lại toàn bộ status = 0 nên journal tiến độ cũ (nếu có) không còn đúng
+        from funcs.progress_journal import ProgressJournal, journal_path_for
+        ProgressJournal(journal_path_for(out_file.with_suffix('.csv'))).remove()
+
+        logger.info(f"[Thread {thread_idx}] Đã lưu {len(products_all)} products vào {out_file.with_suffix('.csv')}")
+        return out_file.with_suffix('.csv')
+    except Exception as e:
+        logger.exception(f"Lỗi khi lưu file CSV {out_file.with_suffix('.csv')}: {e}")
+        return None
+
+
+def get_product_in_category(thread_idx, categories, page_num: int = 5, pages: CategoryPages | None = None,
+                            on_saved=None):
+    """Worker lấy sản phẩm theo từng trang category.
+
+    `categories` là WorkQueue dùng chung (item = (category, pageNumber)) hoặc list category như cũ.
+    `pages` gom các trang của cùng category giữa các worker; CSV được ghi khi đủ page_num trang (category còn
+    dở khi mọi worker đã dừng được ghi bằng save_partial_categories()).
+    `on_saved(csv_path)` được gọi sau mỗi lần ghi xong CSV của 1 category (dùng cho pipeline.py).
+    """
+    from funcs.setup_driver import setup_driver
+    from funcs.resource_policy import log_resource_summary, report_page
+    from funcs.readiness import wait_until_ready
+    from funcs.shopee_api import ApiCapture, LISTING_API_PATTERNS
+    from funcs.fake_agent import random_sleep, hover_element, random_scroll
+    from funcs.cookie_pool import get_cookie_pool
+    from funcs.work_queue import WorkQueue
+    from funcs.rate_limiter import get_limiter
+    from funcs.block_detect import BlockGuard, PageBlocked, check_page
+    from funcs.driver_supervisor import CRASH_RETRIES, DriverSupervisor
+
+    tasks = categories if isinstance(categories, WorkQueue) else category_queue(page_num=page_num, categories=list(categories))
+    limiter = get_limiter('shopee.vn') if PACING == 'adaptive' else None
+    pages = pages or CategoryPages(page_num)
+
+    session = get_cookie_pool('shopee').session(f'products-{thread_idx}')
+    guard = BlockGuard(session.worker, session.account, limiter)
+
+    def open_driver():
+        driver = None
+        while driver is None:
+            driver = setup_driver(profile_idx=thread_idx, resource_policy=RESOURCE_POLICY,
+                                  performance_log=EXTRACT_MODE == 'api')
+        return driver
+
+    def prepare_driver(driver):
+        screen_width = driver.execute_script("return window.screen.availWidth;")
+        screen_height = driver.execute_script("return window.screen.availHeight;")
+        window_width = screen_width // 5
+        window_height = screen_height // 2
+        position_x = thread_idx * window_width // 5
+        # position_x = thread_idx * window_width # for testing
+        position_y = 0
+
+        driver.set_window_size(window_width, window_height)
+        driver.set_window_position(position_x, position_y)
+
+        if COOKIE_MODE != 'cdp' or not session.load(driver, mode='cdp'):
+            driver.get("https://shopee.vn/mall")
             driver.execute_script("document.body.style.zoom='25%'")
+            session.load(driver)
             time.sleep(3)
+            driver.refresh()
 
-            random_sleep()
-            hover_element(driver, driver.find_element('tag name', 'body'))
-            random_scroll(driver)
+    # Chrome được mở lại sau RECYCLE_AFTER_PAGES trang / khi vượt ngưỡng RAM / khi crash (funcs.driver_supervisor)
+    supervisor = DriverSupervisor(session.worker, open_driver, prepare=prepare_driver,
+                                  on_quit=lambda d: log_resource_summary(d, logger))
+    driver = None
+    capture = None
+    retry = None
+
+    while True:
+        # tài khoản đang bị tạm dừng (worker khác vừa gặp chặn): không mở trang trong lúc chờ
+        guard.wait()
+        if guard.stopped or supervisor.driver is None:
+            if guard.stopped:
+                logger.error(f"[Thread {thread_idx}] Tài khoản bị chặn liên tục, dừng worker")
+            else:
+                logger.error(f"[Thread {thread_idx}] Không mở lại được Chrome, dừng worker")
+            if retry is not None:
+                tasks.release(thread_idx, retry)
+            tasks.leave(thread_idx)
+            break
+        if supervisor.driver is not driver:
+            # Chrome mới: ApiCapture gắn với driver cũ
+            driver = supervisor.driver
+            capture = ApiCapture(driver, LISTING_API_PATTERNS) if EXTRACT_MODE == 'api' else None
+        # trang đang dở khi Chrome crash được lấy lại ngay trên Chrome mới
+        if retry is not None:
+            item, retry = retry, None
+        else:
+            item, item_crashes = tasks.get(thread_idx), 0
+        if item is None:
+            break
+        cat, i = item
 
-            products = get_infor_product(driver)
-            logger.info(f"[Thread {thread_idx}] Category: {cat} - Page {i} - Found {len(products)} products")
+        try:
+            if i == 1:
+                logger.info(f"[Thread {thread_idx}] Bắt đầu lấy sản phẩm trong category: {cat}")
 
-            try:
+            if capture is not None:
+                capture.reset()
+            if limiter is not None:
+                limiter.acquire()
+            driver.get(f"{cat}/popular?pageNumber={i}")
+            driver.execute_script("document.body.style.zoom='25%'")
+            ready = None
+            if capture is None:
+                # chế độ api đọc thẳng JSON, không cần chờ DOM render và cuộn trang trước khi lấy
+                ready = wait_until_ready(driver, 'shopee_listing')
+
+                if limiter is None:
+                    random_sleep()
+                hover_element(driver, driver.find_element('tag name', 'body'))
+                random_scroll(driver)
+
+            products = get_infor_product(driver, mode=EXTRACT_MODE, capture=capture)
+            report_page(driver, f"{cat} page {i}", entries=capture.entries if capture is not None else None)
+            logger.info(f"[Thread {thread_idx}] Category: {cat} - Page {i} - Found {len(products)} products")
+            check_page(driver, 'shopee', probe_page=not products)
+            if products:
+                guard.ok()
+            if limiter is not None:
                 if products:
-                    products_all.extend(products)
-            except Exception as e:
-                logger.debug(f"Lỗi khi gộp sản phẩm vào list tổng: {e}")
+                    limiter.success()
+                elif ready is not None and not ready['ready']:
+                    limiter.failure('error')
 
-            random_sleep()
+            if limiter is None:
+                random_sleep()
             hover_element(driver, driver.find_element('tag name', 'body'))
             random_scroll(driver)
-
-        try:
-            with out_file.with_suffix('.csv').open('w', encoding='utf-8-sig', newline='') as f:
-                writer = csv.DictWriter(f, fieldnames=['href', 'name', 'status'])
-                writer.writeheader()
-                for p in products_all:
-                    try:
-                        row = {
-                            'href': p.get('href', ''),
-                            'name': p.get('name', ''),
-                            'status': p.get('status', 0)
-                        }
-                        writer.writerow(row)
-                    except Exception as e:
-                        logger.debug(f"Lỗi khi ghi 1 dòng CSV: {e}")
-
-            logger.info(f"[Thread {thread_idx}] Đã lưu {len(products_all)} products vào {out_file.with_suffix('.csv')}")
+        except PageBlocked as e:
+            # trang chặn / hết phiên: trả trang về hàng đợi (không tính lần thử), tạm dừng rồi đổi phiên
+            tasks.release(thread_idx, item)
+            guard.blocked(e.signature, rotate=lambda: session.rotate(driver, retire=guard.stopped))
+            continue
         except Exception as e:
-            logger.exception(f"Lỗi khi lưu file CSV {out_file.with_suffix('.csv')}: {e}")
+            if supervisor.crashed(e) and item_crashes < CRASH_RETRIES:
+                # Chrome chết giữa chừng, không phải lỗi của trang: lấy lại trên Chrome mới
+                item_crashes += 1
+                retry = item
+                continue
+            logger.exception(f"[Thread {thread_idx}] Lỗi khi lấy trang {i} của category {cat}: {e}")
+            if limiter is not None:
+                limiter.failure('error')
+            if tasks.failed(thread_idx, item):
+                continue
+            products = []
+        else:
+            tasks.done(thread_idx)
 
+        products_all = pages.add(cat, i, products)
+        if products_all is not None:
+            csv_path = save_products_for_category(cat, products_all, thread_idx)
+            if csv_path is not None and on_saved is not None:
+                try:
+                    on_saved(csv_path)
+                except Exception as e:
+                    logger.exception(f"[Thread {thread_idx}] Lỗi khi chuyển products của {cat} sang stage sau: {e}")
+        supervisor.page()
 
-if __name__ == '__main__':
-    NUM_THREADS = 5
-    list_categories = category_chunking(num_threads=NUM_THREADS)
+    session.release()
+    supervisor.close()
+
+
+def main(num_threads: int = 5, page_num: int = 9):
+    from funcs.block_detect import log_block_summary
+    from funcs.cookie_pool import log_cookie_pool_summary
+    from funcs.driver_supervisor import log_recycle_summary
+    from funcs.memory import log_rss_summary
+    from funcs.rate_limiter import log_rate_limiter_summary
+    from funcs.readiness import log_readiness_summary
+
+    tasks = category_queue(page_num=page_num)
+    pages = CategoryPages(page_num)
 
     threads = []
 
-    for idx, cat in enumerate(list_categories):
-        thread = threading.Thread(target=get_product_in_category, args=(idx, cat, 9))
+    for idx in range(min(num_threads, len(tasks))):
+        thread = threading.Thread(target=get_product_in_category, args=(idx, tasks, page_num, pages))
         thread.start()
-        time.sleep(1)
         threads.append(thread)
 
     for thread in threads:
         thread.join()
+    save_partial_categories(pages)
+
+    tasks.log_report(logger)
+    log_rate_limiter_summary(logger)
+    log_block_summary(logger)
+    log_cookie_pool_summary(logger)
+    log_rss_summary(logger)
+    log_recycle_summary(logger, 'products')
+    log_readiness_summary(logger)
+
+
+if __name__ == '__main__':
+    main()
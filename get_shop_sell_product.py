@@ -14,75 +14,36 @@ except Exception:
 
 logger = logging.getLogger(__name__)
 
+# Preset chặn ảnh/font/video/tracker qua CDP cho trang sản phẩm (None = tải đầy đủ như trình duyệt thường)
+RESOURCE_POLICY = 'shopee_product'
 
-def products_chunking(file_path: str | Path | None = None, num_threads: int | None = None):
-    try:
-        base = Path(__file__).parent
-        products_dir = Path(file_path) if file_path else base / 'products'
-
-        if not products_dir.exists() or not products_dir.is_dir():
-            logger.error(f'Thư mục products không tồn tại: {products_dir}')
-            return []
-
-        csv_files = sorted([p for p in products_dir.iterdir() if p.is_file() and p.suffix.lower() == '.csv'])
-        if not csv_files:
-            logger.warning(f'Không tìm thấy file csv trong thư mục: {products_dir}')
-            return []
-
-        import csv
-
-        file_groups: list[tuple[Path, list[str]]] = []
-        for fp in csv_files:
-            try:
-                hrefs: list[str] = []
-                with fp.open('r', encoding='utf-8-sig', newline='') as f:
-                    reader = csv.DictReader(f)
-                    for row in reader:
-                        try:
-                            href = (row.get('href') or '').strip()
-                            if href:
-                                hrefs.append(href)
-                        except Exception:
-                            logger.debug(f'Lỗi khi đọc dòng trong {fp}')
-
-                if hrefs:
-                    file_groups.append((fp, hrefs))
-                else:
-                    logger.debug(f'Không tìm thấy href trong file: {fp}')
-            except Exception as e:
-                logger.exception(f'Lỗi khi đọc file products {fp}: {e}')
+# Cách lấy shop: 'api' (đọc JSON API từ performance log), 'js' hoặc 'dom' (xem get_infor_shop)
+EXTRACT_MODE = 'js'
 
-        if not file_groups:
-            logger.warning('Không tìm thấy href nào trong các file products')
-            return []
+# 'http': lấy shop bằng aiohttp trước (funcs.http_fetch), chỉ mở Chrome cho sản phẩm bị chặn / lỗi;
+# 'browser': mọi sản phẩm đều mở bằng Chrome như cũ
+FETCH_MODE = 'browser'
 
-        if num_threads is None:
-            num_threads = 1
+# Nhịp điều hướng: 'adaptive' = token bucket dùng chung theo domain, tự tăng/giảm tốc (funcs.rate_limiter);
+# 'sleep' = random_sleep cố định mỗi trang như cũ
+PACING = 'adaptive'
 
-        try:
-            nt = int(num_threads)
-            if nt <= 0:
-                nt = 1
-        except Exception:
-            nt = 1
+# Nạp cookie: 'cdp' = 1 lệnh Network.setCookies trước lần điều hướng đầu tiên (không cần mở trang chủ,
+# chờ và refresh); 'selenium' = mở trang chủ, add_cookie rồi refresh như cũ (tự dùng khi CDP lỗi)
+COOKIE_MODE = 'cdp'
 
-        chunks: list[list[Path]] = [[] for _ in range(nt)]
-        chunk_counts = [0] * nt
+# Index shopid -> shop đã biết (ShopIndex), dùng lại giữa các lần chạy. Không đặt trong shops/: mọi
+# shops/*.csv đều được find_shop_on_ggmap coi là file shop của 1 category
+SHOP_INDEX_FILE = 'cache/shop_index.csv'
 
-        file_groups_sorted = sorted(file_groups, key=lambda x: len(x[1]), reverse=True)
+# Các đoạn text trong khối shop không phải tên shop
+SHOP_NAME_SKIP_KEYWORDS = ('chat ngay', 'xem shop', 'online', 'đánh giá', 'tỉ lệ phản hồi', 'tham gia',
+                           'sản phẩm', 'thời gian phản hồi', 'người theo dõi')
 
-        for fp, hrefs in file_groups_sorted:
-            idx_min = int(min(range(nt), key=lambda i: chunk_counts[i]))
-            chunks[idx_min].append(fp)
-            chunk_counts[idx_min] += len(hrefs)
-
-        return chunks
-    except Exception as e:
-        logger.exception(f'Lỗi không mong muốn trong products_chunking: {e}')
-        return []
 
+def _get_infor_shop_dom(driver) -> list:
+    from funcs.shopee_api import shop_id_from_href
 
-def get_infor_shop(driver) -> list:
     try:
         shops: list[dict] = []
 
@@ -129,7 +90,7 @@ def get_infor_shop(driver) -> list:
                     if not txt:
                         continue
                     low = txt.lower()
-                    if any(k in low for k in ('chat ngay', 'xem shop', 'online', 'đánh giá', 'tỉ lệ phản hồi', 'tham gia', 'sản phẩm', 'thời gian phản hồi', 'người theo dõi')):
+                    if any(k in low for k in SHOP_NAME_SKIP_KEYWORDS):
                         continue
                     if len(txt) < 3:
                         continue
@@ -162,21 +123,7 @@ def get_infor_shop(driver) -> list:
         except Exception:
             pass
 
-        shop_id = ''
-        try:
-            if shop_href:
-                parsed = urllib.parse.urlparse(shop_href)
-                path = parsed.path or ''
-                if path:
-                    shop_id = path.strip('/').split('/')[-1]
-                if not shop_id and parsed.query:
-                    q = urllib.parse.parse_qs(parsed.query)
-                    for key in ('shopid', 'shopId', 'sellerId'):
-                        if key in q and q[key]:
-                            shop_id = q[key][0]
-                            break
-        except Exception:
-            shop_id = ''
+        shop_id = shop_id_from_href(shop_href) if shop_href else ''
 
         shop_name = shop_name or ''
         shop_href = shop_href or ''
@@ -195,6 +142,129 @@ def get_infor_shop(driver) -> list:
         return []
 
 
+# Script chạy trong trang: lọc candidate, resolve href tương đối và tách shop_id
+# trong 1 lần execute_script (arguments[0] = SHOP_NAME_SKIP_KEYWORDS).
+_SHOP_INFO_JS = r"""
+var skip = arguments[0] || [];
+var XR = XPathResult;
+function first(xp, ctx) {
+    return document.evaluate(xp, ctx, null, XR.FIRST_ORDERED_NODE_TYPE, null).singleNodeValue;
+}
+function shown(el) {
+    if (!el.getClientRects().length) return false;
+    var st = window.getComputedStyle(el);
+    return st.visibility !== 'hidden' && st.visibility !== 'collapse' && st.opacity !== '0';
+}
+function text(el) {
+    if (!el || !shown(el)) return '';
+    return (el.innerText || '').replace(/\u00a0/g, ' ').trim();
+}
+
+var section = document.querySelector('section.page-product__shop');
+var anchor = section ? first(".//a[@href][1]", section) : first("//a[@href][1]", document);
+var shopHref = anchor ? (anchor.href || anchor.getAttribute('href') || '').trim() : '';
+
+var shopName = '';
+var xp = "//*[self::div or self::span or self::h1 or self::h2 or self::p][normalize-space()]";
+var snap = document.evaluate(section ? '.' + xp : xp, section || document, null, XR.ORDERED_NODE_SNAPSHOT_TYPE, null);
+for (var i = 0; i < snap.snapshotLength; i++) {
+    var txt = text(snap.snapshotItem(i));
+    if (!txt) continue;
+    var low = txt.toLowerCase();
+    if (skip.some(function (k) { return low.indexOf(k) !== -1; })) continue;
+    if (Array.from(txt).length < 3) continue;
+    if (/^[\p{Nd},.\s]+$/u.test(txt)) continue;
+    shopName = txt;
+    break;
+}
+if (!shopName && anchor) shopName = text(anchor);
+
+if (shopHref.charAt(0) === '/' && location.protocol && location.host) {
+    shopHref = shopHref.slice(0, 2) === '//' ? location.protocol + shopHref
+        : location.protocol + '//' + location.host + shopHref;
+}
+
+var shopId = '';
+if (shopHref) {
+    var rest = shopHref.split('#')[0];
+    var query = '';
+    var qi = rest.indexOf('?');
+    if (qi !== -1) { query = rest.slice(qi + 1); rest = rest.slice(0, qi); }
+    var scheme = rest.match(/^[A-Za-z][A-Za-z0-9+.\-]*:/);
+    if (scheme) rest = rest.slice(scheme[0].length);
+    if (rest.slice(0, 2) === '//') {
+        var si = rest.indexOf('/', 2);
+        rest = si === -1 ? '' : rest.slice(si);
+    }
+    var semi = rest.indexOf(';', rest.lastIndexOf('/') + 1);
+    if (semi !== -1) rest = rest.slice(0, semi);
+    if (rest) shopId = rest.replace(/^\/+|\/+$/g, '').split('/').pop();
+    if (!shopId && query) {
+        var params = new URLSearchParams(query);
+        var keys = ['shopid', 'shopId', 'sellerId'];
+        for (var k = 0; k < keys.length; k++) {
+            if (params.get(keys[k])) { shopId = params.get(keys[k]); break; }
+        }
+    }
+}
+return JSON.stringify({shop_name: shopName, shop_href: shopHref, shop_id: shopId});
+"""
+
+
+def _get_infor_shop_js(driver) -> list | None:
+    """Lấy thông tin shop bằng 1 round-trip execute_script.
+
+    Trả về None nếu script lỗi để caller fallback sang nhánh DOM.
+    """
+    try:
+        payload = json.loads(driver.execute_script(_SHOP_INFO_JS, list(SHOP_NAME_SKIP_KEYWORDS)) or '{}')
+    except Exception as e:
+        logger.debug(f'Lỗi khi chạy script lấy thông tin shop: {e}')
+        return None
+
+    shop_name = (payload.get('shop_name') or '').strip()
+    shop_href = (payload.get('shop_href') or '').strip()
+    shop_id = payload.get('shop_id') or ''
+
+    if shop_name or shop_href:
+        return [{
+            'shop_name': shop_name,
+            'shop_href': shop_href,
+            'shop_id': shop_id,
+        }]
+    return []
+
+
+def get_infor_shop(driver, mode: str = 'js', capture=None) -> list:
+    """Lấy [{shop_name, shop_href, shop_id}] từ trang sản phẩm.
+
+    - mode='api': đọc JSON API của trang sản phẩm (shop_detailed / get_shop_info...) qua `capture`
+      (funcs.shopee_api.ApiCapture); không bắt được response thì chờ trang sẵn sàng rồi dùng 'js'.
+    - mode='js': lọc candidate và tách shop_id ngay trong trang (1 round-trip).
+    - mode='dom': đọc `.text` từng phần tử qua WebDriver rồi lọc bằng Python (cách cũ).
+    Nếu script lỗi sẽ tự fallback sang 'dom'.
+    """
+    if mode == 'api':
+        from funcs.readiness import wait_until_ready
+        from funcs.shopee_api import shops_from_payloads
+
+        if capture is not None:
+            shops = shops_from_payloads(capture.wait())
+            if shops:
+                return shops
+        logger.debug('Không bắt được API trang sản phẩm, fallback sang chế độ JS')
+        wait_until_ready(driver, 'shopee_product')
+        mode = 'js'
+
+    if mode == 'js':
+        shops = _get_infor_shop_js(driver)
+        if shops is not None:
+            return shops
+        logger.debug('Fallback sang chế độ DOM cho get_infor_shop')
+
+    return _get_infor_shop_dom(driver)
+
+
 def _ensure_shops_dir():
     try:
         base = Path(__file__).parent
@@ -207,108 +277,421 @@ def _ensure_shops_dir():
         return None
 
 
-def save_shops_for_category(category_name: str, shops: list[dict]):
+def shops_csv_path(category_name: str) -> Path | None:
+    shops_dir = _ensure_shops_dir()
+    if shops_dir is None:
+        return None
+    safe_name = re.sub(r"[^0-9a-zA-Z_\-\u00C0-\u024F ]+", '', category_name).strip() or category_name
+    return shops_dir / f"{safe_name}.csv"
+
+
+def _shop_key(item: dict) -> str:
     try:
-        shops_dir = _ensure_shops_dir()
-        if shops_dir is None:
-            return False
-        safe_name = re.sub(r"[^0-9a-zA-Z_\-\u00C0-\u024F ]+", '', category_name).strip() or category_name
-        out_file_json = shops_dir / f"{safe_name}.json"
-        out_file_csv = shops_dir / f"{safe_name}.csv"
+        sid = item.get('shop_id') or ''
+        href = item.get('shop_href') or ''
+        name = item.get('shop_name') or ''
+
+        sid = str(sid).strip()
+        href = str(href).strip().lower()
+        name = str(name).strip().lower()
+
+        if sid:
+            return f"id:{sid}"
+        if href:
+            return f"href:{href}"
+        return f"name:{name}"
+    except Exception:
+        return ''
+
+
+class ShopStore:
+    """Shop của 1 category: giữ tập key dedup (id:/href:/name:) trong bộ nhớ, ghi nối shop mới theo lô.
+
+    File shops/{category}.csv chỉ được đọc 1 lần khi mở store. Shop mới được gom trong bộ nhớ và
+    append vào CSV khi đủ `flush_size` shop hoặc sau `flush_interval` giây (thread nền kiểm tra định kỳ,
+    và khi flush_shop_stores()). Định dạng CSV giữ nguyên: shop_id, shop_name, shop_href.
+
+    `on_flushed` của add() (vd. đánh dấu sản phẩm xong trong journal) chỉ được gọi sau khi các shop đó
+    đã nằm trong file, để bị kill giữa chừng thì sản phẩm chưa được ghi nhận xong và lần sau chạy lại.
+    """
+
+    FIELDNAMES = ['shop_id', 'shop_name', 'shop_href']
+
+    def __init__(self, category_name: str, flush_size: int = 50, flush_interval: float = 30.0):
+        self.category_name = category_name
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+        self.path = shops_csv_path(category_name)
+        self._lock = threading.Lock()
+        self._seen: set[str] = set()
+        self._pending: list[dict] = []
+        self._waiting: list = []   # on_flushed chờ lần ghi file tiếp theo
+        self._rewrite: list[dict] | None = None
+        self._last_flush = time.monotonic()
+        self.total = 0
+        self._load()
+
+    def _load(self):
+        """Đọc existing shops: ưu tiên CSV, fallback JSON cũ nếu có (JSON cũ sẽ được chuyển sang CSV)."""
+        import csv
 
-        # Đọc existing shops: ưu tiên CSV, fallback JSON cũ nếu có
+        if self.path is None:
+            return
         existing: list[dict] = []
         try:
-            import csv
+            if self.path.exists():
+                with self.path.open('r', encoding='utf-8-sig', newline='') as f:
+                    for row in csv.DictReader(f):
+                        self._remember({
+                            'shop_id': (row.get('shop_id') or '').strip(),
+                            'shop_name': (row.get('shop_name') or '').strip(),
+                            'shop_href': (row.get('shop_href') or '').strip(),
+                        })
+                return
+            out_file_json = self.path.with_suffix('.json')
+            if out_file_json.exists():
+                with out_file_json.open('r', encoding='utf-8') as f:
+                    js = json.load(f) or []
+                for item in js:
+                    try:
+                        item = {
+                            'shop_id': str(item.get('shop_id') or '').strip(),
+                            'shop_name': str(item.get('shop_name') or '').strip(),
+                            'shop_href': str(item.get('shop_href') or '').strip(),
+                        }
+                    except Exception:
+                        continue
+                    if self._remember(item):
+                        existing.append(item)
+                self._rewrite = existing
+        except Exception as e:
+            logger.exception(f'Lỗi khi đọc shops cũ của category {self.category_name}: {e}')
 
-            if out_file_csv.exists():
-                with out_file_csv.open('r', encoding='utf-8-sig', newline='') as f:
-                    reader = csv.DictReader(f)
-                    for row in reader:
-                        try:
-                            existing.append({
-                                'shop_id': (row.get('shop_id') or '').strip(),
-                                'shop_name': (row.get('shop_name') or '').strip(),
-                                'shop_href': (row.get('shop_href') or '').strip(),
-                            })
-                        except Exception:
-                            continue
-            elif out_file_json.exists():
+    def _remember(self, item: dict) -> bool:
+        k = _shop_key(item) or (item.get('shop_name', '') + '|' + item.get('shop_href', '')).strip()
+        if k in self._seen:
+            return False
+        self._seen.add(k)
+        self.total += 1
+        return True
+
+    def add(self, shops: list[dict], on_flushed=None) -> list[dict]:
+        """Thêm shops, trả về các shop mới (chưa có trong category).
+
+        on_flushed() được gọi (ngoài lock) khi mọi shop trong `shops` đã được ghi vào file.
+        """
+        added: list[dict] = []
+        with self._lock:
+            for item in shops:
                 try:
-                    with out_file_json.open('r', encoding='utf-8') as f:
-                        js = json.load(f) or []
-                    for item in js:
+                    if self._remember(item):
+                        added.append(item)
+                except Exception:
+                    continue
+            self._pending.extend(added)
+            if on_flushed is not None:
+                self._waiting.append(on_flushed)
+            due = (len(self._pending) >= self.flush_size
+                   or time.monotonic() - self._last_flush >= self.flush_interval)
+            ready = self._flush_locked() if due else []
+        self._notify(ready)
+        return added
+
+    def flush(self) -> bool:
+        with self._lock:
+            ready = self._flush_locked()
+            ok = ready is not None
+        self._notify(ready)
+        return ok
+
+    def flush_if_due(self) -> bool:
+        """Ghi nếu còn shop / on_flushed đang chờ quá `flush_interval` giây (gọi từ thread nền)."""
+        with self._lock:
+            if not (self._pending or self._waiting) or time.monotonic() - self._last_flush < self.flush_interval:
+                return False
+            ready = self._flush_locked()
+        self._notify(ready)
+        return ready is not None
+
+    def _notify(self, ready: list | None):
+        for callback in ready or ():
+            try:
+                callback()
+            except Exception as e:
+                logger.exception(f'Lỗi on_flushed của category {self.category_name}: {e}')
+
+    def _flush_locked(self) -> list | None:
+        """Ghi shop đang chờ; trả về các on_flushed đã đủ điều kiện gọi, None nếu ghi lỗi."""
+        import csv
+
+        self._last_flush = time.monotonic()
+        if self.path is None:
+            return None
+        if self._pending or self._rewrite is not None:
+            try:
+                if self._rewrite is not None:
+                    rows, mode, header = self._rewrite + self._pending, 'w', True
+                else:
+                    rows, mode = self._pending, 'a'
+                    header = not self.path.exists() or self.path.stat().st_size == 0
+                with self.path.open(mode, encoding='utf-8-sig' if header else 'utf-8', newline='') as f:
+                    writer = csv.DictWriter(f, fieldnames=self.FIELDNAMES)
+                    if header:
+                        writer.writeheader()
+                    for item in rows:
                         try:
-                            existing.append({
-                                'shop_id': str(item.get('shop_id') or '').strip(),
-                                'shop_name': str(item.get('shop_name') or '').strip(),
-                                'shop_href': str(item.get('shop_href') or '').strip(),
+                            writer.writerow({
+                                'shop_id': item.get('shop_id', ''),
+                                'shop_name': item.get('shop_name', ''),
+                                'shop_href': item.get('shop_href', ''),
                             })
                         except Exception:
                             continue
-                except Exception:
-                    existing = []
-        except Exception:
-            existing = []
+            except Exception as e:
+                logger.exception(f'Lỗi khi ghi file CSV shops cho category {self.category_name}: {e}')
+                return None
 
-        seen = set()
-        merged: list[dict] = []
+            logger.info(f'Đã lưu {len(self._pending)} shop mới vào {self.path} (tổng {self.total})')
+            self._pending = []
+            self._rewrite = None
+        ready, self._waiting = self._waiting, []
+        return ready
+
+
+_shop_stores: dict[str, ShopStore] = {}
+_shop_stores_lock = threading.Lock()
+_shop_flusher: threading.Thread | None = None
+
+# Chu kỳ thread nền kiểm tra các ShopStore còn shop chưa ghi (giây)
+SHOP_FLUSH_CHECK_S = 5.0
 
-        def key_of(item: dict) -> str:
-            try:
-                sid = item.get('shop_id') or ''
-                href = item.get('shop_href') or ''
-                name = item.get('shop_name') or ''
-
-                sid = str(sid).strip()
-                href = str(href).strip().lower()
-                name = str(name).strip().lower()
-
-                if sid:
-                    return f"id:{sid}"
-                if href:
-                    return f"href:{href}"
-                return f"name:{name}"
-            except Exception:
-                return ''
 
-        for item in existing + shops:
+def _run_shop_flusher():
+    while True:
+        time.sleep(SHOP_FLUSH_CHECK_S)
+        with _shop_stores_lock:
+            stores = list(_shop_stores.values())
+        for store in stores:
             try:
-                k = key_of(item) or ''
-                if not k:
-                    k = (item.get('shop_name', '') + '|' + item.get('shop_href', '')).strip()
-                if k in seen:
-                    continue
-                seen.add(k)
-                merged.append(item)
-            except Exception:
-                continue
+                store.flush_if_due()
+            except Exception as e:
+                logger.debug(f'Lỗi khi ghi định kỳ shops của {store.category_name}: {e}')
+
+
+def get_shop_store(category_name: str) -> ShopStore:
+    global _shop_flusher
+    with _shop_stores_lock:
+        store = _shop_stores.get(category_name)
+        if store is None:
+            store = ShopStore(category_name)
+            _shop_stores[category_name] = store
+        if _shop_flusher is None:
+            _shop_flusher = threading.Thread(target=_run_shop_flusher, name='shop-flusher', daemon=True)
+            _shop_flusher.start()
+        return store
+
+
+def flush_shop_stores():
+    """Ghi nốt các shop còn trong bộ nhớ của mọi category (gọi khi dừng chương trình)."""
+    with _shop_stores_lock:
+        stores = list(_shop_stores.values())
+    for store in stores:
+        store.flush()
+
+
+def save_shops_for_category(category_name: str, shops: list[dict], on_flushed=None) -> list[dict] | None:
+    """Thêm shops vào shops/{category}.csv (dedup theo shop_id/href/name), ghi theo lô qua ShopStore.
+
+    Trả về các shop mới được thêm (chưa có trong file), None nếu lỗi. on_flushed() được gọi khi các shop
+    đã nằm trong file (xem ShopStore.add).
+    """
+    try:
+        return get_shop_store(category_name).add(shops, on_flushed=on_flushed)
+    except Exception as e:
+        logger.exception(f'Lỗi khi lưu shops cho category {category_name}: {e}')
+        return None
 
-        # Ghi ra CSV với header: shop_id, shop_name, shop_href
+
+def real_shops(shops: list[dict]) -> list[dict]:
+    """Các shop lấy được thật từ trang: có shop_name + shop_href của shop, không phải text dự phòng của anchor
+    ('Xem Shop'...) hay link không phải trang shop khi get_infor_shop không tìm thấy khối shop."""
+    from funcs.shopee_api import parse_item_href, shop_id_from_href
+
+    out = []
+    for s in shops or []:
+        name = (s.get('shop_name') or '').strip()
+        href = (s.get('shop_href') or '').strip()
+        if not name or not href or not shop_id_from_href(href) or parse_item_href(href) is not None:
+            continue
+        if any(k in name.lower() for k in SHOP_NAME_SKIP_KEYWORDS):
+            continue
+        out.append(s)
+    return out
+
+
+class ShopIndex:
+    """shopid (số trong href sản phẩm '-i.<shopid>.<itemid>') -> shop đã biết, dùng chung mọi worker/category.
+
+    Các sản phẩm cùng shop chỉ cần mở 1 trang:
+    - claim() trả 'known' nếu shop đã biết -> lưu shop luôn, không mở browser
+    - 'load' cho worker đầu tiên gặp shopid -> worker đó mở trang sản phẩm
+    - 'parked' nếu shopid đang được worker khác mở -> sản phẩm được gác lại, resolve() trả về để
+      worker kia xử lý khi lấy được shop (release() nếu lỗi để đưa lại vào hàng đợi)
+    Index được ghi nối vào SHOP_INDEX_FILE để lần chạy sau dùng lại. Chỉ shop qua được real_shops() mới được
+    ghi nhận, trang lấy lỗi không bị dùng lại cho các sản phẩm khác của shop.
+    """
+
+    FIELDNAMES = ['shopid', 'shop_id', 'shop_name', 'shop_href']
+
+    def __init__(self, path: Path | None = None):
+        if path is None:
+            path = Path(__file__).parent / SHOP_INDEX_FILE
+            self._migrate(path)
+        self.path = path
+        self._lock = threading.Lock()
+        self._known: dict[str, list[dict]] = {}
+        self._inflight: dict[str, list] = {}
+        self.stats = {'loads': 0, 'known': 0, 'parked': 0, 'saved': 0}
+        self._load()
+
+    @staticmethod
+    def _migrate(path: Path):
+        """Chuyển shops/shop_index.csv của bản cũ sang SHOP_INDEX_FILE (bản cũ bị đọc nhầm như 1 category)."""
+        old = Path(__file__).parent / 'shops' / 'shop_index.csv'
         try:
-            import csv
-            with out_file_csv.open('w', encoding='utf-8-sig', newline='') as f:
-                fieldnames = ['shop_id', 'shop_name', 'shop_href']
-                writer = csv.DictWriter(f, fieldnames=fieldnames)
-                writer.writeheader()
-                for item in merged:
-                    try:
-                        writer.writerow({
-                            'shop_id': item.get('shop_id', ''),
-                            'shop_name': item.get('shop_name', ''),
-                            'shop_href': item.get('shop_href', ''),
-                        })
-                    except Exception:
+            if old.exists() and not path.exists():
+                path.parent.mkdir(parents=True, exist_ok=True)
+                os.replace(old, path)
+                logger.info(f'Đã chuyển {old} sang {path}')
+            elif old.exists():
+                # đã có index mới: giữ bản cũ ngoài shops/ để không bị tìm lại trên Maps
+                backup = path.with_name(f'{path.stem}.old.csv')
+                os.replace(old, backup)
+                logger.info(f'Đã chuyển {old} sang {backup} (index đang dùng: {path})')
+        except Exception as e:
+            logger.exception(f'Lỗi khi chuyển {old} sang {path}: {e}')
+
+    def _load(self):
+        import csv
+
+        if self.path is None or not self.path.exists():
+            return
+        skipped = 0
+        try:
+            with self.path.open('r', encoding='utf-8-sig', newline='') as f:
+                for row in csv.DictReader(f):
+                    shopid = (row.get('shopid') or '').strip()
+                    if not shopid:
+                        continue
+                    shop = {
+                        'shop_id': (row.get('shop_id') or '').strip(),
+                        'shop_name': (row.get('shop_name') or '').strip(),
+                        'shop_href': (row.get('shop_href') or '').strip(),
+                    }
+                    # dòng do bản cũ ghi từ trang lấy lỗi: bỏ qua, sản phẩm của shop đó sẽ được mở lại
+                    if not real_shops([shop]):
+                        skipped += 1
                         continue
+                    self._known.setdefault(shopid, []).append(shop)
+            logger.info(f'Đã đọc {len(self._known)} shop đã biết từ {self.path}'
+                        + (f', bỏ {skipped} dòng không có tên / link shop thật' if skipped else ''))
         except Exception as e:
-            logger.exception(f'Lỗi khi ghi file CSV shops cho category {category_name}: {e}')
-            return False
+            logger.exception(f'Lỗi khi đọc {self.path}: {e}')
 
-        logger.info(f'Đã lưu {len(shops)} shop vào {out_file_csv} (tổng {len(merged)})')
-        return True
-    except Exception as e:
-        logger.exception(f'Lỗi khi lưu shops cho category {category_name}: {e}')
-        return False
+    def _append(self, shopid: str, shops: list[dict]):
+        import csv
+
+        if self.path is None:
+            return
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            header = not self.path.exists() or self.path.stat().st_size == 0
+            with self.path.open('a', encoding='utf-8-sig' if header else 'utf-8', newline='') as f:
+                writer = csv.DictWriter(f, fieldnames=self.FIELDNAMES)
+                if header:
+                    writer.writeheader()
+                for s in shops:
+                    writer.writerow({'shopid': shopid, 'shop_id': s.get('shop_id', ''),
+                                     'shop_name': s.get('shop_name', ''), 'shop_href': s.get('shop_href', '')})
+        except Exception as e:
+            logger.exception(f'Lỗi khi ghi {self.path}: {e}')
+
+    def __len__(self):
+        with self._lock:
+            return len(self._known)
+
+    def known(self, shopid: str) -> list[dict] | None:
+        with self._lock:
+            shops = self._known.get(shopid)
+            return [dict(s) for s in shops] if shops is not None else None
+
+    def claim(self, shopid: str, item) -> tuple[str, list[dict] | None]:
+        with self._lock:
+            shops = self._known.get(shopid)
+            if shops is not None:
+                self.stats['known'] += 1
+                self.stats['saved'] += 1
+                return 'known', [dict(s) for s in shops]
+            parked = self._inflight.get(shopid)
+            if parked is not None:
+                parked.append(item)
+                self.stats['parked'] += 1
+                return 'parked', None
+            self._inflight[shopid] = []
+            self.stats['loads'] += 1
+            return 'load', None
+
+    def resolve(self, shopid: str, shops: list[dict]) -> list:
+        """Ghi nhận shop của shopid vừa mở xong, trả về các item đã gác lại chờ shopid này.
+
+        Chỉ ghi nhận real_shops(shops); không còn shop nào thì trang có thể lỗi, caller nên release các item
+        trả về.
+        """
+        shops = real_shops(shops)
+        with self._lock:
+            parked = self._inflight.pop(shopid, [])
+            new = bool(shops) and shopid not in self._known
+            if shops:
+                self._known[shopid] = [dict(s) for s in shops]
+                self.stats['saved'] += len(parked)
+        if new:
+            self._append(shopid, shops)
+        return parked
+
+    def release(self, shopid: str) -> list:
+        """Mở trang của shopid bị lỗi: bỏ trạng thái đang mở, trả về các item đã gác lại."""
+        with self._lock:
+            return self._inflight.pop(shopid, [])
+
+    def log_report(self, log: logging.Logger | None = None) -> dict:
+        log = log or logger
+        with self._lock:
+            stats = dict(self.stats)
+            stats['shops'] = len(self._known)
+        total = stats['loads'] + stats['saved']
+        log.info(f"[shop_index] {stats['loads']} trang sản phẩm đã mở, {stats['saved']}/{total} sản phẩm "
+                 f"lấy shop không cần mở trang ({stats['known']} shop đã biết, {stats['parked']} gác lại), "
+                 f"{stats['shops']} shop trong index")
+        return stats
+
+
+_shop_index: ShopIndex | None = None
+_shop_index_lock = threading.Lock()
+
+
+def get_shop_index() -> ShopIndex:
+    global _shop_index
+    with _shop_index_lock:
+        if _shop_index is None:
+            _shop_index = ShopIndex()
+        return _shop_index
+
+
+def item_shopid(href: str) -> str | None:
+    from funcs.shopee_api import parse_item_href
+
+    ids = parse_item_href(href)
+    return ids[0] if ids else None
 
 
 def read_hrefs_from_file(fp: Path) -> tuple[str, list[dict]]:
@@ -337,132 +720,419 @@ def read_hrefs_from_file(fp: Path) -> tuple[str, list[dict]]:
         return fp.stem, []
 
 
-def get_shop_sell_product(thread_idx, products):
-    from funcs.setup_driver import setup_driver
-    from funcs.fake_agent import random_sleep, hover_element, random_scroll
-    from funcs.load_cookies_to_driver import load_cookies_to_driver
-
-    driver = None
-    while driver is None:
-        driver = setup_driver(profile_idx=thread_idx)
-
-    screen_width = driver.execute_script("return window.screen.availWidth;")
-    screen_height = driver.execute_script("return window.screen.availHeight;")
-    window_width = screen_width // 5
-    window_height = screen_height // 2
-    # position_x = thread_idx * window_width // 5
-    position_x = thread_idx * window_width  # for testing
-    position_y = 0
-
-    driver.set_window_size(window_width, window_height)
-    driver.set_window_position(position_x, position_y)
-
-    driver.get("https://shopee.vn/mall")
-    driver.execute_script("document.body.style.zoom='25%'")
-    load_cookies_to_driver(driver)
-    time.sleep(3)
-    driver.refresh()
-
-    import csv
-
-    for fp in products:
-        category_name, rows = read_hrefs_from_file(Path(fp))
-        logger.info(f"[Thread {thread_idx}] Xử lý category '{category_name}' với {len(rows)} sản phẩm")
-
-        # nếu không có rows thì tiếp
-        if not rows:
-            continue
+class ProductFile:
+    """Các dòng của 1 file products/*.csv, dùng chung giữa các worker cùng xử lý file đó.
+
+    Sản phẩm xong được ghi nối vào products/X.journal (O(1) mỗi sản phẩm); status trong CSV chỉ được
+    ghi lại 1 lần khi cả category xong hoặc khi dừng (compact). Lần chạy sau đọc journal để bỏ qua
+    các sản phẩm đã xong.
+    """
+
+    _open: set = set()
+    _open_lock = threading.Lock()
+
+    def __init__(self, fp: Path):
+        from funcs.progress_journal import ProgressJournal, journal_path_for
+
+        self.path = Path(fp)
+        self.category_name, self.rows = read_hrefs_from_file(self.path)
+        self._lock = threading.Lock()
+        self.journal = ProgressJournal(journal_path_for(self.path))
+
+        done = self.journal.load()
+        if done:
+            resumed = 0
+            for r in self.rows:
+                if r.get('href') in done and r.get('status') != '1':
+                    r['status'] = '1'
+                    resumed += 1
+            logger.info(f"Category '{self.category_name}': bỏ qua {resumed} sản phẩm đã xong theo journal")
+        self._remaining = len(self.pending())
+        self._dirty = bool(done)
+
+        with ProductFile._open_lock:
+            ProductFile._open.add(self)
+
+    def pending(self) -> list[int]:
+        return [i for i, r in enumerate(self.rows) if str(r.get('status') or '0').strip() == '0']
+
+    def mark_done(self, idx: int):
+        with self._lock:
+            if self.rows[idx].get('status') == '1':
+                return
+            self.rows[idx]['status'] = '1'
+            self.journal.mark(self.rows[idx].get('href', ''))
+            self._dirty = True
+            self._remaining -= 1
+            finished = self._remaining <= 0
+        if finished:
+            self.compact()
+
+    def compact(self):
+        """Ghi status hiện tại về CSV rồi xoá journal."""
+        import csv
 
-        # đường dẫn file CSV để cập nhật trạng thái
-        csv_path = Path(fp)
+        with self._lock:
+            if not self._dirty:
+                self.journal.close()
+                return
+            tmp = self.path.with_suffix('.csv.tmp')
+            try:
+                with tmp.open('w', encoding='utf-8-sig', newline='') as f:
+                    fieldnames = ['href', 'name', 'status']
+                    writer = csv.DictWriter(f, fieldnames=fieldnames)
+                    writer.writeheader()
+                    for r in self.rows:
+                        try:
+                            writer.writerow({'href': r.get('href', ''), 'name': r.get('name', ''), 'status': r.get('status', '0')})
+                        except Exception:
+                            logger.debug('Lỗi khi ghi 1 dòng CSV khi cập nhật status')
+                os.replace(tmp, self.path)
+            except Exception as e:
+                logger.exception(f'Lỗi khi compact status vào {self.path}, giữ lại journal: {e}')
+                self.journal.close()
+                return
+            self.journal.remove()
+            self._dirty = False
+            logger.info(f"Category '{self.category_name}': đã gộp status vào {self.path}")
+
+        with ProductFile._open_lock:
+            ProductFile._open.discard(self)
+
+
+def compact_product_files():
+    """Gộp journal của các file products đang mở về CSV (gọi khi dừng chương trình)."""
+    with ProductFile._open_lock:
+        files = list(ProductFile._open)
+    for pf in files:
+        try:
+            pf.compact()
+        except Exception as e:
+            logger.exception(f'Lỗi khi compact {pf.path}: {e}')
 
-        for idx, item in enumerate(rows):
-            href = item.get('href') or ''
-            name = item.get('name') or ''
-            status = str(item.get('status') or '0').strip()
 
-            # chỉ xử lý nếu status == '0' (chưa xử lý)
-            if status != '0':
+def load_product_files(file_path: str | Path | None = None, files: list | None = None) -> list[ProductFile]:
+    if files is None:
+        base = Path(__file__).parent
+        products_dir = Path(file_path) if file_path else base / 'products'
+        if not products_dir.exists() or not products_dir.is_dir():
+            logger.error(f'Thư mục products không tồn tại: {products_dir}')
+            files = []
+        else:
+            files = sorted([p for p in products_dir.iterdir() if p.is_file() and p.suffix.lower() == '.csv'])
+    return [ProductFile(Path(fp)) for fp in files]
+
+
+def products_queue(file_path: str | Path | None = None, files: list | None = None,
+                   product_files: list[ProductFile] | None = None):
+    """Tạo WorkQueue với mỗi item là 1 sản phẩm chưa xử lý (status == '0') của 1 file products.
+
+    Item được sắp theo shopid (tách từ href): 1 sản phẩm đại diện của mỗi shop chưa biết đứng trước,
+    các sản phẩm còn lại của shop đó xếp sau để khi worker lấy tới thì shop đã có trong ShopIndex.
+    """
+    from funcs.work_queue import WorkQueue
+
+    if product_files is None:
+        product_files = load_product_files(file_path, files)
+
+    index = get_shop_index()
+    first, rest = [], []
+    seen: set[str] = set()
+    for pf in product_files:
+        pending = pf.pending()
+        logger.info(f"Category '{pf.category_name}': {len(pending)}/{len(pf.rows)} sản phẩm cần xử lý")
+        for idx in pending:
+            shopid = item_shopid(pf.rows[idx].get('href') or '')
+            if shopid is None or (shopid not in seen and index.known(shopid) is None):
+                first.append((pf, idx))
+                if shopid is not None:
+                    seen.add(shopid)
+            else:
+                rest.append((pf, idx))
+    items = first + rest
+    if rest:
+        logger.info(f'{len(items)} sản phẩm thuộc {len(seen)} shop chưa biết, {len(rest)} sản phẩm '
+                    f'có thể lấy shop mà không cần mở trang')
+
+    tasks = WorkQueue(items, name='products')
+    tasks.close()
+    return tasks
+
+
+def fetch_shops_http(product_files: list[ProductFile], batch_size: int = 500, **resolver_kwargs) -> int:
+    """Lấy shop cho các sản phẩm chưa xử lý bằng HTTP (funcs.http_fetch) trước khi mở Chrome.
+
+    Sản phẩm lấy được shop thì lưu và đánh dấu xong; sản phẩm bị chặn / lỗi / không đọc được shop nào
+    giữ status '0' để worker browser xử lý như cũ. Trả về số sản phẩm đã xong qua HTTP.
+    """
+    from funcs.http_fetch import HttpShopResolver, load_cookie_jar
+
+    resolver = HttpShopResolver(cookies=load_cookie_jar(), **resolver_kwargs)
+    index = get_shop_index()
+    items = [(pf, idx) for pf in product_files for idx in pf.pending()]
+    resolved = 0
+    for start in range(0, len(items), batch_size):
+        batch = items[start:start + batch_size]
+        hrefs = [pf.rows[idx].get('href') or '' for pf, idx in batch]
+        results = resolver.resolve(hrefs)
+        for (pf, idx), href, shops in zip(batch, hrefs, results):
+            # None (bị chặn / lỗi) hoặc [] (JSON không có shop) đều để browser xử lý lại
+            if not shops:
                 continue
+            save_shops_for_category(pf.category_name, shops,
+                                    on_flushed=lambda pf=pf, idx=idx: _mark_product_done(pf, idx))
+            # sản phẩm khác của shop này (còn lại cho browser) lấy shop từ index, không cần mở Chrome
+            shopid = item_shopid(href)
+            if shopid is not None:
+                index.resolve(shopid, shops)
+            resolved += 1
+        if resolver.tripped:
+            break
+    # ghi shop ra file ngay để status '1' của các sản phẩm trên được ghi trước khi products_queue() đọc pending()
+    flush_shop_stores()
+    logger.info(f'[http] Đã xong {resolved}/{len(items)} sản phẩm qua HTTP, còn {len(items) - resolved} cho browser')
+    return resolved
+
+
+def _mark_product_done(pf: ProductFile, idx: int):
+    try:
+        pf.mark_done(idx)
+    except Exception as e:
+        logger.exception(f"Lỗi khi cập nhật status cho sản phẩm {pf.rows[idx].get('href')}: {e}")
 
-            try:
-                driver.get(href)
-                driver.execute_script("document.body.style.zoom='25%'")
-                time.sleep(3)
 
-                random_sleep()
-                hover_element(driver, driver.find_element('tag name', 'body'))
-                random_scroll(driver)
+def _save_product_shops(thread_idx, pf: ProductFile, idx: int, shops: list[dict], on_saved=None):
+    """Lưu shops vào shops/{category}.csv của sản phẩm rồi đánh dấu sản phẩm đã xong.
 
-                shops = get_infor_shop(driver)
-                logger.info(f"[Thread {thread_idx}] Category '{category_name}' - Lấy được {len(shops)} shop từ sản phẩm '{href}'.")
+    Status = '1' (journal) chỉ được ghi sau khi shop của sản phẩm đã được ghi vào file (ShopStore flush).
+    """
+    if not shops:
+        _mark_product_done(pf, idx)
+        return
+    category_name = pf.category_name
+    try:
+        added = save_shops_for_category(category_name, shops, on_flushed=lambda: _mark_product_done(pf, idx))
+        if added and on_saved is not None:
+            on_saved(shops_csv_path(category_name), added)
+    except Exception as e:
+        logger.exception(f"[Thread {thread_idx}] Lỗi khi lưu shops cho category {category_name}: {e}")
 
-                # nếu phát hiện shop trả về thông báo lỗi tải (cookie hết hạn / session dead)
-                if shops:
-                    # kiểm tra nếu shop name chính xác bằng chuỗi lỗi tải
-                    for s in shops:
-                        try:
-                            shop_name = s.get('shop_name', '') or ''
-                            if {shop_name == "Cần trợ giúp?\nLỗi tải\nXin lỗi, chúng tôi đang gặp sự cố tải, bạn vui lòng thử lại nhé.\nThử Lại" or
-                                shop_name == ",\"Bạn cần giúp đỡ?\nTrang không khả dụng\nTài khoản của bạn đã bị giới hạn tạm thời vì tần suất truy cập bất thường và có thể bị khóa vĩnh viễn nếu lặp lại hoạt động này. Vui lòng liên hệ bộ phận CSKH Shopee nếu cần hỗ trợ thêm.\nTrở về trang chủ\nID: 984cc4d41fa-2fc1-4268-9cec-e390712a5407\",https://shopee.vn/"}:
-                                # in nội dung cookies nếu có và dừng process
-                                cookies_file = Path(__file__).parent / 'cookies' / 'cookies.json'
-                                try:
-                                    if cookies_file.exists():
-                                        with cookies_file.open('r', encoding='utf-8') as cf:
-                                            content = cf.read()
-                                        logger.error('Phát hiện cookies có vẻ hết hạn. Nội dung cookies:')
-                                        print(content)
-                                    else:
-                                        logger.error('Phát hiện cookies có vẻ hết hạn nhưng file cookies không tồn tại.')
-                                except Exception as e:
-                                    logger.exception(f'Không thể đọc file cookies: {e}')
-                                # dừng toàn bộ chương trình
-                                logger.error('Dừng tiến trình do phát hiện trang báo lỗi tải (cookie/session có vấn đề).')
-                                os._exit(0)
-                        except Exception:
-                            continue
 
-                try:
-                    if shops:
-                        save_shops_for_category(category_name, shops)
-                except Exception as e:
-                    logger.exception(f"[Thread {thread_idx}] Lỗi khi lưu shops cho category {category_name}: {e}")
+def get_shop_sell_product(thread_idx, products, on_saved=None):
+    """Worker lấy shop bán từng sản phẩm.
 
-                # sau khi xử lý thành công sản phẩm, cập nhật status = '1' và ghi lại CSV
-                try:
-                    rows[idx]['status'] = '1'
-                    # ghi lại toàn bộ file CSV
-                    with csv_path.open('w', encoding='utf-8-sig', newline='') as f:
-                        fieldnames = ['href', 'name', 'status']
-                        writer = csv.DictWriter(f, fieldnames=fieldnames)
-                        writer.writeheader()
-                        for r in rows:
-                            try:
-                                writer.writerow({'href': r.get('href', ''), 'name': r.get('name', ''), 'status': r.get('status', '0')})
-                            except Exception:
-                                logger.debug('Lỗi khi ghi 1 dòng CSV khi cập nhật status')
-                except Exception as e:
-                    logger.exception(f"[Thread {thread_idx}] Lỗi khi cập nhật status cho sản phẩm {href}: {e}")
+    `products` là WorkQueue dùng chung (item = (ProductFile, index dòng)) hoặc list file CSV như cũ.
+    `on_saved(shops_csv, added)` được gọi với các shop mới vừa ghi vào shops/{category}.csv (dùng cho pipeline.py).
+    """
+    from funcs.setup_driver import setup_driver
+    from funcs.resource_policy import log_resource_summary, report_page
+    from funcs.readiness import wait_until_ready
+    from funcs.shopee_api import ApiCapture, PRODUCT_API_PATTERNS
+    from funcs.fake_agent import random_sleep, hover_element, random_scroll
+    from funcs.cookie_pool import get_cookie_pool
+    from funcs.work_queue import WorkQueue
+    from funcs.rate_limiter import get_limiter
+    from funcs.block_detect import BlockGuard, PageBlocked, check_page
+    from funcs.driver_supervisor import CRASH_RETRIES, DriverSupervisor
+
+    tasks = products if isinstance(products, WorkQueue) else products_queue(files=list(products))
+    limiter = get_limiter('shopee.vn') if PACING == 'adaptive' else None
+
+    shop_index = get_shop_index()
+    session = get_cookie_pool('shopee').session(f'shops-{thread_idx}')
+    guard = BlockGuard(session.worker, session.account, limiter)
+
+    def open_driver():
+        driver = None
+        while driver is None:
+            driver = setup_driver(profile_idx=thread_idx, resource_policy=RESOURCE_POLICY,
+                                  performance_log=EXTRACT_MODE == 'api')
+        return driver
+
+    def prepare_driver(driver):
+        screen_width = driver.execute_script("return window.screen.availWidth;")
+        screen_height = driver.execute_script("return window.screen.availHeight;")
+        window_width = screen_width // 5
+        window_height = screen_height // 2
+        # position_x = thread_idx * window_width // 5
+        position_x = thread_idx * window_width  # for testing
+        position_y = 0
+
+        driver.set_window_size(window_width, window_height)
+        driver.set_window_position(position_x, position_y)
+
+        if COOKIE_MODE != 'cdp' or not session.load(driver, mode='cdp'):
+            driver.get("https://shopee.vn/mall")
+            driver.execute_script("document.body.style.zoom='25%'")
+            session.load(driver)
+            time.sleep(3)
+            driver.refresh()
+
+    # Chrome được mở lại sau RECYCLE_AFTER_PAGES trang / khi vượt ngưỡng RAM / khi crash (funcs.driver_supervisor)
+    supervisor = DriverSupervisor(session.worker, open_driver, prepare=prepare_driver,
+                                  on_quit=lambda d: log_resource_summary(d, logger))
+    driver = None
+    capture = None
+    retry = None
+
+    while True:
+        # tài khoản đang bị tạm dừng (worker khác vừa gặp chặn): không mở trang trong lúc chờ
+        guard.wait()
+        if guard.stopped or supervisor.driver is None:
+            if guard.stopped:
+                logger.error(f"[Thread {thread_idx}] Tài khoản bị chặn liên tục, dừng worker (dữ liệu đã lấy vẫn được lưu)")
+            else:
+                logger.error(f"[Thread {thread_idx}] Không mở lại được Chrome, dừng worker")
+            if retry is not None:
+                tasks.release(thread_idx, retry)
+            tasks.leave(thread_idx)
+            break
+        if supervisor.driver is not driver:
+            # Chrome mới: ApiCapture gắn với driver cũ
+            driver = supervisor.driver
+            capture = ApiCapture(driver, PRODUCT_API_PATTERNS) if EXTRACT_MODE == 'api' else None
+        # item đang dở khi Chrome crash được xử lý lại ngay trên Chrome mới
+        if retry is not None:
+            item, retry = retry, None
+        else:
+            item, item_crashes = tasks.get(thread_idx), 0
+        if item is None:
+            break
+        pf, idx = item
+        category_name = pf.category_name
+        href = pf.rows[idx].get('href') or ''
+
+        # shop của sản phẩm đã biết (cùng shop với sản phẩm đã mở trước đó) -> không cần mở trang
+        shopid = item_shopid(href)
+        if shopid is not None:
+            state, known = shop_index.claim(shopid, item)
+            if state == 'parked':
+                continue
+            if state == 'known':
+                logger.debug(f"[Thread {thread_idx}] Shop {shopid} đã biết, bỏ qua mở sản phẩm '{href}'")
+                _save_product_shops(thread_idx, pf, idx, known, on_saved)
+                tasks.done(thread_idx)
+                continue
 
-                random_sleep()
+        parked = []
+        shared = []
+        blocked_by = None
+        try:
+            if capture is not None:
+                capture.reset()
+            if limiter is not None:
+                limiter.acquire()
+            driver.get(href)
+            driver.execute_script("document.body.style.zoom='25%'")
+            ready = None
+            if capture is None:
+                # chế độ api đọc thẳng JSON, không cần chờ DOM render và cuộn trang trước khi lấy
+                ready = wait_until_ready(driver, 'shopee_product')
+
+                if limiter is None:
+                    random_sleep()
                 hover_element(driver, driver.find_element('tag name', 'body'))
                 random_scroll(driver)
-            except Exception as e:
+
+            shops = get_infor_shop(driver, mode=EXTRACT_MODE, capture=capture)
+            report_page(driver, href, entries=capture.entries if capture is not None else None)
+            logger.info(f"[Thread {thread_idx}] Category '{category_name}' - Lấy được {len(shops)} shop từ sản phẩm '{href}'.")
+
+            # trang lỗi tải / bị giới hạn / captcha / hết phiên: không lưu, tạm dừng worker và đổi phiên
+            check_page(driver, 'shopee', texts=[s.get('shop_name') for s in shops], probe_page=not shops)
+            if shops:
+                guard.ok()
+
+            _save_product_shops(thread_idx, pf, idx, shops, on_saved)
+            if shopid is not None:
+                parked = shop_index.resolve(shopid, shops)
+                shared = real_shops(shops)
+            if limiter is not None:
+                if shops:
+                    limiter.success()
+                elif ready is not None and not ready['ready']:
+                    limiter.failure('error')
+
+            if limiter is None:
+                random_sleep()
+            hover_element(driver, driver.find_element('tag name', 'body'))
+            random_scroll(driver)
+            tasks.done(thread_idx)
+        except PageBlocked as e:
+            blocked_by = e.signature
+            # không phải lỗi của sản phẩm: trả lại hàng đợi, không tính vào số lần thử
+            tasks.release(thread_idx, item)
+            if shopid is not None:
+                parked += shop_index.release(shopid)
+            shops = []
+        except Exception as e:
+            if supervisor.crashed(e) and item_crashes < CRASH_RETRIES:
+                # Chrome chết giữa chừng, không phải lỗi của sản phẩm: xử lý lại trên Chrome mới
+                item_crashes += 1
+                retry = item
+            else:
                 logger.exception(f"[Thread {thread_idx}] Lỗi khi xử lý sản phẩm {href}: {e}")
+                if limiter is not None:
+                    limiter.failure('error')
+                tasks.failed(thread_idx, item)
+            if shopid is not None:
+                parked += shop_index.release(shopid)
+            shops = []
+
+        # các sản phẩm cùng shop đã gác lại trong lúc mở trang: dùng luôn shop vừa lấy,
+        # không lấy được shop thật thì trả về hàng đợi để worker khác mở
+        for parked_item in parked:
+            if shared:
+                _save_product_shops(thread_idx, parked_item[0], parked_item[1], shared, on_saved)
+                tasks.done(thread_idx)
+            else:
+                tasks.release(thread_idx, parked_item)
 
+        if blocked_by is not None:
+            guard.blocked(blocked_by, rotate=lambda: session.rotate(driver, retire=guard.stopped))
+        if retry is None:
+            supervisor.page()
 
-if __name__ == '__main__':
-    NUM_THREADS = 5
-    list_products = products_chunking(num_threads=NUM_THREADS)
+    session.release()
+    supervisor.close()
+
+
+def main(num_threads: int = 5):
+    from funcs.block_detect import log_block_summary
+    from funcs.cookie_pool import log_cookie_pool_summary
+    from funcs.driver_supervisor import log_recycle_summary
+    from funcs.memory import log_rss_summary
+    from funcs.rate_limiter import log_rate_limiter_summary
+    from funcs.readiness import log_readiness_summary
+
+    product_files = load_product_files()
+    if FETCH_MODE == 'http':
+        fetch_shops_http(product_files)
+    tasks = products_queue(product_files=product_files)
 
     threads = []
 
-    for idx, chunk_hrefs in enumerate(list_products):
-        thread = threading.Thread(target=get_shop_sell_product, args=(idx, chunk_hrefs))
+    for idx in range(min(num_threads, len(tasks))):
+        thread = threading.Thread(target=get_shop_sell_product, args=(idx, tasks))
         thread.start()
-        time.sleep(1)
         threads.append(thread)
 
-    for thread in threads:
-        thread.join()
+    try:
+        for thread in threads:
+            thread.join()
+    finally:
+        flush_shop_stores()
+        compact_product_files()
+
+    tasks.log_report(logger)
+    get_shop_index().log_report(logger)
+    log_rate_limiter_summary(logger)
+    log_block_summary(logger)
+    log_cookie_pool_summary(logger)
+    log_rss_summary(logger)
+    log_recycle_summary(logger, 'shops')
+    log_readiness_summary(logger)
+
+
+if __name__ == '__main__':
+    main()
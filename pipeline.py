@@ -0,0 +1,159 @@
+from pathlib import Path
+import logging
+import threading
+import time
+
+try:
+    import config
+except Exception:
+    logging.basicConfig(level=logging.INFO)
+
+logger = logging.getLogger(__name__)
+
+
+class Stage:
+    """1 stage của pipeline: nhóm worker thread cùng lấy việc từ 1 WorkQueue.
+
+    Khi toàn bộ worker của stage kết thúc thì đóng hàng đợi của stage sau, để worker stage sau
+    biết là không còn item mới và dừng sau khi xử lý hết. Worker cuối cùng của stage dừng sớm (bị chặn,
+    hết cookie, Chrome không mở được...) thì hàng đợi của chính stage bị abort(): stage trước không bị
+    chặn mãi ở put() vào hàng đợi đã đầy mà không còn ai lấy.
+    """
+
+    def __init__(self, name: str, tasks, num_threads: int, target, first_idx: int = 0, kwargs: dict | None = None):
+        self.name = name
+        self.tasks = tasks
+        self.num_threads = max(1, int(num_threads))
+        self.target = target
+        self.first_idx = first_idx
+        self.kwargs = kwargs or {}
+        self.threads: list[threading.Thread] = []
+        self._lock = threading.Lock()
+        self.alive = 0
+
+    def start(self):
+        self.alive = self.num_threads
+        for i in range(self.num_threads):
+            # profile_idx của các stage không được trùng nhau (mỗi Chrome 1 profile riêng)
+            idx = self.first_idx + i
+            thread = threading.Thread(target=self._run, args=(idx,), name=f'{self.name}-{idx}')
+            thread.start()
+            self.threads.append(thread)
+
+    def _run(self, idx: int):
+        try:
+            self.target(idx, self.tasks, **self.kwargs)
+        finally:
+            with self._lock:
+                self.alive -= 1
+                last = self.alive == 0
+            if last:
+                was_closed = self.tasks.closed
+                dropped = self.tasks.abort()
+                if dropped or not was_closed:
+                    logger.warning(f"[pipeline] Mọi worker stage {self.name} đã dừng sớm: bỏ {dropped} item đang chờ, "
+                                   f"không nhận thêm item từ stage trước")
+
+    def join(self):
+        for thread in self.threads:
+            thread.join()
+
+
+def main(num_threads: int = 5, product_threads: int | None = None, shop_threads: int | None = None,
+         ggmap_threads: int | None = None, page_num: int = 9, queue_size: int = 200,
+         category_file: str | Path | None = None):
+    """Chạy 3 bước categories -> products -> shops -> Google Maps cùng lúc thay vì lần lượt.
+
+    - products tìm được của mỗi category (sau khi đủ page_num trang) được đưa ngay sang worker lấy shop
+    - shop mới phát hiện được đưa ngay sang worker tìm trên Google Maps
+    - giữa các stage là WorkQueue có giới hạn `queue_size`: stage trước chờ khi stage sau xử lý không kịp
+    - vẫn ghi products/*.csv, shops/*.csv, ggmap_search/*.csv như khi chạy từng script riêng
+    """
+    from funcs.block_detect import log_block_summary
+    from funcs.cookie_pool import log_cookie_pool_summary
+    from funcs.driver_supervisor import log_recycle_summary
+    from funcs.memory import log_rss_summary
+    from funcs.rate_limiter import log_rate_limiter_summary
+    from funcs.readiness import log_readiness_summary
+    from funcs.work_queue import WorkQueue
+    import find_shop_on_ggmap
+    import get_product_in_category
+    import get_shop_sell_product
+
+    product_threads = product_threads or num_threads
+    shop_threads = shop_threads or num_threads
+    ggmap_threads = ggmap_threads or num_threads
+
+    category_tasks = get_product_in_category.category_queue(category_file, page_num=page_num)
+    product_tasks = WorkQueue(maxsize=queue_size, name='products')
+    shop_tasks = WorkQueue(maxsize=queue_size, name='ggmap')
+
+    # put() trả False khi stage sau đã dừng (hàng đợi bị abort): item vẫn nằm trong products/*.csv (status 0)
+    # hoặc shops/*.csv, chạy lại get_shop_sell_product.py / find_shop_on_ggmap.py để xử lý tiếp
+    def products_saved(csv_path):
+        pf = get_shop_sell_product.ProductFile(csv_path)
+        pending = pf.pending()
+        logger.info(f"[pipeline] '{pf.category_name}': chuyển {len(pending)} sản phẩm sang stage shops")
+        dropped = sum(not product_tasks.put((pf, idx)) for idx in pending)
+        if dropped:
+            logger.warning(f"[pipeline] Stage shops đã dừng: {dropped} sản phẩm của '{pf.category_name}' "
+                           f"chưa được lấy shop (còn status 0 trong {csv_path})")
+
+    def shops_saved(shops_csv, added):
+        names = [(shop.get('shop_name') or '').strip() for shop in added]
+        # như find_shop_on_ggmap.shop_queue: tên đã có trong cache ghi kết quả luôn, không đưa sang stage ggmap
+        names = [name for name in names if name and not find_shop_on_ggmap.save_cached_result(str(shops_csv), name)]
+        dropped = sum(not shop_tasks.put((str(shops_csv), name)) for name in names)
+        if dropped:
+            logger.warning(f"[pipeline] Stage ggmap đã dừng: {dropped} shop mới trong {shops_csv} chưa được tìm trên Maps")
+
+    category_pages = get_product_in_category.CategoryPages(page_num)
+    stages = [
+        Stage('products', category_tasks, min(product_threads, max(1, len(category_tasks))),
+              get_product_in_category.get_product_in_category,
+              kwargs={'page_num': page_num, 'pages': category_pages, 'on_saved': products_saved}),
+        Stage('shops', product_tasks, shop_threads, get_shop_sell_product.get_shop_sell_product,
+              kwargs={'on_saved': shops_saved}),
+        Stage('ggmap', shop_tasks, ggmap_threads, find_shop_on_ggmap.get_product_in_category),
+    ]
+
+    first_idx = 0
+    for stage in stages:
+        stage.first_idx = first_idx
+        first_idx += stage.num_threads
+
+    # Mở worker stage sau trước để item đầu tiên không phải chờ driver khởi động
+    for stage in reversed(stages):
+        stage.start()
+
+    t0 = time.monotonic()
+    try:
+        for stage, next_stage in zip(stages, stages[1:] + [None]):
+            stage.join()
+            logger.info(f"[pipeline] Stage {stage.name} xong sau {time.monotonic() - t0:.1f}s")
+            if stage is stages[0]:
+                # category chưa đủ trang vì worker products dừng sớm: ghi và chuyển phần đã lấy sang stage shops
+                get_product_in_category.save_partial_categories(category_pages, on_saved=products_saved)
+            if next_stage is not None:
+                next_stage.tasks.close()
+    finally:
+        get_shop_sell_product.flush_shop_stores()
+        get_shop_sell_product.compact_product_files()
+        find_shop_on_ggmap.get_ggmap_cache().save()
+
+    for stage in stages:
+        stage.tasks.log_report(logger)
+    get_shop_sell_product.get_shop_index().log_report(logger)
+    find_shop_on_ggmap.get_ggmap_cache().log_report(logger)
+    find_shop_on_ggmap.log_search_latency(logger)
+    find_shop_on_ggmap.log_extract_stats(logger)
+    log_rate_limiter_summary(logger)
+    log_block_summary(logger)
+    log_cookie_pool_summary(logger)
+    log_rss_summary(logger)
+    log_recycle_summary(logger, 'pipeline')
+    log_readiness_summary(logger)
+
+
+if __name__ == '__main__':
+    main()